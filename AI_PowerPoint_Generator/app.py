@@ -20,13 +20,55 @@ def create_app():
     app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get("MAX_UPLOAD_MB", "5")) * 1024 * 1024  # Default 5MB
     app.config['UPLOAD_FOLDER'] = 'temp_uploads'
     
+    # Spool uploaded files straight to the upload folder, hashing and checking them as they stream
+    from services.uploads import UPLOAD_MAX_FILE_BYTES, UploadRequest
+    app.request_class = UploadRequest
+    app.config['UPLOAD_MAX_FILE_BYTES'] = UPLOAD_MAX_FILE_BYTES
+    
     # Ensure upload directory exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
+    # Configure background generation jobs
+    from services import jobs
+    app.config['JOB_QUEUE'] = jobs.JOB_QUEUE  # "memory" or a sqlite file shared by workers
+    app.config['JOB_WORKERS'] = jobs.JOB_WORKERS
+    app.config['JOB_RESULTS_DIR'] = jobs.JOB_RESULTS_DIR
+    # "1" runs jobs on an asyncio event loop, many per worker thread
+    app.config['JOB_ASYNC'] = os.environ.get("JOB_ASYNC", "0") == "1"
+    app.config['JOB_ASYNC_CONCURRENCY'] = jobs.JOB_ASYNC_CONCURRENCY
+    
+    # Configure deck sessions for incremental regeneration
+    from services import sessions
+    app.config['DECK_SESSION_DIR'] = sessions.DECK_SESSION_DIR
+    
+    # POST /batch renders in the request, so web batches stay small; larger
+    # ones go through batch.py
+    app.config['BATCH_HTTP_MAX_DECKS'] = int(os.environ.get("BATCH_HTTP_MAX_DECKS", "25"))
+    
     # Register routes
     from routes import main_bp
     app.register_blueprint(main_bp)
     
     return app
 
+# Imported by warm_up for their side effect of loading them before workers fork
+WARM_UP_MODULES = ('google.genai.types', 'services.batch', 'services.gemini_schema', 'services.pipeline')
+
+def warm_up():
+    """
+    Import the heavy generation modules and build the theme templates
+    
+    Called in the gunicorn master before workers fork (see gunicorn.conf.py)
+    so every worker inherits them instead of paying on its first request.
+    It creates no clients, pools or threads, none of which survive a fork.
+    """
+    import importlib
+    from services.ppt_generator import get_theme_template
+    from services.themes import THEMES
+    
+    for module in WARM_UP_MODULES:
+        importlib.import_module(module)
+    for theme in THEMES.values():
+        get_theme_template(theme)
+
 app = create_app()
@@ -0,0 +1,54 @@
+"""
+Generate decks in bulk from a JSONL file of deck specs
+
+Each line is a JSON object with title, theme and slides (plus the optional
+enhancement options). Decks are written to a directory, or to a zip when
+the output ends in .zip, together with report.json.
+
+Usage:
+    python batch.py decks.jsonl -o decks.zip [--workers 8] [--no-enhance]
+"""
+import sys
+import json
+import logging
+import argparse
+from services.batch import BATCH_MAX_DECKS, BATCH_WORKERS, load_deck_specs, run_batch
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help='JSONL file of deck specs ("-" for stdin)')
+    parser.add_argument('-o', '--output', required=True, help='Output directory or .zip file')
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS, help='Render processes')
+    parser.add_argument('--no-enhance', action='store_true', help='Skip Gemini enhancement')
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    if args.input == '-':
+        entries = load_deck_specs(sys.stdin)
+    else:
+        with open(args.input, encoding='utf-8') as f:
+            entries = load_deck_specs(f)
+    
+    if len(entries) > BATCH_MAX_DECKS:
+        print(f"A batch can contain at most {BATCH_MAX_DECKS} decks", file=sys.stderr)
+        return 2
+    
+    report = run_batch(entries, args.output, workers=args.workers, enhance=not args.no_enhance)
+    
+    for result in report['results']:
+        for error in result['errors']:
+            print(f"line {result['line']}: {result['status']}: {error}", file=sys.stderr)
+        for warning in result['warnings']:
+            print(f"line {result['line']}: warning: {warning}", file=sys.stderr)
+    
+    summary = report['summary']
+    print(f"{summary['succeeded']}/{summary['decks']} decks in {summary['seconds']:.2f}s "
+          f"({summary['decks_per_sec']:.2f} decks/sec, p50 {summary['p50_seconds']:.2f}s, "
+          f"p95 {summary['p95_seconds']:.2f}s) -> {args.output}")
+    print(json.dumps(summary))
+    
+    return 0 if summary['succeeded'] == summary['decks'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Sync vs async pipeline load test
+
+Generates many decks at once against local stubs (fake Gemini client with
+latency, Pexels stub, image server) through the thread-per-deck pipeline
+and through the asyncio pipeline on one event loop. Reports throughput,
+per-deck latency and the peak number of app threads each path needed to
+keep every deck in flight. Caches are disabled so every deck goes upstream.
+
+Usage:
+    python -m benchmarks.bench_async [--decks 200] [--slides 6] [--gemini-latency 3.0]
+"""
+import os
+import time
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from models import Deck, Slide
+from services import gemini, gemini_scheduler, images
+from services.async_pipeline import AsyncRunner
+from services.gemini_scheduler import GeminiScheduler
+from services.pipeline import run_pipeline
+from benchmarks.stubs import FakeGeminiClient, ImageServer, PexelsServer
+
+def make_decks(count: int, slides: int, label: str) -> list:
+    # Unique titles keep the scheduler from coalescing identical prompts
+    return [
+        Deck(
+            title=f'{label} deck {d}',
+            enhance_ai=True,
+            stream=False,
+            slides=[Slide(title=f'Slide {i + 1}', bullets=['Point one', 'Point two']) for i in range(slides)],
+        )
+        for d in range(count)
+    ]
+
+class ThreadSampler:
+    """Samples the peak number of app threads (stub server threads excluded)"""
+    
+    def __init__(self):
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+    
+    def _sample(self):
+        while not self._stop.wait(0.01):
+            count = sum(1 for thread in threading.enumerate() if 'process_request_thread' not in thread.name)
+            self.peak = max(self.peak, count)
+    
+    def __enter__(self):
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+# Latency counts from the start of the run, so time a deck spends queued
+# for a sync worker is included like time spent waiting on the event loop
+def timed_sync(deck: Deck, started: float) -> float:
+    buffer, _ = run_pipeline(deck)
+    buffer.close()
+    return time.perf_counter() - started
+
+async def timed_async(runner: AsyncRunner, deck: Deck, started: float) -> float:
+    buffer, _ = await runner.run_pipeline(deck)
+    buffer.close()
+    return time.perf_counter() - started
+
+def report(label: str, latencies: list, elapsed: float, threads: int):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"  {label:<6} {len(latencies) / elapsed:7.1f} decks/s  p50={p50:6.2f}s  p95={p95:6.2f}s  "
+          f"wall={elapsed:6.2f}s  peak threads={threads}")
+
+def run(decks: int, slides: int, gemini_latency: float, upstream_latency: float, workers: int):
+    gemini.GEMINI_CACHE = ""
+    gemini._enhancement_cache = None
+    gemini.client = FakeGeminiClient(latency=gemini_latency)
+    gemini_scheduler._scheduler = GeminiScheduler(requests_per_minute=0, tokens_per_minute=0)
+    images.IMAGE_CACHE_DIR = ""
+    images._image_cache = None
+    images.PEXELS_CACHE_TTL = 0
+    images._query_cache = None
+    os.environ.setdefault("PEXELS_API_KEY", "benchmark")
+    
+    print(f"decks={decks} slides/deck={slides} gemini={gemini_latency}s upstream={upstream_latency}s "
+          f"sync workers={workers}")
+    with ImageServer(latency=upstream_latency) as image_server, \
+            PexelsServer(latency=upstream_latency, photo_base=image_server.base_url) as pexels:
+        images.PEXELS_SEARCH_URL = pexels.search_url
+        
+        with ThreadSampler() as sampler:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sync-deck") as executor:
+                latencies = list(executor.map(lambda deck: timed_sync(deck, started), make_decks(decks, slides, 'sync')))
+            elapsed = time.perf_counter() - started
+        report('sync', latencies, elapsed, sampler.peak)
+        
+        runner = AsyncRunner()
+        runner.start()
+        
+        async def generate_all(started):
+            return await asyncio.gather(*(timed_async(runner, deck, started) for deck in make_decks(decks, slides, 'async')))
+        
+        try:
+            with ThreadSampler() as sampler:
+                started = time.perf_counter()
+                latencies = runner.run(generate_all(started))
+                elapsed = time.perf_counter() - started
+            report('async', latencies, elapsed, sampler.peak)
+        finally:
+            runner.stop()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--decks', type=int, default=200)
+    parser.add_argument('--slides', type=int, default=6)
+    parser.add_argument('--gemini-latency', type=float, default=3.0)
+    parser.add_argument('--upstream-latency', type=float, default=0.1)
+    parser.add_argument('--workers', type=int, default=32, help="Sync path threads (one deck each)")
+    args = parser.parse_args()
+    run(args.decks, args.slides, args.gemini_latency, args.upstream_latency, args.workers)
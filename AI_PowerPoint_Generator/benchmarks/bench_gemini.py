@@ -0,0 +1,46 @@
+"""
+Whole-deck vs chunked Gemini enhancement benchmark
+
+Runs ``enhance_presentation`` against a fake model client whose latency
+grows with the number of slides in the prompt, comparing one request for
+the whole deck with concurrent chunks.
+
+Usage:
+    python -m benchmarks.bench_gemini [--slides 30] [--latency 1.0] [--per-slide 0.2]
+"""
+import time
+import argparse
+from models import Deck, Slide
+from services import gemini
+from services.gemini import enhance_presentation
+from benchmarks.stubs import FakeGeminiClient
+
+def run(slides: int, latency: float, per_slide: float, chunk_sizes: list, concurrency: int):
+    deck = Deck(
+        title='Benchmark deck',
+        slides=[Slide(title=f'Slide {i}', bullets=['First point', 'Second point']) for i in range(slides)]
+    )
+    print(f"slides={slides} latency={latency}s per_slide={per_slide}s concurrency={concurrency}")
+    
+    # Measure the model round trips, not the enhancement cache
+    gemini.GEMINI_CACHE = ""
+    
+    for chunk_size in [0] + chunk_sizes:
+        fake = FakeGeminiClient(latency=latency, per_slide=per_slide)
+        started = time.perf_counter()
+        result = enhance_presentation(deck, 'polish', chunk_size=chunk_size,
+                                      max_concurrency=concurrency, model_client=fake)
+        elapsed = time.perf_counter() - started
+        label = 'whole deck' if not chunk_size else f'chunks of {chunk_size}'
+        print(f"  {label:<13} requests={fake.calls:3d}  time={elapsed:6.2f}s  "
+              f"slides={len(result.slides) if result else 0}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--slides', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=1.0)
+    parser.add_argument('--per-slide', type=float, default=0.2)
+    parser.add_argument('--chunk-sizes', type=int, nargs='+', default=[10, 5, 3])
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+    run(args.slides, args.latency, args.per_slide, args.chunk_sizes, args.concurrency)
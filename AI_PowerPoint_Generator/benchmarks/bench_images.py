@@ -0,0 +1,61 @@
+"""
+Image normalization benchmark
+
+Builds a deck of large photos and compares output size and generation time
+with the normalization stage disabled (raw images embedded, the old
+behaviour) and enabled (downscaled to the image box at IMAGE_DPI and
+re-encoded in the process pool).
+
+Usage:
+    python -m benchmarks.bench_images [--slides 10] [--width 6000] [--height 4000]
+"""
+import os
+import time
+import argparse
+import tempfile
+from PIL import Image
+from models import Slide
+from services import images
+from services.ppt_generator import generate_ppt
+from services.themes import get_theme
+
+def make_photo(path: str, width: int, height: int, seed: int):
+    """Write a noisy JPEG that compresses roughly like a real photo"""
+    noise = Image.effect_noise((width, height), 40 + seed)
+    gradient = Image.linear_gradient('L').resize((width, height))
+    Image.merge('RGB', (noise, gradient, noise.transpose(Image.FLIP_LEFT_RIGHT))).save(path, quality=92)
+
+def run(slides: int, width: int, height: int):
+    with tempfile.TemporaryDirectory() as directory:
+        photos = []
+        for i in range(slides):
+            path = os.path.join(directory, f"photo{i}.jpg")
+            make_photo(path, width, height, i)
+            photos.append(path)
+        source_bytes = sum(os.path.getsize(path) for path in photos)
+        
+        deck = [Slide(title=f'Photo {i + 1}', bullets=['Caption'], image_path=path)
+                for i, path in enumerate(photos)]
+        theme = get_theme('default')
+        
+        print(f"slides={slides} source={width}x{height} total_source={source_bytes / 1e6:.1f}MB dpi={images.IMAGE_DPI}")
+        for label, enabled in (('raw', False), ('normalized', True)):
+            images.NORMALIZE_IMAGES = enabled
+            if enabled:
+                # Start the pool outside the timed region, as a warm worker would
+                for path in images.normalize_images([photos[0]], 1, 1).values():
+                    os.remove(path)
+            started = time.perf_counter()
+            ppt_path = generate_ppt("Large images", deck, theme)
+            elapsed = time.perf_counter() - started
+            size = os.path.getsize(ppt_path)
+            os.remove(ppt_path)
+            print(f"  {label:<11} size={size / 1e6:7.2f}MB  time={elapsed:6.2f}s")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--slides', type=int, default=10)
+    parser.add_argument('--width', type=int, default=6000)
+    parser.add_argument('--height', type=int, default=4000)
+    args = parser.parse_args()
+    run(args.slides, args.width, args.height)
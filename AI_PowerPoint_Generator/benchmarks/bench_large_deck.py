@@ -0,0 +1,99 @@
+"""
+Large deck memory benchmark
+
+Renders decks of increasing size, every slide with its own picture, once
+by building the whole presentation and saving it (build_presentation) and
+once with the slide-by-slide writer (write_large_deck). Each run happens
+in a fresh process and reports its peak Python allocations (tracemalloc)
+and peak RSS, which also covers lxml's XML trees. Image normalization is
+off so both paths embed the same files.
+
+Usage:
+    python -m benchmarks.bench_large_deck [--slides 50 500 2000] [--image-kb 60]
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+from PIL import Image
+
+def make_images(directory: str, count: int, image_kb: int) -> list:
+    """Write ``count`` distinct noisy JPEGs of roughly ``image_kb`` KB each"""
+    rng = random.Random(0)
+    side = max(32, int((image_kb * 1024 / 1.5) ** 0.5))
+    paths = []
+    for i in range(count):
+        image = Image.frombytes('L', (side, side), rng.randbytes(side * side)).convert('RGB')
+        path = os.path.join(directory, f"slide{i}.jpg")
+        image.save(path, quality=90)
+        paths.append(path)
+    return paths
+
+def child(mode: str, slides: int, image_dir: str):
+    """Render one deck in this process and print its measurements as JSON"""
+    from models import Slide
+    from services import images, ppt_generator
+    from services.themes import get_theme
+    images.NORMALIZE_IMAGES = False
+    
+    paths = sorted(os.listdir(image_dir), key=lambda name: int(name[5:-4]))[:slides]
+    deck = [
+        Slide(title=f'Slide {i + 1}', bullets=[f'Point {j + 1}' for j in range(3)],
+              image_path=os.path.join(image_dir, name))
+        for i, name in enumerate(paths)
+    ]
+    theme = get_theme('default')
+    output = tempfile.TemporaryFile()
+    
+    tracemalloc.start()
+    started = time.perf_counter()
+    if mode == 'build':
+        ppt_generator.build_presentation('Large deck', deck, theme).save(output)
+    else:
+        ppt_generator.write_large_deck('Large deck', deck, theme, output)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    print(json.dumps({
+        'traced_peak': peak,
+        'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        'size': output.tell(),
+        'seconds': elapsed,
+    }))
+
+def run(sizes: list, image_kb: int):
+    image_dir = tempfile.mkdtemp(prefix="bench-large-deck-")
+    try:
+        make_images(image_dir, max(sizes), image_kb)
+        print(f"image size ~{image_kb}KB, one distinct image per slide")
+        for slides in sizes:
+            for mode in ('build', 'stream'):
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_large_deck', '--child', mode, str(slides), image_dir],
+                    capture_output=True, text=True, check=True
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(f"  slides={slides:<5} {mode:<6} traced peak={result['traced_peak'] / 1e6:7.1f}MB  "
+                      f"peak RSS={result['max_rss'] / 1e6:7.1f}MB  deck={result['size'] / 1e6:6.1f}MB  "
+                      f"time={result['seconds']:6.2f}s")
+    finally:
+        shutil.rmtree(image_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--slides', type=int, nargs='+', default=[50, 500, 2000])
+    parser.add_argument('--image-kb', type=int, default=60)
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'SLIDES', 'IMAGE_DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], int(args.child[1]), args.child[2])
+    else:
+        run(args.slides, args.image_kb)
@@ -0,0 +1,86 @@
+"""
+Slide model memory benchmark
+
+Holds a large batch of decks in memory twice, once as the plain dicts the
+pipeline used to pass around and once as slotted Deck/Slide models, and
+reports the bytes and allocated blocks each representation keeps alive
+(tracemalloc) plus how long it takes to build.
+
+Usage:
+    python -m benchmarks.bench_models [--decks 1000] [--slides 40]
+"""
+import gc
+import time
+import argparse
+import tracemalloc
+from models import Deck, Slide
+
+def make_models(decks: int, slides: int) -> list:
+    return [
+        Deck(
+            title=f'Deck {d}',
+            slides=[
+                Slide(title=f'Slide {i + 1}', bullets=[f'Point {j + 1}' for j in range(3)],
+                      image_url=f'https://example.com/{i % 8}.png' if i % 4 == 0 else None)
+                for i in range(slides)
+            ],
+        )
+        for d in range(decks)
+    ]
+
+def make_dicts(decks: int, slides: int) -> list:
+    # Every field is present, as the form and spec parsers used to fill them all in
+    return [
+        {
+            'title': f'Deck {d}',
+            'slides': [
+                {
+                    'title': f'Slide {i + 1}',
+                    'bullets': [f'Point {j + 1}' for j in range(3)],
+                    'image_url': f'https://example.com/{i % 8}.png' if i % 4 == 0 else None,
+                    'image_path': None,
+                    'image_digest': None,
+                    'image_keywords': None,
+                    'speaker_notes': None,
+                }
+                for i in range(slides)
+            ],
+            'theme': 'default',
+            'tone': 'professional',
+            'enhance_ai': False,
+            'enhancement_mode': 'polish',
+            'max_bullets': 3,
+            'stream': None,
+        }
+        for d in range(decks)
+    ]
+
+def measure(build) -> dict:
+    """Build a batch under tracemalloc; returns retained bytes, peak bytes, live blocks and seconds"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    batch = build()
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    del batch
+    return {'bytes': current, 'peak': peak, 'blocks': blocks, 'seconds': elapsed}
+
+def run(decks: int, slides: int):
+    print(f"decks={decks} slides/deck={slides}")
+    results = {}
+    for label, build in (('dicts', make_dicts), ('models', make_models)):
+        results[label] = result = measure(lambda: build(decks, slides))
+        print(f"  {label:<7} retained={result['bytes'] / 1e6:7.1f}MB  peak={result['peak'] / 1e6:7.1f}MB  "
+              f"blocks={result['blocks']:9d}  build={result['seconds']:6.2f}s")
+    print(f"  models keep {1 - results['models']['bytes'] / results['dicts']['bytes']:.0%} fewer bytes "
+          f"and {1 - results['models']['blocks'] / results['dicts']['blocks']:.0%} fewer blocks")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--decks', type=int, default=1000)
+    parser.add_argument('--slides', type=int, default=40)
+    args = parser.parse_args()
+    run(args.decks, args.slides)
@@ -0,0 +1,50 @@
+"""
+Serial vs concurrent image download benchmark
+
+Serves images from a local stub server with injected latency and compares
+downloading them one slide at a time (the old ``add_image_slide`` behaviour)
+against ``prefetch_images``. With prefetching, wall-clock time should track
+the slowest image rather than the sum of all of them.
+
+Usage:
+    python -m benchmarks.bench_prefetch [--images 20] [--latency 0.2]
+"""
+import os
+import time
+import argparse
+from services.images import download_image, prefetch_images
+from benchmarks.stubs import ImageServer
+
+def run(images: int, latency: float, slowest: float):
+    with ImageServer() as server:
+        # Every image has the base latency except the last one, which is slowest
+        urls = [server.url(f"img{i}.png", delay=latency) for i in range(images - 1)]
+        urls.append(server.url("slowest.png", delay=slowest))
+        
+        started = time.perf_counter()
+        for url in urls:
+            path = download_image(url)
+            if path:
+                os.remove(path)
+        serial = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        results = prefetch_images(urls)
+        concurrent = time.perf_counter() - started
+        for path in results.values():
+            os.remove(path)
+    
+    total_latency = latency * (images - 1) + slowest
+    print(f"images={images} latency={latency}s slowest={slowest}s")
+    print(f"  sum of latencies : {total_latency:.2f}s")
+    print(f"  serial downloads : {serial:.2f}s")
+    print(f"  prefetch_images  : {concurrent:.2f}s ({len(results)}/{images} fetched)")
+    print(f"  speedup          : {serial / concurrent:.1f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--images', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--slowest', type=float, default=0.5)
+    args = parser.parse_args()
+    run(args.images, args.latency, args.slowest)
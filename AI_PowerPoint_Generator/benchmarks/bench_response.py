@@ -0,0 +1,64 @@
+"""
+Disk I/O per generated deck: temp-file round trip vs spooled streaming
+
+Reads this process's I/O counters from /proc/self/io (Linux) around each
+mode. ``wchar`` counts bytes passed to write() on files, so it shows the
+temp-file round trip even when the page cache absorbs the actual disk
+writes; ``write_bytes`` is what reached the block layer.
+
+Usage:
+    python -m benchmarks.bench_response [--decks 20] [--slides 10 200]
+"""
+import os
+import time
+import argparse
+import tempfile
+from models import Slide
+from services import ppt_generator
+from services.ppt_generator import generate_ppt, generate_ppt_stream
+from services.themes import get_theme
+
+def io_counters() -> dict:
+    with open('/proc/self/io') as f:
+        return {key: int(value) for key, value in (line.split(': ') for line in f)}
+
+def temp_file_mode(title, slides, theme):
+    path = generate_ppt(title, slides, theme)
+    with open(path, 'rb') as f:
+        data = f.read()
+    os.remove(path)
+    return len(data)
+
+def stream_mode(title, slides, theme):
+    with generate_ppt_stream(title, slides, theme) as buffer:
+        return len(buffer.read())
+
+def run(decks: int, slide_counts: list):
+    theme = get_theme('default')
+    leftovers_before = set(os.listdir(tempfile.gettempdir()))
+    
+    for slide_count in slide_counts:
+        slides = [Slide(title=f'Slide {i}', bullets=['Point one', 'Point two', 'Point three'])
+                  for i in range(slide_count)]
+        print(f"slides={slide_count} decks={decks} spool_limit={ppt_generator.SPOOL_MAX_BYTES / 1024 / 1024:.0f}MB")
+        for label, mode in (('temp file', temp_file_mode), ('stream', stream_mode)):
+            before = io_counters()
+            started = time.perf_counter()
+            for _ in range(decks):
+                size = mode("I/O benchmark", slides, theme)
+            elapsed = time.perf_counter() - started
+            after = io_counters()
+            print(f"  {label:<10} deck={size / 1e3:8.1f}KB  "
+                  f"wchar/deck={(after['wchar'] - before['wchar']) / decks / 1e3:8.1f}KB  "
+                  f"write_bytes/deck={(after['write_bytes'] - before['write_bytes']) / decks / 1e3:8.1f}KB  "
+                  f"time/deck={elapsed / decks * 1000:6.1f}ms")
+    
+    leftovers = set(os.listdir(tempfile.gettempdir())) - leftovers_before
+    print(f"files left in {tempfile.gettempdir()}: {len(leftovers)}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--decks', type=int, default=20)
+    parser.add_argument('--slides', type=int, nargs='+', default=[10, 200])
+    args = parser.parse_args()
+    run(args.decks, args.slides)
@@ -0,0 +1,80 @@
+"""
+Startup time report
+
+Runs ``python -X importtime -c "import app"`` in a fresh interpreter and
+reports total import time, the slowest modules by self time, and which
+heavy dependencies were (not) imported at startup. Also times
+``create_app()`` and the gunicorn preload ``warm_up()`` in fresh processes.
+
+Usage:
+    python -m benchmarks.bench_startup [--top 15] [--json startup.json]
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+HEAVY_MODULES = ('google.genai', 'pydantic', 'pptx', 'PIL.Image', 'requests', 'flask')
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+def run_python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    env = {key: value for key, value in os.environ.items() if key != 'GEMINI_API_KEY'}
+    return subprocess.run([sys.executable, *flags, '-c', code], capture_output=True, text=True, env=env,
+                          cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True)
+
+def import_times() -> list:
+    """Return ``(module, self_us, cumulative_us, depth)`` for each module imported by ``import app``"""
+    result = run_python('import app', '-X', 'importtime')
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+def timed_call(code: str) -> float:
+    """Seconds taken by ``code`` in a fresh interpreter, excluding interpreter startup"""
+    script = f"import time\nstarted = time.perf_counter()\n{code}\nprint(time.perf_counter() - started)"
+    return float(run_python(script).stdout.strip().splitlines()[-1])
+
+def run(top: int) -> dict:
+    rows = import_times()
+    modules = {module: cumulative for module, _, cumulative, _ in rows}
+    total_us = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+    
+    report = {
+        'import_app_ms': total_us / 1000,
+        'create_app_ms': timed_call('from app import create_app\ncreate_app()') * 1000,
+        'warm_up_ms': timed_call('from app import warm_up\nwarm_up()') * 1000,
+        'modules_imported': len(rows),
+        'heavy_modules_at_startup': {name: name in modules for name in HEAVY_MODULES},
+        'slowest_self_ms': [
+            {'module': module, 'self_ms': self_us / 1000, 'cumulative_ms': cumulative / 1000}
+            for module, self_us, cumulative, _ in sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+        ],
+    }
+    
+    print(f"import app:   {report['import_app_ms']:8.1f}ms ({report['modules_imported']} modules)")
+    print(f"create_app(): {report['create_app_ms']:8.1f}ms (includes import)")
+    print(f"warm_up():    {report['warm_up_ms']:8.1f}ms (gunicorn master, before fork)")
+    print("heavy modules imported at startup:")
+    for name, loaded in report['heavy_modules_at_startup'].items():
+        print(f"  {name:<14} {'yes' if loaded else 'no (deferred)'}")
+    print(f"slowest {top} modules by self time:")
+    for row in report['slowest_self_ms']:
+        print(f"  {row['module']:<40} self={row['self_ms']:7.1f}ms  cumulative={row['cumulative_ms']:7.1f}ms")
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--json', help='Also write the report to this file')
+    args = parser.parse_args()
+    report = run(args.top)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,51 @@
+"""
+Theme master template benchmark
+
+Renders bullet decks of several sizes with per-shape theme styling (the old
+behaviour: every run, title and slide background formatted individually)
+and with the theme baked into a cached master template, reporting render
+time per slide and output size.
+
+Usage:
+    python -m benchmarks.bench_templates [--sizes 5 50 500] [--theme dark] [--repeat 3]
+"""
+import io
+import time
+import argparse
+from models import Slide
+from services import ppt_generator
+from services.ppt_generator import build_presentation
+from services.themes import get_theme
+
+def render(slides: list, theme: dict) -> tuple:
+    """Build and save one deck, returning (seconds, bytes)"""
+    started = time.perf_counter()
+    prs = build_presentation("Template benchmark", slides, theme)
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return time.perf_counter() - started, buffer.tell()
+
+def run(sizes: list, theme_name: str, repeat: int):
+    theme = get_theme(theme_name)
+    
+    started = time.perf_counter()
+    ppt_generator.get_theme_template(theme)
+    print(f"theme={theme_name} template build={(time.perf_counter() - started) * 1000:.1f}ms (once per worker)")
+    
+    for size in sizes:
+        slides = [Slide(title=f'Slide {i + 1}', bullets=[f'Point {j + 1} of slide {i + 1}' for j in range(5)])
+                  for i in range(size)]
+        print(f"slides={size}")
+        for label, enabled in (('per-shape', False), ('template', True)):
+            ppt_generator.THEME_TEMPLATES = enabled
+            elapsed, output_bytes = min(render(slides, theme) for _ in range(repeat))
+            print(f"  {label:<10} per_slide={elapsed / (size + 1) * 1000:6.2f}ms  "
+                  f"total={elapsed:6.2f}s  size={output_bytes / 1024:8.1f}KB")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 50, 500])
+    parser.add_argument('--theme', default='dark')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run(args.sizes, args.theme, args.repeat)
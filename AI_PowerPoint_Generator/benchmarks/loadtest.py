@@ -0,0 +1,424 @@
+"""
+Load test of /generate against stubbed upstreams
+
+Drives the app with a mix of deck sizes, image counts and enhancement modes,
+either in this process through the Flask test client or through gunicorn
+(``benchmarks.loadtest_app``) with its worker and thread settings. Gemini is
+a fake client, Pexels and the images are local stub servers; each has a
+tunable latency and error rate. Caches are off unless ``--caches`` is given
+and every deck has its own title, so every request goes upstream.
+
+Reports requests/sec, latency percentiles overall, per stage (from the
+Server-Timing header) and per mix, error rates, upstream call counts and
+peak RSS per worker, and saves them as JSON. ``--compare`` prints saved
+runs side by side, for example one per gunicorn setting.
+
+Usage:
+    python -m benchmarks.loadtest [--target client|gunicorn] [--workers 2] [--threads 4]
+        [--concurrency 8] [--requests 200 | --duration 60] [--slides 5 20] [--images 0 2]
+        [--modes none polish] [--gemini-latency 0.5] [--gemini-error-rate 0.05]
+        [--upstream-latency 0.05] [--upstream-error-rate 0.05] [-o results.json]
+    python -m benchmarks.loadtest --compare w2-t4.json w4-t2.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from benchmarks.stubs import ImageServer, PexelsServer
+
+PPTX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+MODES = ('none', 'polish', 'expand', 'notes')
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def app_environment(args, pexels: PexelsServer) -> Dict[str, str]:
+    """Environment that points the app at the stubs; read by the app's modules when imported"""
+    env = {
+        'PEXELS_API_URL': pexels.search_url,
+        'PEXELS_API_KEY': 'loadtest',
+        'GEMINI_RPM': str(args.gemini_rpm),
+        'METRICS_TIMING_HEADER': '1',
+        'LOADTEST_GEMINI_LATENCY': str(args.gemini_latency),
+        'LOADTEST_GEMINI_PER_SLIDE': str(args.gemini_per_slide),
+        'LOADTEST_GEMINI_ERROR_RATE': str(args.gemini_error_rate),
+    }
+    if not args.caches:
+        env.update({'GEMINI_CACHE': '', 'PEXELS_CACHE_TTL': '0', 'IMAGE_CACHE_DIR': '', 'DECK_CACHE_DIR': ''})
+    return env
+
+def make_request(index: int, args, image_server: ImageServer) -> tuple:
+    """
+    The ``index``-th request of a run: a /generate form drawn from the mix
+    
+    Each request draws from its own seeded generator, so runs with other
+    concurrency settings send the same requests.
+    
+    Returns:
+        ``(mix label, form)``
+    """
+    rng = random.Random(index)
+    slides = rng.choice(args.slides)
+    images = min(rng.choice(args.images), slides)
+    mode = rng.choice(args.modes)
+    
+    form = {'title': f'Load test deck {index}', 'theme': 'corporate', 'tone': 'professional', 'max_bullets': '3'}
+    if mode != 'none':
+        form.update({'enhance_ai': 'on', 'enhancement_mode': mode})
+    for i in range(slides):
+        form[f'slide_title_{i}'] = f'Slide {i + 1}'
+        form[f'slide_bullets_{i}'] = 'First point\nSecond point\nThird point'
+        if i < images:
+            # A small shared pool of pictures, as real decks reuse stock photos
+            form[f'slide_image_url_{i}'] = image_server.url(f"photo{(index + i) % 16}.png")
+    return f"{slides} slides/{images} images/{mode}", form
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """Stage durations in seconds from a Server-Timing header, summing repeated stages"""
+    stages = defaultdict(float)
+    for entry in filter(None, (part.strip() for part in header.split(','))):
+        name, _, duration = entry.partition(';dur=')
+        if duration:
+            stages[name] += float(duration) / 1000
+    return dict(stages)
+
+def classify(status: int, content_type: str) -> str:
+    """``ok`` for a deck; failed generations render an error page with a 200"""
+    if status == 200 and content_type.startswith(PPTX_MIMETYPE):
+        return 'ok'
+    if status == 200:
+        return 'error page'
+    return f"http {status}"
+
+class ClientTarget:
+    """The app in this process, one Flask test client per load thread"""
+    
+    name = 'client'
+    
+    def __init__(self, env: Dict[str, str]):
+        self.env = env
+        self._local = threading.local()
+    
+    def __enter__(self):
+        os.environ.update(self.env)
+        import logging
+        from benchmarks.loadtest_app import app
+        logging.getLogger().setLevel(logging.WARNING)
+        self.app = app
+        return self
+    
+    def __exit__(self, *exc):
+        pass
+    
+    def post(self, form: Dict[str, str]) -> tuple:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.post('/generate', data=form)
+        try:
+            body = response.get_data()
+            return response.status_code, response.content_type or '', response.headers.get('Server-Timing', ''), len(body)
+        finally:
+            response.close()
+    
+    def workers(self) -> List[Dict]:
+        return [{
+            'pid': os.getpid(),
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }]
+    
+    def upstream(self) -> Dict:
+        from benchmarks.loadtest_app import gemini
+        return {'gemini': {'calls': gemini.client.calls, 'errors': gemini.client.errors}}
+
+class GunicornTarget:
+    """
+    The app under gunicorn with gunicorn.conf.py, on a free local port
+    
+    Worker and thread counts go through GUNICORN_WORKERS/GUNICORN_THREADS,
+    as in production. The server's log is kept in a temporary file and
+    printed if it fails to start.
+    """
+    
+    name = 'gunicorn'
+    
+    def __init__(self, env: Dict[str, str], workers: int, threads: int):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        self.env = dict(os.environ, **env, GUNICORN_BIND=f"127.0.0.1:{self.port}",
+                        GUNICORN_WORKERS=str(workers), GUNICORN_THREADS=str(threads))
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._local = threading.local()
+        self.process = None
+    
+    def __enter__(self):
+        import requests
+        self.log = tempfile.NamedTemporaryFile(prefix='loadtest-gunicorn-', suffix='.log', delete=False)
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'benchmarks.loadtest_app:app'],
+            cwd=PROJECT_DIR, env=self.env, stdout=self.log, stderr=subprocess.STDOUT
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                if requests.get(self.url + '/', timeout=1).status_code == 200:
+                    return self
+            except requests.RequestException:
+                time.sleep(0.2)
+        self.__exit__()
+        with open(self.log.name) as f:
+            raise RuntimeError(f"gunicorn did not start:\n{f.read()[-4000:]}")
+    
+    def __exit__(self, *exc):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.log.close()
+    
+    def post(self, form: Dict[str, str]) -> tuple:
+        import requests
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        response = session.post(self.url + '/generate', data=form, timeout=600)
+        return (response.status_code, response.headers.get('Content-Type', ''),
+                response.headers.get('Server-Timing', ''), len(response.content))
+    
+    def workers(self) -> List[Dict]:
+        """Peak and current RSS of each worker process (children of the gunicorn master)"""
+        workers = []
+        for pid in os.listdir('/proc'):
+            if not pid.isdigit():
+                continue
+            try:
+                with open(f'/proc/{pid}/stat') as f:
+                    parent = int(f.read().rsplit(')', 1)[1].split()[1])
+                if parent != self.process.pid:
+                    continue
+                with open(f'/proc/{pid}/status') as f:
+                    status = dict(line.split(':', 1) for line in f if ':' in line)
+            except (OSError, ValueError, IndexError):
+                continue
+            workers.append({
+                'pid': int(pid),
+                'peak_rss_mb': round(int(status['VmHWM'].split()[0]) / 1024, 1),
+                'rss_mb': round(int(status['VmRSS'].split()[0]) / 1024, 1),
+            })
+        return sorted(workers, key=lambda worker: worker['pid'])
+    
+    def upstream(self) -> Dict:
+        # The fake Gemini client lives in the workers
+        return {}
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+    
+    def at(fraction):
+        return values[min(len(values) - 1, int(len(values) * fraction))]
+    
+    return {
+        'p50': at(0.5), 'p90': at(0.9), 'p95': at(0.95), 'p99': at(0.99),
+        'max': values[-1], 'mean': sum(values) / len(values),
+    }
+
+def summarize(results: List[Dict], elapsed: float) -> Dict:
+    """Throughput, latency, per-stage and per-mix figures of a run"""
+    ok = [result for result in results if result['status'] == 'ok']
+    stages = defaultdict(list)
+    for result in ok:
+        for stage, seconds in result['stages'].items():
+            stages[stage].append(seconds)
+    by_mix = defaultdict(list)
+    for result in results:
+        by_mix[result['mix']].append(result)
+    
+    return {
+        'requests': len(results),
+        'elapsed': elapsed,
+        'requests_per_sec': len(results) / elapsed if elapsed else 0.0,
+        'ok_per_sec': len(ok) / elapsed if elapsed else 0.0,
+        'error_rate': 1 - len(ok) / len(results) if results else 0.0,
+        'errors': dict(Counter(result['status'] for result in results if result['status'] != 'ok')),
+        'latency': percentiles([result['latency'] for result in ok]),
+        'stages': {stage: percentiles(values) for stage, values in sorted(stages.items())},
+        'by_mix': {
+            mix: {
+                'requests': len(mix_results),
+                'error_rate': sum(result['status'] != 'ok' for result in mix_results) / len(mix_results),
+                'latency': percentiles([result['latency'] for result in mix_results if result['status'] == 'ok']),
+            }
+            for mix, mix_results in sorted(by_mix.items())
+        },
+    }
+
+def drive(target, plan: Callable[[int], tuple], concurrency: int, requests: int,
+          duration: Optional[float] = None) -> tuple:
+    """
+    Send planned requests from ``concurrency`` threads, each waiting for its response before the next
+    
+    Stops after ``requests`` requests, or when ``duration`` seconds have
+    passed if given.
+    
+    Returns:
+        ``(results, elapsed seconds)``
+    """
+    results = []
+    lock = threading.Lock()
+    next_index = iter(range(sys.maxsize))
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+    
+    def worker():
+        while True:
+            with lock:
+                index = next(next_index)
+            if (deadline is None and index >= requests) or (deadline and time.perf_counter() >= deadline):
+                return
+            mix, form = plan(index)
+            sent = time.perf_counter()
+            try:
+                status, content_type, timing, size = target.post(form)
+                result = {'status': classify(status, content_type), 'stages': parse_server_timing(timing), 'bytes': size}
+            except Exception as e:
+                result = {'status': f"exception {type(e).__name__}", 'stages': {}, 'bytes': 0}
+            result.update(mix=mix, latency=time.perf_counter() - sent)
+            with lock:
+                results.append(result)
+    
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='loadtest') as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return results, time.perf_counter() - started
+
+def run(args) -> Dict:
+    with ImageServer(latency=args.upstream_latency, error_rate=args.upstream_error_rate) as image_server, \
+            PexelsServer(latency=args.upstream_latency, photo_base=image_server.base_url,
+                         error_rate=args.upstream_error_rate) as pexels:
+        env = app_environment(args, pexels)
+        if args.target == 'gunicorn':
+            target = GunicornTarget(env, args.workers, args.threads)
+        else:
+            target = ClientTarget(env)
+        
+        with target:
+            def plan(index):
+                return make_request(index, args, image_server)
+            
+            # Warm-up requests (lazy clients, first template clones) are not recorded
+            drive(target, lambda index: plan(-1 - index), min(args.concurrency, args.warmup), args.warmup)
+            image_server.requests = pexels.requests = image_server.errors = pexels.errors = 0
+            
+            results, elapsed = drive(target, plan, args.concurrency, args.requests, args.duration)
+            workers = target.workers()
+            upstream = target.upstream()
+        
+        upstream['pexels'] = {'requests': pexels.requests, 'errors': pexels.errors,
+                              'peak_in_flight': pexels.peak_in_flight}
+        upstream['images'] = {'requests': image_server.requests, 'errors': image_server.errors,
+                              'peak_in_flight': image_server.peak_in_flight}
+    
+    from benchmarks.suite import git_revision
+    config = {key: value for key, value in vars(args).items() if key not in ('compare', 'output')}
+    if args.target == 'client':
+        config.pop('workers')
+        config.pop('threads')
+    return {
+        'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'revision': git_revision()},
+        'config': config,
+        'summary': summarize(results, elapsed),
+        'workers': workers,
+        'upstream': upstream,
+    }
+
+def run_label(report: Dict) -> str:
+    config = report['config']
+    if config['target'] == 'gunicorn':
+        return f"gunicorn w={config['workers']} t={config['threads']} c={config['concurrency']}"
+    return f"client c={config['concurrency']}"
+
+def print_report(report: Dict):
+    summary = report['summary']
+    latency = summary['latency']
+    print(f"{run_label(report)}: {summary['requests']} requests in {summary['elapsed']:.1f}s, "
+          f"{summary['requests_per_sec']:.2f} req/s, error rate {summary['error_rate']:.1%} {summary['errors'] or ''}")
+    if latency:
+        print(f"  latency p50={latency['p50']:.3f}s p90={latency['p90']:.3f}s p99={latency['p99']:.3f}s "
+              f"max={latency['max']:.3f}s")
+    for stage, stats in summary['stages'].items():
+        print(f"  stage {stage:<20} p50={stats['p50'] * 1000:9.1f}ms  p95={stats['p95'] * 1000:9.1f}ms  "
+              f"max={stats['max'] * 1000:9.1f}ms")
+    for mix, stats in summary['by_mix'].items():
+        p50 = stats['latency'].get('p50')
+        print(f"  mix {mix:<30} n={stats['requests']:<5} errors={stats['error_rate']:6.1%}  "
+              f"p50={'-' if p50 is None else f'{p50:.3f}s'}")
+    for worker in report['workers']:
+        print(f"  worker {worker['pid']:<8} peak RSS={worker['peak_rss_mb']:7.1f}MB")
+    for name, stats in report['upstream'].items():
+        print(f"  upstream {name:<8} " + '  '.join(f"{key}={value}" for key, value in stats.items()))
+
+def compare(paths: List[str]):
+    """Print saved runs side by side"""
+    print(f"{'run':<34} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>8} {'max RSS':>9}")
+    for path in paths:
+        with open(path) as f:
+            report = json.load(f)
+        summary = report['summary']
+        latency = summary['latency'] or {'p50': 0, 'p95': 0, 'p99': 0}
+        peak_rss = max((worker['peak_rss_mb'] for worker in report['workers']), default=0)
+        print(f"{run_label(report):<34} {summary['requests_per_sec']:8.2f} {latency['p50']:7.2f}s "
+              f"{latency['p95']:7.2f}s {latency['p99']:7.2f}s {summary['error_rate']:8.1%} {peak_rss:7.1f}MB")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--target', choices=['client', 'gunicorn'], default='client')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker')
+    parser.add_argument('--concurrency', type=int, default=8, help='Requests kept in flight')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--duration', type=float, help='Run for this many seconds instead of --requests')
+    parser.add_argument('--warmup', type=int, default=4)
+    parser.add_argument('--slides', type=int, nargs='+', default=[5, 20], help='Deck sizes to draw from')
+    parser.add_argument('--images', type=int, nargs='+', default=[0, 2], help='Image URLs per deck to draw from')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=['none', 'polish'],
+                        help="Enhancement modes to draw from ('none' skips enhancement)")
+    parser.add_argument('--gemini-latency', type=float, default=0.5)
+    parser.add_argument('--gemini-per-slide', type=float, default=0.0)
+    parser.add_argument('--gemini-error-rate', type=float, default=0.0)
+    parser.add_argument('--gemini-rpm', type=float, default=0, help='Gemini rate budget per worker (0 = unlimited)')
+    parser.add_argument('--upstream-latency', type=float, default=0.05, help='Pexels and image server latency')
+    parser.add_argument('--upstream-error-rate', type=float, default=0.0)
+    parser.add_argument('--caches', action='store_true', help='Keep the Gemini, Pexels, image and deck caches on')
+    parser.add_argument('-o', '--output', help='Results file (default: named after the target and settings)')
+    parser.add_argument('--compare', nargs='+', metavar='RESULTS', help='Print saved runs side by side and exit')
+    args = parser.parse_args(argv)
+    
+    if args.compare:
+        compare(args.compare)
+        return 0
+    
+    report = run(args)
+    print_report(report)
+    output = args.output or f"loadtest-{run_label(report).replace(' ', '-').replace('=', '')}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,25 @@
+"""
+WSGI entry point for load tests: the app with a fake Gemini client
+
+Used by ``benchmarks.loadtest`` both in process and as the gunicorn app
+(``gunicorn -c gunicorn.conf.py benchmarks.loadtest_app:app``). Pexels,
+images and caches are pointed at the stubs through the app's own
+environment variables; only the Gemini client needs replacing here,
+configured by ``LOADTEST_GEMINI_LATENCY``, ``LOADTEST_GEMINI_PER_SLIDE``
+and ``LOADTEST_GEMINI_ERROR_RATE``. With gunicorn's preload the client is
+installed in the master and inherited by every worker.
+"""
+import os
+from services import gemini
+from benchmarks.stubs import FakeGeminiClient
+from app import app
+
+# Re-exported as the WSGI app gunicorn loads
+__all__ = ['app']
+
+gemini.client = FakeGeminiClient(
+    latency=float(os.environ.get("LOADTEST_GEMINI_LATENCY", "0.5")),
+    per_slide=float(os.environ.get("LOADTEST_GEMINI_PER_SLIDE", "0.0")),
+    error_rate=float(os.environ.get("LOADTEST_GEMINI_ERROR_RATE", "0.0")),
+    record_prompts=False,
+)
@@ -0,0 +1,262 @@
+"""Local stub servers used by the benchmarks and tests"""
+import io
+import re
+import asyncio
+import json
+import hashlib
+import time
+import random
+import threading
+from types import SimpleNamespace
+from urllib.parse import urlparse, parse_qs, quote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PIL import Image
+
+def make_png(width: int = 64, height: int = 48, color: str = '#3498db') -> bytes:
+    """Return the bytes of a solid-colour PNG"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+class _Server(ThreadingHTTPServer):
+    # Load tests open hundreds of connections at once
+    request_queue_size = 1024
+    daemon_threads = True
+
+class StubServer:
+    """
+    Threaded keep-alive HTTP server on a random local port
+    
+    Subclasses implement ``respond(path, query, headers)`` returning
+    ``(status, response_headers, body)``. Latency can be set server-wide or per
+    request with a ``delay=<seconds>`` query parameter. A fraction
+    ``error_rate`` of requests (drawn from a seeded generator) get an empty
+    503 instead. Tracks request, error and connection counts and the peak
+    number of requests in flight.
+    """
+    
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self._server = _Server(('127.0.0.1', 0), self._handler())
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def respond(self, path: str, query: dict, headers) -> tuple:
+        raise NotImplementedError
+    
+    def _handler(self):
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+            
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    stub.in_flight += 1
+                    stub.peak_in_flight = max(stub.peak_in_flight, stub.in_flight)
+                try:
+                    parsed = urlparse(self.path)
+                    query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                    time.sleep(float(query.get('delay', stub.latency)))
+                    if stub._fails():
+                        status, headers, body = 503, {}, b''
+                    else:
+                        status, headers, body = stub.respond(parsed.path, query, self.headers)
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+    
+    def _fails(self) -> bool:
+        with self._lock:
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return failed
+    
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+class ImageServer(StubServer):
+    """
+    Serves the same image for every path
+    
+    Responses carry an ETag and honour If-None-Match; ``not_modified``
+    counts the 304s sent.
+    """
+    
+    def __init__(self, latency: float = 0.0, body: bytes = None, content_type: str = 'image/png',
+                 error_rate: float = 0.0):
+        super().__init__(latency, error_rate)
+        self.body = body if body is not None else make_png()
+        self.content_type = content_type
+        self.not_modified = 0
+    
+    @property
+    def etag(self) -> str:
+        return f'"{hashlib.sha1(self.body).hexdigest()}"'
+    
+    def url(self, name: str, delay: float = None) -> str:
+        suffix = f"?delay={delay}" if delay is not None else ""
+        return f"{self.base_url}/{name}{suffix}"
+    
+    def respond(self, path, query, headers):
+        if headers.get('If-None-Match') == self.etag:
+            with self._lock:
+                self.not_modified += 1
+            return 304, {'ETag': self.etag}, b''
+        return 200, {'Content-Type': self.content_type, 'ETag': self.etag}, self.body
+
+class PexelsServer(StubServer):
+    """
+    Fake Pexels search API
+    
+    Every search returns one photo whose URL encodes the query, so callers
+    can check which query produced which result. Photos are served from
+    ``photo_base`` (for example an ImageServer) when given, otherwise they
+    point back at this server and 404.
+    """
+    
+    def __init__(self, latency: float = 0.0, photo_base: str = None, error_rate: float = 0.0):
+        super().__init__(latency, error_rate)
+        self.photo_base = photo_base
+    
+    @property
+    def search_url(self) -> str:
+        return f"{self.base_url}/v1/search"
+    
+    def photo_url(self, query: str) -> str:
+        return f"{self.photo_base or self.base_url}/photos/{quote(query)}.jpg"
+    
+    def respond(self, path, query, headers):
+        if path != '/v1/search':
+            return 404, {'Content-Type': 'application/json'}, b'{}'
+        photo = {'src': {'medium': self.photo_url(query.get('query', ''))}}
+        return 200, {'Content-Type': 'application/json'}, json.dumps({'photos': [photo]}).encode()
+
+class RateLimitError(Exception):
+    """What google-genai raises for an HTTP 429: the status is the error's ``code``"""
+    
+    code = 429
+
+class ServerError(Exception):
+    """What google-genai raises when Gemini is overloaded (HTTP 503)"""
+    
+    code = 503
+
+class FakeGeminiClient:
+    """
+    Stand-in for ``genai.Client`` that answers enhancement prompts locally
+    
+    Each call sleeps ``latency + per_slide * slides`` seconds, roughly how
+    response time grows with output length, then echoes the prompt's slides
+    with an "Enhanced" prefix. ``fail_when`` is an optional predicate on the
+    user prompt; matching calls return malformed JSON. The first
+    ``rate_limited`` calls raise RateLimitError instead of answering, and a
+    fraction ``error_rate`` of the rest raise ServerError. Prompts are kept
+    in ``prompts`` unless ``record_prompts`` is off (long load tests).
+    ``client.aio.models.generate_content`` is the same call, awaited.
+    """
+    
+    def __init__(self, latency: float = 0.0, per_slide: float = 0.0, fail_when=None, rate_limited: int = 0,
+                 error_rate: float = 0.0, record_prompts: bool = True):
+        self.latency = latency
+        self.per_slide = per_slide
+        self.fail_when = fail_when
+        self.rate_limited = rate_limited
+        self.error_rate = error_rate
+        self.record_prompts = record_prompts
+        self.calls = 0
+        self.errors = 0
+        self.prompts = []
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self.models = self
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self.generate_content_async))
+    
+    def generate_content(self, model, contents, config=None):
+        prompt = self._record(contents)
+        titles = re.findall(r'^  Title: (.*)$', prompt, re.MULTILINE)
+        time.sleep(self.latency + self.per_slide * len(titles))
+        return SimpleNamespace(text=self._respond(prompt, titles))
+    
+    async def generate_content_async(self, model, contents, config=None):
+        prompt = self._record(contents)
+        titles = re.findall(r'^  Title: (.*)$', prompt, re.MULTILINE)
+        await asyncio.sleep(self.latency + self.per_slide * len(titles))
+        return SimpleNamespace(text=self._respond(prompt, titles))
+    
+    def generate_content_stream(self, model, contents, config=None):
+        """
+        Stream the same response in pieces: ``latency`` before the first
+        piece, then about ``per_slide`` seconds of text per slide
+        """
+        prompt = self._record(contents)
+        titles = re.findall(r'^  Title: (.*)$', prompt, re.MULTILINE)
+        text = self._respond(prompt, titles)
+        
+        time.sleep(self.latency)
+        piece_size = 16
+        pieces = [text[i:i + piece_size] for i in range(0, len(text), piece_size)]
+        delay = self.per_slide * len(titles) / len(pieces)
+        for piece in pieces:
+            time.sleep(delay)
+            yield SimpleNamespace(text=piece)
+    
+    def _record(self, contents) -> str:
+        prompt = contents[0].parts[0].text
+        with self._lock:
+            self.calls += 1
+            if self.record_prompts:
+                self.prompts.append(prompt)
+            if self.calls <= self.rate_limited:
+                raise RateLimitError("429 RESOURCE_EXHAUSTED")
+            if self.error_rate > 0 and self._random.random() < self.error_rate:
+                self.errors += 1
+                raise ServerError("503 UNAVAILABLE")
+        return prompt
+    
+    def _respond(self, prompt: str, titles: list) -> str:
+        if self.fail_when and self.fail_when(prompt):
+            return '{"title": "truncated", "slides": ['
+        
+        deck_title = re.search(r'^Title: (.*)$', prompt, re.MULTILINE).group(1)
+        return json.dumps({
+            'title': f"Enhanced {deck_title}",
+            'slides': [
+                {'title': f"Enhanced {title}", 'bullets': ['Clearer point'], 'image_keywords': ['office']}
+                for title in titles
+            ]
+        })
@@ -0,0 +1,260 @@
+"""
+Generation pipeline benchmark suite with JSON results
+
+Times the hot paths of the app against local stubs (fake Gemini client,
+fake Pexels API and image server), so runs are repeatable offline:
+
+- ``generate_ppt`` at several deck sizes, with and without images
+- ``build_system_prompt``/``build_user_prompt``
+- ``validate_presentation_data``
+- fitting the text of a 500-slide batch to its boxes (``fit_text``), cold caches
+- a full ``POST /generate`` through the Flask test client, with enhancement,
+  rendered and served from the deck cache
+- regenerating a deck session after a one-slide edit (``run_incremental_pipeline``)
+
+Each case reports min/median/mean/max seconds and the process's peak RSS so
+far. Results are written as JSON; pass ``--compare`` with an earlier file to
+flag cases whose median got slower than ``--threshold``.
+
+Usage:
+    python -m benchmarks.suite [-o results.json] [--repeat 5] [--quick]
+        [--compare baseline.json] [--threshold 0.25] [--only generate_ppt]
+"""
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import argparse
+import resource
+import statistics
+import subprocess
+from typing import Callable, Dict, List
+from models import Deck, Slide
+from services import deck_cache, font_metrics, gemini, images, ppt_generator
+from services.gemini import build_system_prompt, build_user_prompt
+from services.pipeline import run_incremental_pipeline
+from services.ppt_generator import generate_ppt
+from services.sessions import DeckSessionStore
+from services.text_fit import fit_text
+from services.themes import get_theme
+from services.validators import validate_presentation_data
+from benchmarks.stubs import FakeGeminiClient, ImageServer, PexelsServer
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def measure(func: Callable[[], object], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Run ``func`` ``warmup`` times untimed, then ``repeat`` timed rounds"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return {
+        'rounds': repeat,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        'max': max(timings),
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+def make_slides(count: int, image_url: Callable[[int], str] = None) -> List[Slide]:
+    return [
+        Slide(
+            title=f'Slide {i + 1}',
+            bullets=[f'Point {j + 1} of slide {i + 1}' for j in range(4)],
+            image_url=image_url(i) if image_url else None,
+        )
+        for i in range(count)
+    ]
+
+def generate_once(slides: List[Slide], theme: Dict):
+    os.remove(generate_ppt("Benchmark deck", slides, theme))
+
+def fit_deck(slides: List[Slide], font_name: str):
+    """Fit every title and bullet list of a deck, as the layout does, from a cold width cache"""
+    font_metrics.text_width.cache_clear()
+    for slide in slides:
+        fit_text([slide.title], font_name, 864, 90, ppt_generator.TITLE_SIZE, ppt_generator.MIN_TITLE_SIZE, bold=True)
+        fit_text(slide.bullets, font_name, 864, 356, ppt_generator.BODY_SIZE, ppt_generator.MIN_BODY_SIZE,
+                 indent=ppt_generator.BULLET_INDENT, space_before=ppt_generator.BULLET_SPACE_BEFORE)
+
+def generate_form(slides: int) -> Dict[str, str]:
+    form = {'title': 'Quarterly Review', 'theme': 'corporate', 'enhance_ai': 'on',
+            'enhancement_mode': 'polish', 'tone': 'professional', 'max_bullets': '3'}
+    for i in range(slides):
+        form[f'slide_title_{i}'] = f'Slide {i + 1}'
+        form[f'slide_bullets_{i}'] = 'First point\nSecond point'
+    return form
+
+def session_editor(store: DeckSessionStore, slides: List[Slide]) -> Callable[[], None]:
+    """Render a deck session once, then return a callable that edits one slide and regenerates it"""
+    deck = Deck(title='Session benchmark', slides=slides, theme='corporate')
+    session_id = store.new_id()
+    edits = []
+    
+    def regenerate():
+        previous = store.get(session_id)
+        buffer, _, state = run_incremental_pipeline(
+            deck, previous and previous['state'], previous and store.deck_path(previous)
+        )
+        with buffer:
+            store.save(session_id, state, buffer, 'session.pptx')
+    
+    def edit():
+        edits.append(None)
+        deck.slides[len(slides) // 2] = Slide(title=f'Edit {len(edits)}', bullets=['Changed point'])
+        regenerate()
+    
+    regenerate()
+    return edit
+
+def build_cases(image_server: ImageServer, sizes: List[int]) -> Dict[str, Callable]:
+    """Map case name to a zero-argument callable"""
+    theme = get_theme('corporate')
+    cases = {}
+    
+    for size in sizes:
+        bullets = make_slides(size)
+        cases[f'generate_ppt[{size} slides]'] = lambda slides=bullets: generate_once(slides, theme)
+        # A few distinct pictures reused across the deck, as real decks do
+        pictures = make_slides(size, lambda i: image_server.url(f"photo{i % 8}.png"))
+        cases[f'generate_ppt[{size} slides, images]'] = lambda slides=pictures: generate_once(slides, theme)
+    
+    store = DeckSessionStore(os.path.join(tempfile.gettempdir(), 'ppt-benchmark-sessions'))
+    for size in sizes:
+        cases[f'regenerate_session[{size} slides, 1 edited]'] = session_editor(store, make_slides(size))
+    
+    deck = Deck(title='Prompt benchmark', slides=make_slides(max(sizes)))
+    cases['build_system_prompt'] = lambda: build_system_prompt('expand', 3, 'professional')
+    cases[f'build_user_prompt[{max(sizes)} slides]'] = lambda: build_user_prompt(deck)
+    cases[f'validate_presentation_data[{max(sizes)} slides]'] = lambda: validate_presentation_data(
+        deck.title, deck.slides
+    )
+    
+    batch = [
+        Slide(title=f'Quarterly review of region {i} and the plan for next year',
+              bullets=[f'Revenue in segment {j} grew {i % 40 + j}% against a forecast of {i % 30}%'
+                       for j in range(3 + i % 6)])
+        for i in range(500)
+    ]
+    cases['fit_text[500 slides]'] = lambda: fit_deck(batch, theme.get('font_name', 'Arial'))
+    
+    from app import create_app
+    app = create_app()
+    client = app.test_client()
+    form = generate_form(10)
+    
+    def post_generate():
+        response = client.post('/generate', data=form)
+        assert response.status_code == 200, response.status_code
+        response.get_data()
+        response.close()
+    
+    cases['POST /generate[10 slides, enhanced]'] = post_generate
+    
+    cache = deck_cache.DeckCache(tempfile.mkdtemp(prefix='ppt-benchmark-decks-'))
+    
+    def post_generate_cached():
+        deck_cache._deck_cache = cache
+        try:
+            post_generate()
+        finally:
+            deck_cache._deck_cache = None
+    
+    cases['POST /generate[10 slides, enhanced, cached]'] = post_generate_cached
+    return cases
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[Dict]:
+    """
+    Find cases whose median regressed against a baseline run
+    
+    Returns:
+        One entry per regressed case with the old and new medians and the ratio
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        old = baseline.get('results', {}).get(name)
+        if not old or not old['median']:
+            continue
+        ratio = result['median'] / old['median']
+        if ratio > 1 + threshold:
+            regressions.append({'case': name, 'baseline': old['median'], 'current': result['median'], 'ratio': ratio})
+    return regressions
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              timeout=5).stdout.strip()
+    except Exception:
+        return ''
+
+def run(repeat: int, sizes: List[int], only: str = None) -> Dict:
+    # Measure every call end to end rather than enhancement cache hits
+    gemini.GEMINI_CACHE = ""
+    gemini._enhancement_cache = None
+    gemini.client = FakeGeminiClient()
+    deck_cache.DECK_CACHE_DIR = ""
+    deck_cache._deck_cache = None
+    os.environ.setdefault("PEXELS_API_KEY", "benchmark")
+    
+    with ImageServer() as image_server, PexelsServer(photo_base=image_server.base_url) as pexels_server:
+        images.PEXELS_SEARCH_URL = pexels_server.search_url
+        cases = build_cases(image_server, sizes)
+        
+        results = {}
+        for name, func in cases.items():
+            if only and only not in name:
+                continue
+            results[name] = measure(func, repeat)
+            print(f"  {name:<42} median={results[name]['median'] * 1000:9.2f}ms  "
+                  f"min={results[name]['min'] * 1000:9.2f}ms  rss={results[name]['peak_rss_mb']:7.1f}MB")
+    
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+        },
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'results': results,
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-o', '--output', default='benchmark-results.json')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 50, 200])
+    parser.add_argument('--quick', action='store_true', help='Small decks and two rounds, for CI smoke runs')
+    parser.add_argument('--only', help='Run only cases whose name contains this text')
+    parser.add_argument('--compare', help='Earlier results file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed median slowdown (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+    
+    repeat, sizes = (2, [5, 20]) if args.quick else (args.repeat, args.sizes)
+    report = run(repeat, sizes, args.only)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"peak RSS {report['peak_rss_mb']:.1f}MB, results written to {args.output}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['case']}: {regression['baseline'] * 1000:.2f}ms -> "
+                  f"{regression['current'] * 1000:.2f}ms ({regression['ratio']:.2f}x)")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
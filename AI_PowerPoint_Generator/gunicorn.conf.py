@@ -0,0 +1,12 @@
+"""gunicorn settings: load the app in the master and warm heavy imports before forking workers"""
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "2"))
+# More than one thread per worker switches to the gthread worker
+threads = int(os.environ.get("GUNICORN_THREADS", "1"))
+preload_app = True
+
+def on_starting(server):
+    from app import warm_up
+    warm_up()
@@ -0,0 +1,87 @@
+"""Typed deck and slide models passed through every stage of the generation pipeline"""
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional
+
+@dataclass(slots=True)
+class Slide:
+    """
+    One content slide
+
+    Slides are built once where data enters the app (the form, a JSON deck
+    spec, a Gemini response) and then handed from stage to stage as they
+    are; a stage that needs a different slide (an enhanced one, or one with
+    a suggested image) makes one with ``dataclasses.replace``, since decks
+    are shared with the deck cache and sessions. ``image_digest`` is the SHA-256 of an uploaded
+    ``image_path``, when known.
+    """
+
+    title: str
+    bullets: List[str] = field(default_factory=list)
+    image_url: Optional[str] = None
+    image_path: Optional[str] = None
+    image_digest: Optional[str] = None
+    image_keywords: Optional[List[str]] = None
+    speaker_notes: Optional[str] = None
+
+    @property
+    def has_image(self) -> bool:
+        return bool(self.image_url or self.image_path)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Slide':
+        """Build a slide from JSON data; empty optional fields become None"""
+        return cls(
+            title=str(data.get('title') or ''),
+            bullets=list(data.get('bullets') or []),
+            image_url=data.get('image_url') or None,
+            image_path=data.get('image_path') or None,
+            image_digest=data.get('image_digest') or None,
+            image_keywords=data.get('image_keywords') or None,
+            speaker_notes=data.get('speaker_notes') or None,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON form of the slide, leaving out unset fields"""
+        data = {'title': self.title, 'bullets': self.bullets}
+        for name in _OPTIONAL_SLIDE_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value
+        return data
+
+_OPTIONAL_SLIDE_FIELDS = tuple(f.name for f in fields(Slide) if f.name not in ('title', 'bullets'))
+
+@dataclass(slots=True)
+class Deck:
+    """
+    A presentation to generate: its content plus the enhancement and theme options
+
+    ``stream`` is None to follow GEMINI_STREAM, or a per-deck override.
+    """
+
+    title: str
+    slides: List[Slide]
+    theme: str = 'default'
+    tone: str = 'professional'
+    enhance_ai: bool = False
+    enhancement_mode: str = 'polish'
+    max_bullets: int = 3
+    stream: Optional[bool] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Deck':
+        """Rebuild a deck stored with to_dict"""
+        return cls(**{**data, 'slides': [Slide.from_dict(slide) for slide in data['slides']]})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON form of the deck, for queues that store it as text"""
+        return {
+            'title': self.title,
+            'slides': [slide.to_dict() for slide in self.slides],
+            'theme': self.theme,
+            'tone': self.tone,
+            'enhance_ai': self.enhance_ai,
+            'enhancement_mode': self.enhancement_mode,
+            'max_bullets': self.max_bullets,
+            'stream': self.stream,
+        }
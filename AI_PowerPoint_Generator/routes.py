@@ -1,71 +1,182 @@
 import os
-import logging
+import re
+import json
+import time
 import tempfile
-from flask import Blueprint, render_template, request, flash, redirect, url_for, send_file, jsonify
-from werkzeug.utils import secure_filename
-from services.ppt_generator import generate_ppt
-from services.themes import get_available_themes, get_theme
-from services.gemini import enhance_presentation
+import logging
+import threading
+from flask import (
+    Blueprint, current_app, g, render_template, request, flash, redirect, url_for, send_file, jsonify
+)
+from werkzeug.exceptions import HTTPException
+from models import Deck, Slide
+from services.themes import get_available_themes
 from services.validators import validate_presentation_data, slugify_title
-from services.images import get_image_suggestions, download_image
+from services.jobs import JobRunner, create_job_queue
+from services.sessions import DeckSessionStore
+from services.deck_cache import deck_key, get_deck_cache
+from services import metrics
 
 main_bp = Blueprint('main', __name__)
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+PPTX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+DECK_KEY_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+_job_runner_lock = threading.Lock()
+
+def run_pipeline(deck: Deck, progress=None):
+    """Run the generation pipeline, importing it (python-pptx, google-genai, Pillow) on first use"""
+    from services.pipeline import run_pipeline as pipeline
+    return pipeline(deck, progress)
+
+def run_incremental_pipeline(deck: Deck, previous=None, previous_path=None):
+    """Run the incremental pipeline, importing it on first use like run_pipeline"""
+    from services.pipeline import run_incremental_pipeline as pipeline
+    return pipeline(deck, previous, previous_path)
+
+async def run_pipeline_async(deck: Deck, progress=None):
+    """Run the async pipeline on the process-wide async runner, importing it on first use"""
+    from services.async_pipeline import get_async_runner
+    return await get_async_runner().run_pipeline(deck, progress)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def remove_uploads(paths):
+    """Delete uploaded slide images once a request is finished with them"""
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception as e:
+            logging.error(f"Error cleaning up files: {e}")
+
+@main_bp.before_app_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    metrics.REQUESTS_IN_FLIGHT.inc()
+    metrics.start_request_timing()
+
+@main_bp.after_app_request
+def record_request_metrics(response):
+    """Record request latency and optionally expose the stage timings"""
+    started = g.get('request_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    metrics.REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or 'unknown', status=response.status_code)
+    
+    timings = metrics.request_timings() or []
+    if metrics.METRICS_TIMING_HEADER:
+        response.headers['Server-Timing'] = metrics.server_timing_header(timings, elapsed)
+    if metrics.METRICS_TIMING_LOG:
+        stages = ' '.join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in timings)
+        logging.info(f"{request.method} {request.path} {response.status_code} {elapsed * 1000:.1f}ms {stages}")
+    return response
+
+@main_bp.teardown_app_request
+def finish_request_metrics(error=None):
+    # Runs even when the view raised, so the in-flight gauge never drifts
+    if g.pop('request_started', None) is not None:
+        metrics.REQUESTS_IN_FLIGHT.dec()
+
+@main_bp.teardown_app_request
+def discard_uploads(error=None):
+    # Spooled files no slide claimed, or left by a request aborted mid-upload
+    discard = getattr(request, 'discard_uploads', None)
+    if discard:
+        discard()
+
+@main_bp.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of this worker's metrics"""
+    return current_app.response_class(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @main_bp.route('/')
 def index():
     """Main page with presentation creation form"""
     themes = get_available_themes()
     return render_template('index.html', themes=themes)
 
+def parse_deck_form(uploads: list, errors: list) -> Deck:
+    """
+    Build a Deck from the submitted form, taking ownership of its spooled uploads
+    
+    Uploads that are not PNG or JPEG images, by name or by content, are left
+    out and reported in ``errors`` with their slide number.
+    """
+    # Extract form data
+    title = request.form.get('title', '').strip()
+    theme_name = request.form.get('theme', 'default')
+    enhance_ai = 'enhance_ai' in request.form
+    enhancement_mode = request.form.get('enhancement_mode', 'polish')
+    # Validate enhancement mode
+    valid_modes = ['polish', 'expand', 'notes']
+    if enhancement_mode not in valid_modes:
+        enhancement_mode = 'polish'
+    tone = request.form.get('tone', 'professional')
+    max_bullets = int(request.form.get('max_bullets', 3))
+    
+    # Extract slides data
+    slides = []
+    kept = {}
+    slide_count = 0
+    while f'slide_title_{slide_count}' in request.form:
+        slide_title = request.form.get(f'slide_title_{slide_count}', '').strip()
+        slide_bullets = request.form.get(f'slide_bullets_{slide_count}', '').strip()
+        slide_image_url = request.form.get(f'slide_image_url_{slide_count}', '').strip()
+        
+        # Uploads were spooled to disk and hashed while the form was parsed
+        slide_image_path = None
+        slide_image_digest = None
+        file = request.files.get(f'slide_image_file_{slide_count}')
+        if file and file.filename:
+            spool = file.stream
+            if not allowed_file(file.filename):
+                errors.append(f"Slide {slide_count + 1}: {file.filename} is not a PNG or JPEG image")
+            elif spool.rejected:
+                logging.warning(f"Slide {slide_count + 1}: Rejecting upload {file.filename}: {spool.rejected}")
+                errors.append(f"Slide {slide_count + 1}: {spool.rejected} ({file.filename})")
+            else:
+                # Identical files on several slides share one upload
+                slide_image_digest = spool.sha256
+                slide_image_path = kept.get(slide_image_digest)
+                if slide_image_path is None:
+                    slide_image_path = kept[slide_image_digest] = spool.keep()
+                    uploads.append(slide_image_path)
+        
+        slides.append(Slide(
+            title=slide_title,
+            bullets=[bullet.strip() for bullet in slide_bullets.split('\n') if bullet.strip()],
+            image_url=slide_image_url or None,
+            image_path=slide_image_path,
+            image_digest=slide_image_digest
+        ))
+        slide_count += 1
+    
+    return Deck(
+        title=title,
+        slides=slides,
+        theme=theme_name,
+        tone=tone,
+        enhance_ai=enhance_ai,
+        enhancement_mode=enhancement_mode,
+        max_bullets=max_bullets
+    )
+
 @main_bp.route('/generate', methods=['POST'])
 def generate():
     """Generate PowerPoint presentation"""
+    uploads = []
     try:
-        # Extract form data
-        title = request.form.get('title', '').strip()
-        theme_name = request.form.get('theme', 'default')
-        enhance_ai = 'enhance_ai' in request.form
-        enhancement_mode = request.form.get('enhancement_mode', 'polish')
-            # Validate enhancement mode
-        valid_modes = ['polish', 'expand', 'notes']
-        if enhancement_mode not in valid_modes:
-            enhancement_mode = 'polish'
-        tone = request.form.get('tone', 'professional')
-        max_bullets = int(request.form.get('max_bullets', 3))
-        
-        # Extract slides data
-        slides = []
-        slide_count = 0
-        while f'slide_title_{slide_count}' in request.form:
-            slide_title = request.form.get(f'slide_title_{slide_count}', '').strip()
-            slide_bullets = request.form.get(f'slide_bullets_{slide_count}', '').strip()
-            slide_image_url = request.form.get(f'slide_image_url_{slide_count}', '').strip()
-            
-            # Handle file upload
-            slide_image_path = None
-            if f'slide_image_file_{slide_count}' in request.files:
-                file = request.files[f'slide_image_file_{slide_count}']
-                if file and file.filename and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    filepath = os.path.join('temp_uploads', filename)
-                    file.save(filepath)
-                    slide_image_path = filepath
-            
-            slides.append({
-                'title': slide_title,
-                'bullets': [bullet.strip() for bullet in slide_bullets.split('\n') if bullet.strip()],
-                'image_url': slide_image_url,
-                'image_path': slide_image_path
-            })
-            slide_count += 1
+        errors = []
+        with metrics.span('parse_form'):
+            deck = parse_deck_form(uploads, errors)
         
         # Validate input data
-        errors = validate_presentation_data(title, slides)
+        with metrics.span('validate'):
+            errors += validate_presentation_data(deck.title, deck.slides)
         if errors:
             for error in errors:
                 flash(error, 'error')
@@ -74,78 +185,295 @@ def generate():
                                  message="Please fix the errors and try again.",
                                  errors=errors)
         
-        # Get theme
-        theme = get_theme(theme_name)
-        
-        # Prepare presentation data
-        presentation_data = {
-            'title': title,
-            'slides': slides,
-            'theme': theme_name,
-            'tone': tone
-        }
-        
-        # Enhance with AI if requested
-        if enhance_ai:
-            try:
-                logging.info(f"Enhancing presentation with mode: {enhancement_mode}")
-                enhanced_data = enhance_presentation(
-                    presentation_data, 
-                    enhancement_mode, 
-                    max_bullets, 
-                    tone
-                )
-                if enhanced_data:
-                    presentation_data = enhanced_data
-                    logging.info("AI enhancement completed successfully")
-                else:
-                    flash("AI enhancement failed, using original content", 'warning')
-            except Exception as e:
-                logging.error(f"AI enhancement error: {e}")
-                flash(f"AI enhancement failed: {str(e)}", 'warning')
-        
-        # Handle image suggestions if AI enhancement was used
-        for slide in presentation_data['slides']:
-            if not slide.get('image_url') and not slide.get('image_path'):
-                if 'image_keywords' in slide and slide['image_keywords']:
-                    try:
-                        image_url = get_image_suggestions(slide['image_keywords'])
-                        if image_url:
-                            slide['image_url'] = image_url
-                    except Exception as e:
-                        logging.warning(f"Failed to get image suggestions: {e}")
-        
-        # Generate PowerPoint
-        logging.info("Generating PowerPoint presentation")
-        ppt_path = generate_ppt(presentation_data['title'], presentation_data['slides'], theme)
+        # Identical submissions are served the stored deck; "Cache-Control:
+        # no-cache" or a no_cache form field renders afresh
+        cache = get_deck_cache()
+        location = None
+        if cache is None:
+            buffer, warnings = run_pipeline(deck)
+            etag = None
+        else:
+            key = deck_key(deck)
+            bypass = request.cache_control.no_cache or 'no_cache' in request.form
+            result = cache.get_or_render(key, lambda: run_pipeline(deck), bypass=bypass)
+            buffer, warnings, etag = result.file, result.warnings, result.etag
+            if etag:
+                location = url_for('main.get_cached_deck', key=key, name=slugify_title(deck.title))
+        for warning in warnings:
+            flash(warning, 'warning')
         
         # Generate filename
-        filename = f"{slugify_title(title)}.pptx"
+        filename = f"{slugify_title(deck.title)}.pptx"
         
-        # Send file and clean up
-        def remove_file(response):
-            try:
-                os.remove(ppt_path)
-                # Clean up uploaded images
-                for slide in slides:
-                    if slide.get('image_path') and os.path.exists(slide['image_path']):
-                        os.remove(slide['image_path'])
-            except Exception as e:
-                logging.error(f"Error cleaning up files: {e}")
-            return response
-        
-        return send_file(
-            ppt_path,
+        # Stream the buffer; werkzeug closes (and so frees) it with the response
+        response = send_file(
+            buffer,
             as_attachment=True,
             download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.presentationml.presentation'
+            mimetype=PPTX_MIMETYPE,
+            etag=etag or False
         )
-        
+        if location:
+            # Conditional GETs of the stored deck go to this URL
+            response.headers['Content-Location'] = location
+        return response
+    
+    except HTTPException:
+        # Oversized uploads abort with a 413 while the form is parsed
+        raise
     except Exception as e:
         logging.error(f"Error generating presentation: {e}")
         return render_template('error.html', 
                              title="Generation Error", 
                              message=f"Failed to generate presentation: {str(e)}")
+    
+    finally:
+        # Uploads are embedded in the deck (or no longer needed) either way
+        remove_uploads(uploads)
+
+@main_bp.route('/generate/<key>/<name>.pptx')
+def get_cached_deck(key, name):
+    """Serve a deck stored by the deck cache, answering If-None-Match with 304"""
+    cache = get_deck_cache()
+    stored = cache.open(key) if cache is not None and DECK_KEY_PATTERN.fullmatch(key) else None
+    if stored is None:
+        return jsonify({'errors': ['Deck not found']}), 404
+    
+    file, etag = stored
+    return send_file(
+        file,
+        as_attachment=True,
+        download_name=f"{slugify_title(name)}.pptx",
+        mimetype=PPTX_MIMETYPE,
+        etag=etag
+    )
+
+def get_job_runner() -> JobRunner:
+    """Return the app's background job runner, creating it on first use"""
+    with _job_runner_lock:
+        runner = current_app.extensions.get('job_runner')
+        if runner is None:
+            if current_app.config['JOB_ASYNC']:
+                from services.async_pipeline import get_async_runner
+                runner = JobRunner(
+                    create_job_queue(current_app.config['JOB_QUEUE']),
+                    run_pipeline_async,
+                    results_dir=current_app.config['JOB_RESULTS_DIR'],
+                    async_runner=get_async_runner(),
+                    concurrency=current_app.config['JOB_ASYNC_CONCURRENCY']
+                )
+            else:
+                runner = JobRunner(
+                    create_job_queue(current_app.config['JOB_QUEUE']),
+                    run_pipeline,
+                    workers=current_app.config['JOB_WORKERS'],
+                    results_dir=current_app.config['JOB_RESULTS_DIR']
+                )
+            current_app.extensions['job_runner'] = runner
+        return runner
+
+def job_status(job: dict) -> dict:
+    """Public view of a job for the status endpoint"""
+    status = {key: job[key] for key in ('id', 'status', 'stage', 'progress', 'warnings', 'error')}
+    status['status_url'] = url_for('main.get_job', job_id=job['id'])
+    if job['status'] == 'done':
+        status['download_url'] = url_for('main.download_job', job_id=job['id'])
+    return status
+
+@main_bp.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue a presentation for background generation"""
+    uploads = []
+    try:
+        errors = []
+        deck = parse_deck_form(uploads, errors)
+        errors += validate_presentation_data(deck.title, deck.slides)
+        if errors:
+            remove_uploads(uploads)
+            return jsonify({'errors': errors}), 400
+        
+        runner = get_job_runner()
+        job_id = runner.submit(deck, f"{slugify_title(deck.title)}.pptx", uploads)
+        return jsonify(job_status(runner.get(job_id))), 202
+    
+    except HTTPException:
+        remove_uploads(uploads)
+        raise
+    except Exception as e:
+        logging.error(f"Error queuing presentation: {e}")
+        remove_uploads(uploads)
+        return jsonify({'errors': [f"Failed to queue presentation: {str(e)}"]}), 500
+
+@main_bp.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Report a job's stage and progress"""
+    job = get_job_runner().get(job_id)
+    if not job:
+        return jsonify({'errors': ['Job not found']}), 404
+    return jsonify(job_status(job))
+
+@main_bp.route('/jobs/<job_id>/download')
+def download_job(job_id):
+    """Serve a finished job's presentation"""
+    runner = get_job_runner()
+    job = runner.get(job_id)
+    if not job:
+        return jsonify({'errors': ['Job not found']}), 404
+    if job['status'] != 'done':
+        return jsonify(job_status(job)), 409
+    
+    return send_file(
+        runner.result_path(job_id),
+        as_attachment=True,
+        download_name=job['filename'],
+        mimetype=PPTX_MIMETYPE
+    )
+
+def get_session_store() -> DeckSessionStore:
+    """Return the app's deck session store, creating it on first use"""
+    with _job_runner_lock:
+        store = current_app.extensions.get('deck_sessions')
+        if store is None:
+            store = DeckSessionStore(current_app.config['DECK_SESSION_DIR'])
+            current_app.extensions['deck_sessions'] = store
+        return store
+
+def session_status(record: dict) -> dict:
+    """Public view of a deck session"""
+    return {
+        'id': record['id'],
+        'version': record['version'],
+        'slides': len(record['state']['slides']),
+        'changed_slides': [index + 1 for index in record['state']['changed']],
+        'session_url': url_for('main.update_deck', deck_id=record['id']),
+        'download_url': url_for('main.download_deck', deck_id=record['id']),
+    }
+
+def render_session(deck_id: str, update: bool = False):
+    """Render the submitted deck into a session and send it, with the session in a header"""
+    uploads = []
+    try:
+        errors = []
+        deck = parse_deck_form(uploads, errors)
+        errors += validate_presentation_data(deck.title, deck.slides)
+        if errors:
+            return jsonify({'errors': errors}), 400
+        
+        store = get_session_store()
+        with store.lock(deck_id):
+            previous = store.get(deck_id) if update else None
+            buffer, warnings, state = run_incremental_pipeline(
+                deck,
+                previous and previous['state'],
+                previous and store.deck_path(previous)
+            )
+            with buffer:
+                record = store.save(deck_id, state, buffer, f"{slugify_title(deck.title)}.pptx")
+            # Opened under the lock, before a concurrent update can replace the file
+            response = send_file(
+                store.deck_path(record),
+                as_attachment=True,
+                download_name=record['filename'],
+                mimetype=PPTX_MIMETYPE
+            )
+        response.headers['X-Deck-Session'] = json.dumps({**session_status(record), 'warnings': warnings})
+        return response
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error rendering deck session: {e}")
+        return jsonify({'errors': [f"Failed to generate presentation: {str(e)}"]}), 500
+    finally:
+        remove_uploads(uploads)
+
+@main_bp.route('/decks', methods=['POST'])
+def create_deck():
+    """
+    Generate a deck and keep it as a session for incremental regeneration
+    
+    Takes the same form as /generate and returns the .pptx; the X-Deck-Session
+    header holds the session id and the URL to post the edited form to.
+    """
+    return render_session(get_session_store().new_id())
+
+@main_bp.route('/decks/<deck_id>', methods=['GET', 'POST'])
+def update_deck(deck_id):
+    """
+    Report a deck session, or regenerate it from an edited form
+    
+    A POST takes the whole edited deck. Only slides whose content hash is
+    new are enhanced and rendered; the rest are reused from the last render.
+    """
+    record = get_session_store().get(deck_id)
+    if not record:
+        return jsonify({'errors': ['Deck session not found']}), 404
+    if request.method == 'GET':
+        return jsonify(session_status(record))
+    return render_session(deck_id, update=True)
+
+@main_bp.route('/decks/<deck_id>/download')
+def download_deck(deck_id):
+    """Serve a deck session's latest render"""
+    store = get_session_store()
+    record = store.get(deck_id)
+    if not record:
+        return jsonify({'errors': ['Deck session not found']}), 404
+    return send_file(
+        store.deck_path(record),
+        as_attachment=True,
+        download_name=record['filename'],
+        mimetype=PPTX_MIMETYPE
+    )
+
+@main_bp.route('/batch', methods=['POST'])
+def generate_batch():
+    """
+    Generate many decks from JSON deck specs and return them as a zip
+    
+    The body is either JSON (``{"decks": [...], "enhance": true}``) or JSONL
+    with one deck spec per line. The zip holds the decks and a report.json
+    with per-deck errors; the throughput summary is also sent in the
+    X-Batch-Summary header.
+    """
+    from services.batch import load_deck_specs, run_batch
+    
+    if request.is_json:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or not isinstance(body.get('decks'), list):
+            return jsonify({'errors': ['Expected a JSON object with a "decks" list']}), 400
+        entries = load_deck_specs(json.dumps(spec) for spec in body['decks'])
+        enhance = bool(body.get('enhance', True))
+    else:
+        entries = load_deck_specs(request.get_data(as_text=True).splitlines())
+        enhance = request.args.get('enhance', '1') != '0'
+    
+    if not entries:
+        return jsonify({'errors': ['No deck specs provided']}), 400
+    max_decks = current_app.config['BATCH_HTTP_MAX_DECKS']
+    if len(entries) > max_decks:
+        return jsonify({'errors': [f"A batch can contain at most {max_decks} decks; use batch.py for larger ones"]}), 400
+    
+    fd, path = tempfile.mkstemp(suffix='.zip')
+    os.close(fd)
+    try:
+        report = run_batch(entries, path, enhance=enhance)
+        if not report['summary']['succeeded']:
+            return jsonify(report), 400
+        # The open handle keeps the data readable after the name is gone
+        archive = open(path, 'rb')
+    except Exception as e:
+        logging.error(f"Error generating batch: {e}")
+        return jsonify({'errors': [f"Failed to generate batch: {str(e)}"]}), 500
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
+    response = send_file(archive, as_attachment=True, download_name='presentations.zip', mimetype='application/zip')
+    response.headers['X-Batch-Summary'] = json.dumps(report['summary'])
+    return response
 
 @main_bp.errorhandler(413)
 def too_large(e):
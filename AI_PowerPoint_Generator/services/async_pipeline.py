@@ -0,0 +1,168 @@
+"""Asyncio generation pipeline: one event loop per worker process drives many decks at once"""
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
+from typing import Any, Callable, List, Optional, Tuple
+from models import Deck, Slide
+from services import metrics
+from services.gemini import enhance_presentation_async
+from services.images import create_async_http_client, get_image_suggestions_many_async, prefetch_images_async
+from services.pipeline import image_warnings, needs_image_suggestion
+from services.ppt_generator import generate_ppt_stream
+from services.themes import get_theme
+
+# python-pptx layout and saving are CPU bound, so they get a small pool
+# instead of one thread per deck
+ASYNC_RENDER_WORKERS = int(os.environ.get("ASYNC_RENDER_WORKERS", "4"))
+
+_runner = None
+_runner_lock = threading.Lock()
+
+async def run_pipeline_async(
+    deck: Deck,
+    progress: Optional[Callable[[str, float], None]] = None,
+    http=None,
+    executor: Optional[ThreadPoolExecutor] = None
+) -> Tuple[Any, List[str]]:
+    """
+    Asyncio version of run_pipeline
+    
+    Gemini, Pexels and image downloads are awaited on the event loop, so a
+    deck waiting on the network holds no thread; only rendering runs in
+    ``executor``. The Gemini response is awaited whole (GEMINI_STREAM does
+    not apply here).
+    
+    Args:
+        deck: Deck to generate, with its enhancement options
+        progress: Optional callback receiving (stage, fraction complete)
+        http: Client from create_async_http_client; a temporary one is used when omitted
+        executor: Pool to render in (the loop's default executor when None)
+    
+    Returns:
+        Tuple of the .pptx in a spooled buffer and user-facing warnings
+    """
+    if http is None:
+        async with create_async_http_client() as http:
+            return await run_pipeline_async(deck, progress, http, executor)
+    
+    report = progress or (lambda stage, fraction: None)
+    warnings = []
+    
+    if deck.enhance_ai:
+        report('enhancing', 0.1)
+        deck = await enhance_deck_async(deck, warnings)
+    
+    if any(needs_image_suggestion(slide) for slide in deck.slides):
+        report('finding images', 0.5)
+        deck = replace(deck, slides=await suggest_images_async(http, deck.slides))
+    
+    report('rendering', 0.6)
+    logging.info("Generating PowerPoint presentation")
+    theme = get_theme(deck.theme)
+    with metrics.span('render'):
+        prefetched = await prefetch_images_async(http, (slide.image_url for slide in deck.slides))
+        warnings += image_warnings(deck.slides, prefetched)
+        buffer = await asyncio.get_running_loop().run_in_executor(
+            executor, generate_ppt_stream, deck.title, deck.slides, theme, prefetched
+        )
+    report('done', 1.0)
+    
+    return buffer, warnings
+
+async def enhance_deck_async(deck: Deck, warnings: List[str]) -> Deck:
+    """Asyncio version of enhance_deck"""
+    try:
+        logging.info(f"Enhancing presentation with mode: {deck.enhancement_mode}")
+        enhanced_deck = await enhance_presentation_async(deck, deck.enhancement_mode, deck.max_bullets, deck.tone)
+        if enhanced_deck:
+            logging.info("AI enhancement completed successfully")
+            return enhanced_deck
+        warnings.append("AI enhancement failed, using original content")
+    except Exception as e:
+        logging.error(f"AI enhancement error: {e}")
+        warnings.append(f"AI enhancement failed: {str(e)}")
+    return deck
+
+async def suggest_images_async(http, slides: List[Slide]) -> List[Slide]:
+    """Asyncio version of suggest_images"""
+    needs_image = [i for i, slide in enumerate(slides) if needs_image_suggestion(slide)]
+    if not needs_image:
+        return slides
+    slides = list(slides)
+    try:
+        with metrics.span('image_search'):
+            image_urls = await get_image_suggestions_many_async(http, [slides[i].image_keywords for i in needs_image])
+        for i, image_url in zip(needs_image, image_urls):
+            if image_url:
+                slides[i] = replace(slides[i], image_url=image_url)
+    except Exception as e:
+        logging.warning(f"Failed to get image suggestions: {e}")
+    return slides
+
+class AsyncRunner:
+    """
+    Event loop in a daemon thread that runs async pipelines for this worker
+    
+    Coroutines are handed to the loop from any thread with ``submit``. The
+    loop owns one HTTP client shared by every deck and a render pool of
+    ``render_workers`` threads. All three start on first use, so importing
+    the app or forking gunicorn workers does not create them.
+    """
+    
+    def __init__(self, render_workers: int = ASYNC_RENDER_WORKERS):
+        self.render_workers = render_workers
+        self.loop = None
+        self.http = None
+        self.executor = None
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def start(self):
+        with self._lock:
+            if self.loop:
+                return
+            self.executor = ThreadPoolExecutor(max_workers=self.render_workers, thread_name_prefix="async-render")
+            self.http = create_async_http_client()
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self.loop.run_forever, name="async-pipeline", daemon=True)
+            self._thread.start()
+    
+    def stop(self, timeout: float = 5.0):
+        """Close the HTTP client, stop the loop and shut the render pool down"""
+        with self._lock:
+            if not self.loop:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self.http.aclose(), self.loop).result(timeout)
+            finally:
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self._thread.join(timeout)
+                if not self.loop.is_running():
+                    self.loop.close()
+                self.executor.shutdown(wait=False)
+                self.loop = self.http = self.executor = self._thread = None
+    
+    def submit(self, coro) -> Future:
+        """Schedule a coroutine on the loop; returns a concurrent.futures.Future"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+    
+    def run(self, coro, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and wait for its result (not from the loop's own thread)"""
+        return self.submit(coro).result(timeout)
+    
+    async def run_pipeline(self, deck: Deck, progress: Optional[Callable[[str, float], None]] = None):
+        """run_pipeline_async with the runner's HTTP client and render pool"""
+        return await run_pipeline_async(deck, progress, self.http, self.executor)
+
+def get_async_runner() -> AsyncRunner:
+    """Return the process-wide async runner"""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = AsyncRunner()
+    return _runner
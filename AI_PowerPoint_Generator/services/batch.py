@@ -0,0 +1,290 @@
+"""Bulk deck generation from JSONL deck specs"""
+import os
+import json
+import time
+import shutil
+import logging
+import zipfile
+import tempfile
+from dataclasses import replace
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple
+from models import Deck, Slide
+from services import gemini_scheduler, images
+from services.themes import THEMES, get_theme
+from services.validators import validate_presentation_data, validate_enhancement_options, slugify_title
+from services.pipeline import enhance_deck, suggest_images
+from services.ppt_generator import IMAGE_BOX, build_presentation, release_image_files
+
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", str(os.cpu_count() or 2)))
+BATCH_ENHANCE_WORKERS = int(os.environ.get("BATCH_ENHANCE_WORKERS", "4"))
+BATCH_MAX_DECKS = int(os.environ.get("BATCH_MAX_DECKS", "1000"))
+
+def load_deck_specs(lines: Iterable[str]) -> List[Dict]:
+    """
+    Parse a JSONL stream of deck specs
+    
+    Args:
+        lines: Lines of JSON, one deck spec object per line (blank lines are skipped)
+    
+    Returns:
+        One entry per deck: ``{'line': n, 'spec': {...}}``, or
+        ``{'line': n, 'errors': [...]}`` when the line is not a JSON object
+    """
+    entries = []
+    for line_number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            spec = json.loads(line)
+        except ValueError as e:
+            entries.append({'line': line_number, 'errors': [f"Invalid JSON: {e}"]})
+            continue
+        if not isinstance(spec, dict):
+            entries.append({'line': line_number, 'errors': ["Deck spec must be a JSON object"]})
+            continue
+        entries.append({'line': line_number, 'spec': spec})
+    return entries
+
+def validate_deck_spec(spec: Dict) -> Tuple[Optional[Deck], List[str]]:
+    """
+    Turn a JSON deck spec into a validated deck for generation
+    
+    Slides take ``title``, ``bullets``, ``image_url``, ``image_keywords``
+    and ``speaker_notes``. Local image paths are not accepted. Fields of the
+    wrong JSON type are reported as errors rather than coerced.
+    
+    Returns:
+        ``(deck, errors)``; deck is None when there are errors
+    """
+    title = spec.get('title')
+    slides = spec.get('slides')
+    if not isinstance(title, str) or not isinstance(slides, list):
+        return None, ["Deck spec needs a title string and a slides list"]
+    
+    errors = []
+    for field in ('theme', 'tone', 'enhancement_mode'):
+        if not isinstance(spec.get(field, ''), str):
+            errors.append(f"{field.replace('_', ' ').capitalize()} must be a string")
+    max_bullets = spec.get('max_bullets', 3)
+    if not isinstance(max_bullets, int) or isinstance(max_bullets, bool):
+        errors.append("Maximum bullets must be a number")
+    
+    deck_slides = []
+    for i, slide in enumerate(slides, 1):
+        if not isinstance(slide, dict):
+            return None, ["Every slide must be a JSON object"]
+        bullets = slide.get('bullets') or []
+        if not is_string_list(bullets):
+            errors.append(f"Slide {i}: Bullets must be a list of strings")
+        if not is_string_list(slide.get('image_keywords') or []):
+            errors.append(f"Slide {i}: Image keywords must be a list of strings")
+        for field in ('image_url', 'speaker_notes'):
+            if not isinstance(slide.get(field) or '', str):
+                errors.append(f"Slide {i}: {field.replace('_', ' ').capitalize()} must be a string")
+        if errors:
+            continue
+        deck_slides.append(Slide(
+            title=str(slide.get('title') or ''),
+            bullets=[bullet.strip() for bullet in bullets if bullet.strip()],
+            image_url=slide.get('image_url') or None,
+            image_keywords=slide.get('image_keywords') or None,
+            speaker_notes=slide.get('speaker_notes') or None,
+        ))
+    if errors:
+        return None, errors
+    
+    deck = Deck(
+        title=title.strip(),
+        slides=deck_slides,
+        theme=spec.get('theme', 'default'),
+        tone=spec.get('tone', 'professional'),
+        enhance_ai=bool(spec.get('enhance_ai', False)),
+        enhancement_mode=spec.get('enhancement_mode', 'polish'),
+        max_bullets=max_bullets,
+    )
+    
+    errors = validate_presentation_data(deck.title, deck.slides)
+    if deck.theme not in THEMES:
+        errors.append(f"Unknown theme '{deck.theme}'")
+    for i, slide in enumerate(deck.slides, 1):
+        if slide.image_url and not slide.image_url.startswith(('http://', 'https://')):
+            errors.append(f"Slide {i}: Image URL must start with http:// or https://")
+    if deck.enhance_ai:
+        errors.extend(validate_enhancement_options(deck.enhancement_mode, deck.max_bullets, deck.tone))
+    
+    return (None if errors else deck), errors
+
+def is_string_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+def run_batch(
+    entries: List[Dict],
+    output: str,
+    workers: Optional[int] = None,
+    enhance: bool = True
+) -> Dict:
+    """
+    Generate every valid deck in a batch and write them to a zip or directory
+    
+    Gemini enhancement runs in a thread pool (it is network bound), image
+    suggestions and downloads are resolved once for the whole batch, and
+    the decks are laid out and saved across a process pool. Each deck's
+    latency is its enhancement time plus its render time.
+    
+    Args:
+        entries: Deck entries from load_deck_specs
+        output: ``.zip`` file path, otherwise a directory created if needed
+        workers: Render processes (defaults to BATCH_WORKERS)
+        enhance: Set False to skip enhancement even for decks that ask for it
+    
+    Returns:
+        Report with one result per deck (``line``, ``status`` of ok, invalid
+        or failed, ``file``, ``errors``, ``warnings``, ``seconds``) and a
+        ``summary`` with counts, decks/sec and p50/p95 per-deck latency.
+        The report is also written to the output as ``report.json``.
+    """
+    started = time.perf_counter()
+    results = []
+    decks = []
+    for entry in entries:
+        result = {'line': entry['line'], 'status': 'invalid', 'file': None,
+                  'errors': list(entry.get('errors', [])), 'warnings': [], 'seconds': 0.0}
+        results.append(result)
+        if 'spec' in entry:
+            try:
+                deck, errors = validate_deck_spec(entry['spec'])
+            except Exception as e:
+                # One malformed spec must not take the rest of the batch down with it
+                logging.warning(f"Batch deck on line {entry['line']} could not be validated: {e}")
+                deck, errors = None, [f"Invalid deck spec: {e}"]
+            result['errors'].extend(errors)
+            if deck:
+                result['title'] = deck.title
+                result['file'] = f"{len(decks) + 1:04d}-{slugify_title(deck.title)}.pptx"
+                decks.append((result, deck))
+    
+    staging = output if not output.endswith('.zip') else tempfile.mkdtemp(prefix='ppt-batch-')
+    os.makedirs(staging, exist_ok=True)
+    
+    prepared = _enhance_decks(decks, enhance)
+    illustrated, prefetched, normalized, image_files = _resolve_images([deck for _, deck in prepared])
+    prepared = [(result, deck) for (result, _), deck in zip(prepared, illustrated)]
+    try:
+        with ProcessPoolExecutor(max_workers=workers or BATCH_WORKERS, initializer=_init_render_worker) as pool:
+            futures = {}
+            for result, deck in prepared:
+                slides = [_local_slide(slide, image_files) for slide in deck.slides]
+                for i, slide in enumerate(deck.slides, 1):
+                    if slide.image_url and slide.image_url not in image_files:
+                        result['warnings'].append(f"Slide {i}: Image could not be downloaded")
+                future = pool.submit(_render_deck, deck.title, slides, deck.theme,
+                                     os.path.join(staging, result['file']))
+                futures[future] = result
+            
+            for future in as_completed(futures):
+                result = futures[future]
+                try:
+                    result['seconds'] += future.result()
+                    result['status'] = 'ok'
+                except Exception as e:
+                    logging.error(f"Batch deck on line {result['line']} failed: {e}")
+                    result['status'] = 'failed'
+                    result['errors'].append(f"Generation failed: {e}")
+                    result['file'] = None
+    finally:
+        release_image_files(prefetched, normalized)
+    
+    elapsed = time.perf_counter() - started
+    report = {'results': results, 'summary': summarize(results, elapsed)}
+    
+    with open(os.path.join(staging, 'report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    if staging != output:
+        try:
+            _write_zip(staging, output, [result['file'] for result in results if result['file']])
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+    
+    return report
+
+def summarize(results: List[Dict], elapsed: float) -> Dict:
+    """Throughput summary for a finished batch"""
+    latencies = sorted(result['seconds'] for result in results if result['status'] == 'ok')
+    return {
+        'decks': len(results),
+        'succeeded': len(latencies),
+        'invalid': sum(1 for result in results if result['status'] == 'invalid'),
+        'failed': sum(1 for result in results if result['status'] == 'failed'),
+        'seconds': round(elapsed, 3),
+        'decks_per_sec': round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        'p50_seconds': round(percentile(latencies, 50), 3),
+        'p95_seconds': round(percentile(latencies, 95), 3),
+    }
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0.0 when empty)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+def _enhance_decks(decks: List[Tuple[Dict, Deck]], enhance: bool) -> List[Tuple[Dict, Deck]]:
+    """Enhance the decks that ask for it concurrently; returns (result, deck) pairs"""
+    def prepare(item):
+        result, deck = item
+        if enhance and deck.enhance_ai:
+            started = time.perf_counter()
+            with gemini_scheduler.priority(gemini_scheduler.PRIORITY_BATCH):
+                deck = enhance_deck(deck, result['warnings'])
+            result['seconds'] += time.perf_counter() - started
+        return result, deck
+    
+    if not any(enhance and deck.enhance_ai for _, deck in decks):
+        return [prepare(item) for item in decks]
+    with ThreadPoolExecutor(max_workers=BATCH_ENHANCE_WORKERS, thread_name_prefix="batch-enhance") as executor:
+        return list(executor.map(prepare, decks))
+
+def _resolve_images(decks: List[Deck]) -> Tuple[List[Deck], Dict, Dict, Dict]:
+    """
+    Suggest, download and normalize every image in the batch exactly once
+    
+    Returns:
+        ``(decks, prefetched, normalized, image_files)``; decks are copies
+        with their suggested image URLs, and image_files maps each image URL
+        to the local file decks should embed
+    """
+    # One suggestion lookup for the whole batch, split back into decks afterwards
+    slides = iter(suggest_images([slide for deck in decks for slide in deck.slides]))
+    decks = [replace(deck, slides=[next(slides) for _ in deck.slides]) for deck in decks]
+    
+    image_urls = [slide.image_url for deck in decks for slide in deck.slides]
+    prefetched = images.prefetch_images(image_urls)
+    normalized = images.normalize_images(prefetched.values(), IMAGE_BOX[2], IMAGE_BOX[3])
+    image_files = {url: normalized.get(path, path) for url, path in prefetched.items()}
+    return decks, prefetched, normalized, image_files
+
+def _local_slide(slide: Slide, image_files: Dict) -> Slide:
+    """Point a slide at its already downloaded image so render workers stay offline"""
+    return replace(slide, image_url=None, image_path=image_files.get(slide.image_url))
+
+def _init_render_worker():
+    # Images arrive already normalized by the parent process
+    images.NORMALIZE_IMAGES = False
+
+def _render_deck(title: str, slides: List[Slide], theme_name: str, path: str) -> float:
+    """Lay out and save one deck in a worker process; returns the seconds taken"""
+    started = time.perf_counter()
+    prs = build_presentation(title, slides, get_theme(theme_name))
+    prs.save(path)
+    return time.perf_counter() - started
+
+def _write_zip(directory: str, path: str, filenames: List[str]):
+    """Collect the finished decks and report into a zip, written atomically"""
+    temp_path = path + '.part'
+    with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_STORED) as archive:
+        for filename in filenames + ['report.json']:
+            archive.write(os.path.join(directory, filename), filename)
+    os.replace(temp_path, path)
@@ -0,0 +1,229 @@
+"""Key/value result caches with TTL, stale-while-revalidate and hit metrics"""
+import json
+import time
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Shared by every cache for stale-while-revalidate refreshes
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+
+class ResultCache(ABC):
+    """
+    Base class for TTL-bounded result caches
+    
+    Subclasses provide storage through ``_load``/``_store``/``_size``. Entries
+    younger than ``ttl`` seconds are fresh. If ``stale_ttl`` is set, entries
+    up to ``ttl + stale_ttl`` old are still served while a background refresh
+    replaces them. Values must be JSON serialisable; ``None`` is never cached.
+    """
+    
+    def __init__(self, ttl: float, stale_ttl: float = 0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._refreshing = set()
+    
+    @abstractmethod
+    def _load(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return ``(value, stored_at)`` for a key or None"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def _store(self, key: str, value: Any):
+        raise NotImplementedError
+    
+    @abstractmethod
+    def _size(self) -> int:
+        raise NotImplementedError
+    
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return a fresh cached value or None"""
+        entry = self._load(key)
+        if entry and time.time() - entry[1] < self.ttl:
+            self._count('hits')
+            return entry[0]
+        self._count('misses')
+        return None
+    
+    def set(self, key: str, value: Any):
+        """Store a value; ``None`` is ignored"""
+        if value is not None:
+            self._store(key, value)
+    
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for a key, calling ``loader`` on a miss
+        
+        Args:
+            key: Normalised cache key
+            loader: Zero-argument function producing the value
+        
+        Returns:
+            Cached or freshly loaded value
+        """
+        entry = self._load(key)
+        if entry:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age < self.ttl:
+                self._count('hits')
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self._count('stale_hits')
+                self._refresh(key, loader)
+                return value
+        
+        self._count('misses')
+        value = loader()
+        self.set(key, value)
+        return value
+    
+    def _refresh(self, key: str, loader: Callable[[], Any]):
+        """Reload a stale key in the background, once per key at a time"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        
+        def refresh():
+            try:
+                self.set(key, loader())
+                self._count('refreshes')
+            except Exception as e:
+                logging.warning(f"Background cache refresh failed for {key!r}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+        
+        _refresh_executor.submit(refresh)
+    
+    def stats(self) -> Dict[str, float]:
+        """Return counters and hit rate for sizing the cache"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'hit_rate': (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            'entries': self._size(),
+        }
+
+class MemoryCache(ResultCache):
+    """In-process LRU store, shared by all requests handled by one worker"""
+    
+    def __init__(self, ttl: float, stale_ttl: float = 0, max_entries: int = 10000):
+        super().__init__(ttl, stale_ttl, max_entries)
+        self._entries = OrderedDict()
+    
+    def _load(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def _size(self):
+        return len(self._entries)
+
+class SqliteCache(ResultCache):
+    """
+    sqlite-backed store shared by every worker process using the same file
+    
+    Values are stored as JSON. Least recently used rows are evicted once the
+    table grows past ``max_entries``.
+    """
+    
+    def __init__(self, path: str, ttl: float, stale_ttl: float = 0, max_entries: int = 10000, table: str = 'cache'):
+        super().__init__(ttl, stale_ttl, max_entries)
+        self.path = path
+        self.table = table
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"""CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        finally:
+            conn.close()
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+    
+    def _load(self, key):
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute(f"SELECT value, stored_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (time.time(), key))
+            return json.loads(row[0]), row[1]
+        finally:
+            conn.close()
+    
+    def _store(self, key, value):
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now)
+                )
+                conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} "
+                    f"ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        finally:
+            conn.close()
+    
+    def _size(self):
+        conn = self._connect()
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        finally:
+            conn.close()
+
+def create_cache(backend: str, ttl: float, stale_ttl: float = 0, max_entries: int = 10000, table: str = 'cache') -> ResultCache:
+    """
+    Build a result cache from a backend setting
+    
+    Args:
+        backend: ``memory`` for an in-process store, otherwise a sqlite file path
+        ttl: Seconds an entry stays fresh
+        stale_ttl: Extra seconds a stale entry may be served while refreshing
+        max_entries: Maximum number of entries kept
+        table: sqlite table name, so several caches can share one file
+    
+    Returns:
+        Configured cache instance
+    """
+    if backend == 'memory':
+        return MemoryCache(ttl, stale_ttl, max_entries)
+    return SqliteCache(backend, ttl, stale_ttl, max_entries, table=table)
@@ -0,0 +1,257 @@
+"""Whole-deck output cache: identical /generate submissions get the stored .pptx instead of a new render"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import IO, Callable, Dict, List, Optional, Tuple
+from models import Deck
+from services import gemini, metrics
+from services.sessions import slide_hash
+
+# Rendered decks by spec hash, in a directory every worker process can share;
+# set DECK_CACHE_DIR to an empty string to disable
+DECK_CACHE_DIR = os.environ.get("DECK_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ppt-deck-cache"))
+DECK_CACHE_MAX_BYTES = int(os.environ.get("DECK_CACHE_MAX_MB", "256")) * 1024 * 1024
+DECK_CACHE_MAX_AGE = float(os.environ.get("DECK_CACHE_MAX_AGE", "3600"))
+
+_deck_cache = None
+_deck_cache_lock = threading.Lock()
+
+@dataclass(slots=True)
+class CachedDeck:
+    """A rendered deck as returned by DeckCache.get_or_render"""
+    file: IO[bytes]
+    warnings: List[str]
+    etag: Optional[str] = None
+    hit: bool = False
+
+def deck_key(deck: Deck) -> str:
+    """
+    Canonical hash of a deck spec: everything that decides the rendered deck
+    
+    Slides are hashed as deck sessions hash them, so uploads count by their
+    content digest. Image URLs count by URL, since their content is only
+    known once fetched; DECK_CACHE_MAX_AGE bounds how long a picture that
+    changed behind the same URL keeps being served. Enhancement options,
+    and the Gemini model and temperature, only count for enhanced decks.
+    """
+    payload = [deck.title, deck.theme, deck.tone, deck.enhance_ai, [slide_hash(slide) for slide in deck.slides]]
+    if deck.enhance_ai:
+        payload += [deck.enhancement_mode, deck.max_bullets, gemini.GEMINI_MODEL, gemini.GEMINI_TEMPERATURE]
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+class DeckCache:
+    """
+    Directory of rendered decks named by deck_key
+    
+    Decks are written under temporary names and renamed into place, so
+    other workers never read a partial file. A deck's mtime is when it was
+    rendered, which gives its ETag and its age (entries older than
+    ``max_age`` are misses); its atime is set on every hit and orders the
+    least recently used decks for eviction once the directory holds more
+    than ``max_bytes``.
+    
+    Within a process, identical submissions that arrive while the first is
+    still rendering wait for it instead of rendering again. Renders that
+    came with warnings (enhancement or image failures) are not stored, so
+    the next submission retries them.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int = DECK_CACHE_MAX_BYTES, max_age: float = DECK_CACHE_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pptx")
+    
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    
+    def open(self, key: str) -> Optional[Tuple[IO[bytes], str]]:
+        """
+        Open a stored deck
+        
+        The file stays readable after being opened even if another process
+        evicts or replaces it meanwhile.
+        
+        Returns:
+            ``(file, etag)``, or None when the deck is not stored or too old
+        """
+        path = self._path(key)
+        try:
+            file = open(path, 'rb')
+        except OSError:
+            return None
+        
+        stat = os.fstat(file.fileno())
+        if time.time() - stat.st_mtime > self.max_age:
+            file.close()
+            return None
+        try:
+            os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+        except OSError:
+            pass
+        return file, self._etag(key, stat.st_mtime_ns)
+    
+    def _etag(self, key: str, mtime_ns: int) -> str:
+        # A re-render replaces the file, so the render time tells its bytes apart
+        return f"{key[:32]}-{mtime_ns:x}"
+    
+    def store(self, key: str, buffer: IO[bytes]) -> Optional[str]:
+        """
+        Store a rendered deck, read from the buffer's start, and rewind the buffer
+        
+        Returns:
+            The stored deck's ETag, or None if it could not be written
+        """
+        temp_path = None
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+            with os.fdopen(fd, 'wb') as f:
+                buffer.seek(0)
+                shutil.copyfileobj(buffer, f)
+            mtime_ns = os.stat(temp_path).st_mtime_ns
+            os.replace(temp_path, self._path(key))
+            temp_path = None
+        except OSError as e:
+            logging.warning(f"Could not store deck {key[:12]} in the deck cache: {e}")
+            return None
+        finally:
+            buffer.seek(0)
+            if temp_path:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+        
+        self._evict()
+        return self._etag(key, mtime_ns)
+    
+    def _evict(self):
+        """Drop least recently used decks until the directory fits its byte budget"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pptx'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self._count('evictions')
+            except OSError:
+                pass
+            total -= size
+    
+    def get_or_render(self, key: str, render: Callable[[], Tuple[IO[bytes], List[str]]],
+                      bypass: bool = False) -> CachedDeck:
+        """
+        Return the stored deck for a key, rendering and storing it on a miss
+        
+        Args:
+            key: deck_key of the submitted deck
+            render: Runs the pipeline, returning ``(buffer, warnings)``
+            bypass: Render even if the deck is stored (or rendering), and
+                replace the stored copy with the new render
+        
+        Returns:
+            The deck, rewound, with its warnings and ETag (None when it was
+            not stored); a waiter whose leader's render was not stored
+            renders on its own
+        """
+        if bypass:
+            self._count('bypassed')
+            return self._render(key, render)
+        
+        cached = self.open(key)
+        if cached:
+            self._count('hits')
+            return CachedDeck(cached[0], [], cached[1], hit=True)
+        
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        
+        if not leader:
+            self._count('coalesced')
+            if future.result():
+                cached = self.open(key)
+                if cached:
+                    return CachedDeck(cached[0], [], cached[1], hit=True)
+            return self._render(key, render)
+        
+        self._count('misses')
+        try:
+            result = self._render(key, render)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result.etag is not None)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return result
+    
+    def _render(self, key: str, render: Callable[[], Tuple[IO[bytes], List[str]]]) -> CachedDeck:
+        buffer, warnings = render()
+        etag = None if warnings else self.store(key, buffer)
+        return CachedDeck(buffer, warnings, etag)
+    
+    def stats(self) -> Dict[str, int]:
+        """Return counters for this process and the number of stored decks"""
+        try:
+            entries = sum(1 for name in os.listdir(self.directory) if name.endswith('.pptx'))
+        except OSError:
+            entries = 0
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'bypassed': self.bypassed,
+            'evictions': self.evictions,
+            'entries': entries,
+        }
+
+def get_deck_cache() -> Optional[DeckCache]:
+    """Return the process-wide deck cache, or None if it is disabled"""
+    global _deck_cache
+    if _deck_cache is None and DECK_CACHE_DIR:
+        with _deck_cache_lock:
+            if _deck_cache is None:
+                _deck_cache = DeckCache(DECK_CACHE_DIR)
+    return _deck_cache
+
+def _collect_cache_metrics():
+    """Publish deck cache statistics on the metrics endpoint"""
+    if _deck_cache is not None:
+        stats = _deck_cache.stats()
+        for result in ('hits', 'misses', 'coalesced', 'bypassed'):
+            metrics.CACHE_LOOKUPS.set_total(stats[result], cache='decks', result=result)
+        metrics.CACHE_ENTRIES.set(stats['entries'], cache='decks')
+
+metrics.REGISTRY.add_collector(_collect_cache_metrics)
@@ -0,0 +1,114 @@
+"""Glyph width tables for the theme fonts, for estimating rendered text size without a font renderer"""
+import unicodedata
+from functools import lru_cache
+from typing import Tuple
+
+# Advance widths in 1/1000 em of ASCII 32-126, regular and bold. Taken from
+# the fonts' metric-compatible equivalents: Helvetica / Liberation Sans for
+# Arial, Times / Liberation Serif for Times New Roman and Carlito for Calibri.
+_WIDTHS = {
+    ('Arial', False): (
+        278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+        1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+        333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+        556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+    ),
+    ('Arial', True): (
+        278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+        975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+        333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+        611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+    ),
+    ('Times New Roman', False): (
+        250, 333, 408, 500, 500, 833, 778, 180, 333, 333, 500, 564, 250, 333, 250, 278,
+        500, 500, 500, 500, 500, 500, 500, 500, 500, 500, 278, 278, 564, 564, 564, 444,
+        921, 722, 667, 667, 722, 611, 556, 722, 722, 333, 389, 722, 611, 889, 722, 722,
+        556, 722, 667, 556, 611, 722, 722, 944, 722, 722, 611, 333, 278, 333, 469, 500,
+        333, 444, 500, 444, 500, 444, 333, 500, 500, 278, 278, 500, 278, 778, 500, 500,
+        500, 500, 333, 389, 278, 500, 500, 722, 500, 500, 444, 480, 200, 480, 541,
+    ),
+    ('Times New Roman', True): (
+        250, 333, 555, 500, 500, 1000, 833, 278, 333, 333, 500, 570, 250, 333, 250, 278,
+        500, 500, 500, 500, 500, 500, 500, 500, 500, 500, 333, 333, 570, 570, 570, 500,
+        930, 722, 667, 722, 722, 667, 611, 778, 778, 389, 500, 778, 667, 944, 722, 778,
+        611, 778, 722, 556, 667, 722, 722, 1000, 722, 722, 667, 333, 278, 333, 581, 500,
+        333, 500, 556, 444, 556, 444, 333, 500, 556, 278, 333, 556, 278, 833, 556, 500,
+        556, 556, 444, 389, 333, 556, 500, 722, 500, 500, 444, 394, 220, 394, 520,
+    ),
+    ('Calibri', False): (
+        226, 268, 401, 498, 507, 715, 682, 221, 303, 303, 498, 498, 250, 306, 252, 386,
+        507, 507, 507, 507, 507, 507, 507, 507, 507, 507, 268, 268, 498, 498, 498, 463,
+        894, 579, 544, 533, 615, 488, 459, 631, 623, 252, 319, 520, 420, 855, 646, 662,
+        517, 673, 543, 459, 487, 642, 567, 890, 519, 487, 468, 307, 386, 307, 498, 498,
+        291, 479, 525, 423, 525, 498, 305, 471, 525, 230, 239, 455, 230, 799, 525, 527,
+        525, 525, 349, 391, 335, 525, 452, 715, 433, 453, 395, 314, 460, 314, 498,
+    ),
+    ('Calibri', True): (
+        226, 326, 438, 498, 507, 729, 705, 233, 312, 312, 498, 498, 258, 306, 267, 430,
+        507, 507, 507, 507, 507, 507, 507, 507, 507, 507, 276, 276, 498, 498, 498, 463,
+        898, 606, 561, 529, 630, 488, 459, 637, 631, 267, 331, 547, 423, 874, 659, 676,
+        532, 686, 563, 473, 495, 653, 591, 906, 551, 520, 478, 325, 430, 325, 498, 498,
+        300, 494, 537, 418, 537, 503, 316, 474, 537, 246, 255, 480, 246, 813, 537, 538,
+        537, 537, 355, 399, 347, 537, 473, 745, 459, 474, 397, 344, 475, 344, 498,
+    ),
+}
+
+# Fonts measured with another font's table. Segoe UI has no metric-compatible
+# open font; Arial's widths are within a few percent of it.
+FONT_ALIASES = {
+    'Helvetica': 'Arial',
+    'Liberation Sans': 'Arial',
+    'Segoe UI': 'Arial',
+    'Times': 'Times New Roman',
+    'Liberation Serif': 'Times New Roman',
+    'Carlito': 'Calibri',
+}
+
+DEFAULT_FONT = 'Arial'
+
+# Width of full-width (CJK) characters
+WIDE_CHAR_WIDTH = 1.0
+
+@lru_cache(maxsize=None)
+def glyph_widths(font_name: str, bold: bool = False) -> Tuple[float, ...]:
+    """
+    Advance widths in em of the first 128 code points for a font
+    
+    Control characters are zero width. Fonts without a table use Arial's.
+    """
+    font_name = FONT_ALIASES.get(font_name, font_name)
+    widths = _WIDTHS.get((font_name, bold)) or _WIDTHS[(DEFAULT_FONT, bold)]
+    return (0.0,) * 32 + tuple(width / 1000 for width in widths) + (0.0,)
+
+def char_width(widths: Tuple[float, ...], char: str) -> float:
+    """Width in em of one character, estimating those outside the table"""
+    code = ord(char)
+    if code < 128:
+        return widths[code]
+    if unicodedata.east_asian_width(char) in ('W', 'F'):
+        return WIDE_CHAR_WIDTH
+    if unicodedata.combining(char):
+        return 0.0
+    # Accented and other letters are about as wide as the average lowercase letter
+    return _average_lowercase(widths)
+
+@lru_cache(maxsize=None)
+def _average_lowercase(widths: Tuple[float, ...]) -> float:
+    return sum(widths[ord('a'):ord('z') + 1]) / 26
+
+@lru_cache(maxsize=65536)
+def text_width(text: str, font_name: str, bold: bool = False) -> float:
+    """
+    Width in em of a line of text set in a font
+    
+    Multiply by the font size to get the width in points. Words are cached,
+    since slide text repeats them heavily across a batch.
+    """
+    widths = glyph_widths(font_name, bold)
+    if text.isascii():
+        return sum([widths[code] for code in text.encode()])
+    return sum([char_width(widths, char) for char in text])
@@ -1,113 +1,597 @@
 import json
+import asyncio
+import hashlib
 import logging
 import os
-from typing import Dict, List, Optional, Literal
-from google import genai
-from google.genai import types
-from pydantic import BaseModel
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Dict, Iterator, List, Optional, Literal, Tuple
+from models import Deck, Slide
+from services.cache import ResultCache, create_cache
+from services import metrics
+from services.gemini_scheduler import current_priority, estimate_tokens, get_scheduler
 
-# Initialize Gemini client
-client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+GEMINI_MODEL = os.environ.get("MODEL_NAME", "gemini-2.5-pro")
+GEMINI_TEMPERATURE = float(os.environ.get("GEMINI_TEMPERATURE", "0.4"))
 
-class SlideData(BaseModel):
-    title: str
-    bullets: List[str]
-    speaker_notes: Optional[str] = None
-    image_keywords: Optional[List[str]] = None
+# Chunked enhancement: decks longer than GEMINI_CHUNK_SIZE slides are split
+# into chunks sent concurrently (0 sends the whole deck in one request)
+GEMINI_CHUNK_SIZE = int(os.environ.get("GEMINI_CHUNK_SIZE", "5"))
+GEMINI_MAX_CONCURRENCY = int(os.environ.get("GEMINI_MAX_CONCURRENCY", "4"))
+GEMINI_CHUNK_RETRIES = int(os.environ.get("GEMINI_CHUNK_RETRIES", "1"))
 
-class EnhancedPresentation(BaseModel):
-    title: str
-    slides: List[SlideData]
+# Stream the response and render slides as they arrive (decks can opt in per request)
+GEMINI_STREAM = os.environ.get("GEMINI_STREAM", "0") == "1"
 
+# Enhancement cache: a sqlite file shared by all workers, "memory" for a
+# per-worker store, or an empty string to disable
+GEMINI_CACHE = os.environ.get("GEMINI_CACHE", os.path.join(tempfile.gettempdir(), "ppt-enhancements.db"))
+GEMINI_CACHE_TTL = float(os.environ.get("GEMINI_CACHE_TTL", str(7 * 24 * 3600)))
+GEMINI_CACHE_SIZE = int(os.environ.get("GEMINI_CACHE_SIZE", "20000"))
+
+_enhancement_cache = None
+_cache_lock = threading.Lock()
+
+# Gemini client, created on first use so workers that never enhance a deck
+# skip the google-genai import (tests and benchmarks assign a fake here)
+client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Return the process-wide Gemini client, creating it on first use"""
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                from google import genai
+                client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+    return client
+
+@metrics.timed('gemini_enhance')
 def enhance_presentation(
-    presentation_data: Dict, 
+    deck: Deck,
     mode: Literal["polish", "expand", "notes"], 
     max_new_bullets: int = 3, 
-    tone: str = "professional"
-) -> Optional[Dict]:
+    tone: str = "professional",
+    chunk_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    model_client=None
+) -> Optional[Deck]:
     """
     Enhance presentation content using Gemini AI
     
+    Results are cached for the whole deck and for each slide, so
+    regenerating a deck with another theme makes no Gemini call and editing
+    one slide only re-enhances that slide. Requests go through the
+    process-wide scheduler at the priority of the calling context.
+    
     Args:
-        presentation_data: Original presentation data
+        deck: Original deck
         mode: Enhancement mode (polish, expand, notes)
         max_new_bullets: Maximum new bullets to add in expand mode
         tone: Tone for enhancement (professional, friendly, concise)
+        chunk_size: Slides per request; decks larger than this are split into
+            chunks enhanced concurrently (defaults to GEMINI_CHUNK_SIZE, 0 = off)
+        max_concurrency: Maximum chunks in flight (defaults to GEMINI_MAX_CONCURRENCY)
+        model_client: Client to use instead of the module's Gemini client
     
     Returns:
-        Enhanced presentation data or None if failed
+        Copy of the deck with the enhanced title and slides, or None if failed
     """
     try:
+        model_client = model_client or get_client()
+        chunk_size = GEMINI_CHUNK_SIZE if chunk_size is None else chunk_size
+        max_concurrency = max_concurrency or GEMINI_MAX_CONCURRENCY
+        
         # Build prompt based on mode
-        system_prompt = build_system_prompt(mode, max_new_bullets, tone)
-        user_prompt = build_user_prompt(presentation_data)
-        
-        logging.info(f"Sending prompt to Gemini with mode: {mode}")
-        
-        response = client.models.generate_content(
-            model="gemini-2.5-pro",
-            contents=[
-                types.Content(role="user", parts=[types.Part(text=user_prompt)])
-            ],
-            config=types.GenerateContentConfig(
-                system_instruction=system_prompt,
-                response_mime_type="application/json",
-                response_schema=EnhancedPresentation,
-                temperature=float(os.environ.get("GEMINI_TEMPERATURE", "0.4"))
-            ),
-        )
+        plan = EnhancementPlan(deck, build_system_prompt(mode, max_new_bullets, tone))
         
-        if not response.text:
-            logging.error("Empty response from Gemini")
-            return None
+        # Only slides missing from the cache are sent to Gemini
+        if plan.missing:
+            logging.info(f"Sending {len(plan.missing)} of {len(deck.slides)} slides to Gemini with mode: {mode}")
+            plan.add(*enhance_slides(plan.request_deck(), plan.system_prompt, chunk_size, max_concurrency,
+                                     model_client, current_priority()))
         
-        # Parse JSON response
-        try:
-            enhanced_data = json.loads(response.text)
-            logging.info("Successfully parsed Gemini response")
-            
-            # Convert back to expected format
-            result = {
-                'title': enhanced_data.get('title', presentation_data['title']),
-                'slides': []
-            }
-            
-            for slide_data in enhanced_data.get('slides', []):
-                slide = {
-                    'title': slide_data.get('title', ''),
-                    'bullets': slide_data.get('bullets', []),
-                }
-                
-                # Add optional fields if present
-                if 'speaker_notes' in slide_data and slide_data['speaker_notes']:
-                    slide['speaker_notes'] = slide_data['speaker_notes']
-                
-                if 'image_keywords' in slide_data and slide_data['image_keywords']:
-                    slide['image_keywords'] = slide_data['image_keywords']
-                
-                # Preserve original image data if no new suggestions
-                original_slide = None
-                if len(presentation_data['slides']) > len(result['slides']):
-                    original_slide = presentation_data['slides'][len(result['slides'])]
-                
-                if original_slide:
-                    if 'image_url' in original_slide:
-                        slide['image_url'] = original_slide['image_url']
-                    if 'image_path' in original_slide:
-                        slide['image_path'] = original_slide['image_path']
-                
-                result['slides'].append(slide)
+        return plan.result()
             
-            return result
+    except Exception as e:
+        logging.error(f"Error enhancing presentation with Gemini: {e}")
+        return None
+
+async def enhance_presentation_async(
+    deck: Deck,
+    mode: Literal["polish", "expand", "notes"],
+    max_new_bullets: int = 3,
+    tone: str = "professional",
+    chunk_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    model_client=None
+) -> Optional[Deck]:
+    """
+    Asyncio version of enhance_presentation, for the async pipeline
+    
+    Same arguments, caches and scheduler; requests go through the SDK's
+    async client (``client.aio``) and chunks are awaited together.
+    """
+    try:
+        with metrics.span('gemini_enhance'):
+            model_client = model_client or get_client()
+            chunk_size = GEMINI_CHUNK_SIZE if chunk_size is None else chunk_size
+            max_concurrency = max_concurrency or GEMINI_MAX_CONCURRENCY
             
-        except json.JSONDecodeError as e:
-            logging.error(f"Failed to parse Gemini JSON response: {e}")
-            return None
+            plan = EnhancementPlan(deck, build_system_prompt(mode, max_new_bullets, tone))
+            if plan.missing:
+                logging.info(f"Sending {len(plan.missing)} of {len(deck.slides)} slides to Gemini with mode: {mode}")
+                plan.add(*await enhance_slides_async(plan.request_deck(), plan.system_prompt, chunk_size,
+                                                     max_concurrency, model_client, current_priority()))
             
+            return plan.result()
+    
     except Exception as e:
         logging.error(f"Error enhancing presentation with Gemini: {e}")
         return None
 
+class EnhancementPlan:
+    """
+    Cache bookkeeping for one deck enhancement, shared by the sync and async paths
+    
+    The deck and each of its slides are looked up in the enhancement cache
+    up front; ``missing`` lists the indices still to send to Gemini.
+    ``add`` records Gemini's answer for them and ``result`` combines
+    everything with the original slides.
+    """
+    
+    def __init__(self, deck: Deck, system_prompt: str):
+        self.deck = deck
+        self.system_prompt = system_prompt
+        self.cache = get_enhancement_cache()
+        self.title = None
+        self.slide_keys = []
+        self.from_cache = False
+        
+        if self.cache:
+            cached = self.cache.get(enhancement_key(system_prompt, deck))
+            if cached:
+                logging.info("Using cached Gemini enhancement")
+                self.title, self.enhanced_slides, self.from_cache = cached['title'], cached['slides'], True
+                self.missing = []
+                return
+            
+            self.slide_keys = [slide_enhancement_key(system_prompt, slide) for slide in deck.slides]
+            self.enhanced_slides = [self.cache.get(key) for key in self.slide_keys]
+        else:
+            self.enhanced_slides = [None] * len(deck.slides)
+        self.missing = [i for i, enhanced in enumerate(self.enhanced_slides) if enhanced is None]
+    
+    def request_deck(self) -> Deck:
+        """The deck to send to Gemini: the slides missing from the cache"""
+        return replace(self.deck, slides=[self.deck.slides[i] for i in self.missing])
+    
+    def add(self, title: Optional[str], new_slides: List[Optional[Dict]]):
+        """Record Gemini's enhanced title and slides (None where it failed) for the missing slides"""
+        self.title = title
+        for i, enhanced in zip(self.missing, new_slides):
+            self.enhanced_slides[i] = enhanced
+            if self.cache and enhanced:
+                self.cache.set(self.slide_keys[i], enhanced)
+    
+    def result(self) -> Optional[Deck]:
+        """The enhanced deck, or None if no slide could be enhanced"""
+        if not any(self.enhanced_slides):
+            logging.error("Gemini enhancement failed for every slide")
+            return None
+        
+        if self.cache and not self.from_cache:
+            self.title = store_enhancement(self.cache, self.system_prompt, self.deck, self.title, self.enhanced_slides)
+        
+        return build_enhanced_result(self.deck, self.title, self.enhanced_slides)
+
+def enhance_slides(
+    deck: Deck,
+    system_prompt: str,
+    chunk_size: int,
+    max_concurrency: int,
+    model_client,
+    priority: Optional[int] = None
+) -> Tuple[Optional[str], List[Optional[Dict]]]:
+    """
+    Send slides to Gemini, as concurrent chunks of ``chunk_size`` when the deck is larger
+    
+    Every chunk is sent with the deck title for context and retried on its
+    own. A chunk whose response is malformed or has the wrong number of
+    slides after every retry yields None for its slides, so one bad
+    response no longer discards the whole deck's enhancement.
+    
+    Returns:
+        Enhanced deck title (None if unavailable) and one enhanced slide
+        (Gemini's JSON format) or None per input slide
+    """
+    chunks = split_chunks(deck.slides, chunk_size)
+    
+    def enhance_chunk(chunk):
+        user_prompt = build_user_prompt(replace(deck, slides=chunk))
+        for attempt in range(1, GEMINI_CHUNK_RETRIES + 2):
+            try:
+                enhanced_data = request_enhancement(model_client, system_prompt, user_prompt, priority)
+                if chunk_complete(enhanced_data, chunk, attempt):
+                    return enhanced_data
+            except Exception as e:
+                logging.warning(f"Chunk attempt {attempt} failed: {e}")
+        logging.warning(f"Keeping {len(chunk)} original slides after chunk failure")
+        return None
+    
+    if len(chunks) == 1:
+        results = [enhance_chunk(chunks[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(chunks)), thread_name_prefix="gemini") as executor:
+            results = list(executor.map(metrics.in_request_context(enhance_chunk), chunks))
+    
+    return merge_chunks(chunks, results)
+
+async def enhance_slides_async(
+    deck: Deck,
+    system_prompt: str,
+    chunk_size: int,
+    max_concurrency: int,
+    model_client,
+    priority: Optional[int] = None
+) -> Tuple[Optional[str], List[Optional[Dict]]]:
+    """Asyncio version of enhance_slides, with at most ``max_concurrency`` chunks in flight"""
+    chunks = split_chunks(deck.slides, chunk_size)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def enhance_chunk(chunk):
+        user_prompt = build_user_prompt(replace(deck, slides=chunk))
+        async with semaphore:
+            for attempt in range(1, GEMINI_CHUNK_RETRIES + 2):
+                try:
+                    enhanced_data = await request_enhancement_async(model_client, system_prompt, user_prompt, priority)
+                    if chunk_complete(enhanced_data, chunk, attempt):
+                        return enhanced_data
+                except Exception as e:
+                    logging.warning(f"Chunk attempt {attempt} failed: {e}")
+        logging.warning(f"Keeping {len(chunk)} original slides after chunk failure")
+        return None
+    
+    results = await asyncio.gather(*(enhance_chunk(chunk) for chunk in chunks))
+    return merge_chunks(chunks, results)
+
+def split_chunks(slides: List[Slide], chunk_size: int) -> List[List[Slide]]:
+    """Split slides into request chunks; a chunk size of 0 (or the deck's size) means one request"""
+    if not chunk_size or len(slides) <= chunk_size:
+        chunk_size = len(slides)
+    return [slides[i:i + chunk_size] for i in range(0, len(slides), chunk_size)]
+
+def chunk_complete(enhanced_data: Optional[Dict], chunk: List[Slide], attempt: int) -> bool:
+    """Whether a chunk's response has one enhanced slide per slide sent"""
+    enhanced_slides = enhanced_data.get('slides', []) if enhanced_data else []
+    if len(enhanced_slides) == len(chunk):
+        return True
+    logging.warning(f"Chunk attempt {attempt} returned {len(enhanced_slides)} of {len(chunk)} slides")
+    return False
+
+def merge_chunks(chunks: List[List[Slide]], results: List[Optional[Dict]]) -> Tuple[Optional[str], List[Optional[Dict]]]:
+    """Enhanced title and per-slide results from chunk responses (None for failed chunks)"""
+    title = next((enhanced_data.get('title') for enhanced_data in results if enhanced_data), None)
+    enhanced_slides = []
+    for chunk, enhanced_data in zip(chunks, results):
+        enhanced_slides.extend(enhanced_data['slides'] if enhanced_data else [None] * len(chunk))
+    
+    return title, enhanced_slides
+
+def build_enhanced_result(deck: Deck, title: Optional[str], enhanced_slides: List[Optional[Dict]]) -> Deck:
+    """Combine enhanced slides with the originals; slides without an enhancement are kept as they were"""
+    slides = [
+        merge_enhanced_slide(original_slide, enhanced) if enhanced else original_slide
+        for original_slide, enhanced in zip(deck.slides, enhanced_slides)
+    ]
+    return replace(deck, title=title or deck.title, slides=slides)
+
+def store_enhancement(
+    cache: ResultCache,
+    system_prompt: str,
+    deck: Deck,
+    title: Optional[str],
+    enhanced_slides: List[Optional[Dict]]
+) -> Optional[str]:
+    """
+    Cache a deck's enhanced title, and the whole deck once every slide is enhanced
+    
+    Returns:
+        The deck title to use, falling back to a cached one when ``title`` is None
+    """
+    title_key = enhancement_key(system_prompt, replace(deck, slides=[]))
+    if title:
+        cache.set(title_key, title)
+    else:
+        title = cache.get(title_key)
+    if title and all(enhanced_slides):
+        cache.set(enhancement_key(system_prompt, deck), {'title': title, 'slides': enhanced_slides})
+    return title
+
+def enhancement_key(system_prompt: str, deck: Deck) -> str:
+    """
+    Cache key for an enhancement request
+    
+    Hashes the system prompt, the user prompt, model and temperature. The
+    theme is left out because it only changes how the deck looks.
+    """
+    user_prompt = build_user_prompt(replace(deck, theme='default'))
+    payload = json.dumps([system_prompt, user_prompt, GEMINI_MODEL, GEMINI_TEMPERATURE])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def slide_enhancement_key(system_prompt: str, slide: Slide) -> str:
+    """
+    Cache key for one slide's enhancement
+    
+    Hashes the slide's own content with the system prompt (mode, bullet
+    limit and tone), model and temperature, but not the deck title, so
+    renaming a deck reuses every slide and editing one slide only
+    re-enhances that slide.
+    """
+    payload = json.dumps(['slide', system_prompt, slide.title, slide.bullets, GEMINI_MODEL, GEMINI_TEMPERATURE])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def get_enhancement_cache() -> Optional[ResultCache]:
+    """Return the process-wide enhancement cache, or None if caching is disabled"""
+    global _enhancement_cache
+    if _enhancement_cache is None and GEMINI_CACHE:
+        with _cache_lock:
+            if _enhancement_cache is None:
+                _enhancement_cache = create_cache(GEMINI_CACHE, GEMINI_CACHE_TTL,
+                                                  max_entries=GEMINI_CACHE_SIZE, table='enhancements')
+    return _enhancement_cache
+
+def request_enhancement(
+    model_client,
+    system_prompt: str,
+    user_prompt: str,
+    priority: Optional[int] = None
+) -> Optional[Dict]:
+    """
+    Send one enhancement request through the scheduler and return the parsed JSON, or None
+    
+    Identical prompts in flight at the same time share one Gemini call.
+    """
+    arguments = request_arguments(system_prompt, user_prompt)
+    with metrics.span('gemini_request'):
+        response = get_scheduler().call(
+            lambda: model_client.models.generate_content(**arguments),
+            key=request_key(model_client, system_prompt, user_prompt),
+            tokens=request_tokens(system_prompt, user_prompt),
+            priority=priority
+        )
+    return parse_response(response)
+
+async def request_enhancement_async(
+    model_client,
+    system_prompt: str,
+    user_prompt: str,
+    priority: Optional[int] = None
+) -> Optional[Dict]:
+    """Asyncio version of request_enhancement, using the SDK's async client"""
+    arguments = request_arguments(system_prompt, user_prompt)
+    with metrics.span('gemini_request'):
+        response = await get_scheduler().call_async(
+            lambda: model_client.aio.models.generate_content(**arguments),
+            key=request_key(model_client, system_prompt, user_prompt),
+            tokens=request_tokens(system_prompt, user_prompt),
+            priority=priority
+        )
+    return parse_response(response)
+
+def parse_response(response) -> Optional[Dict]:
+    """Parse a generate_content response's JSON, or None if it is empty or malformed"""
+    if not response.text:
+        logging.error("Empty response from Gemini")
+        return None
+    
+    # Parse JSON response
+    try:
+        enhanced_data = json.loads(response.text)
+        logging.info("Successfully parsed Gemini response")
+        return enhanced_data
+    except json.JSONDecodeError as e:
+        logging.error(f"Failed to parse Gemini JSON response: {e}")
+        return None
+
+def request_key(model_client, system_prompt: str, user_prompt: str) -> str:
+    """Identity of a request for coalescing calls in flight"""
+    return hashlib.sha256(json.dumps([id(model_client), system_prompt, user_prompt]).encode()).hexdigest()
+
+def request_tokens(system_prompt: str, user_prompt: str) -> int:
+    """Tokens to budget for a request: the prompt, and a response about as long"""
+    return 2 * estimate_tokens(system_prompt, user_prompt)
+
+def request_arguments(system_prompt: str, user_prompt: str) -> Dict:
+    """Keyword arguments for a generate_content/generate_content_stream call"""
+    from google.genai import types
+    from services.gemini_schema import EnhancedPresentation
+    
+    return {
+        'model': GEMINI_MODEL,
+        'contents': [
+            types.Content(role="user", parts=[types.Part(text=user_prompt)])
+        ],
+        'config': types.GenerateContentConfig(
+            system_instruction=system_prompt,
+            response_mime_type="application/json",
+            response_schema=EnhancedPresentation,
+            temperature=GEMINI_TEMPERATURE
+        ),
+    }
+
+class EnhancementStream:
+    """
+    Streamed enhancement that hands out each slide as soon as it is complete
+    
+    Iterating yields ``(index, slide)`` pairs in deck order, as Slides with
+    the original images kept. Slides already in the per-slide enhancement
+    cache are not sent; the rest are streamed and each is cached as soon as
+    it is complete. Slides the model never finished (the stream failed or
+    was cut short) are yielded unenhanced, so every original slide comes
+    out exactly once. After iteration, ``title`` holds the enhanced deck
+    title (or None), ``enhanced`` the number of enhanced slides and
+    ``error`` any failure message.
+    """
+    
+    def __init__(
+        self,
+        deck: Deck,
+        mode: Literal["polish", "expand", "notes"],
+        max_new_bullets: int = 3,
+        tone: str = "professional",
+        model_client=None
+    ):
+        self.deck = deck
+        self.system_prompt = build_system_prompt(mode, max_new_bullets, tone)
+        self.model_client = model_client
+        self.priority = current_priority()
+        self.title = None
+        self.enhanced = 0
+        self.error = None
+    
+    def __iter__(self) -> Iterator[Tuple[int, Slide]]:
+        slides = self.deck.slides
+        plan = EnhancementPlan(self.deck, self.system_prompt)
+        
+        if plan.from_cache:
+            self.title, self.enhanced = plan.title, len(slides)
+            yield from enumerate(plan.result().slides)
+            return
+        
+        # Slides found in the per-slide cache are handed out in place; only the rest are streamed
+        missing = plan.missing
+        next_index = 0
+        
+        def ready(up_to: int) -> Iterator[Tuple[int, Slide]]:
+            nonlocal next_index
+            for index in range(next_index, up_to):
+                enhanced = plan.enhanced_slides[index]
+                yield index, merge_enhanced_slide(slides[index], enhanced) if enhanced else slides[index]
+            next_index = max(next_index, up_to)
+        
+        parser = SlideStreamParser()
+        streamed = 0
+        if missing:
+            yield from ready(missing[0])
+            try:
+                logging.info(f"Streaming {len(missing)} of {len(slides)} slides from Gemini")
+                user_prompt = build_user_prompt(plan.request_deck())
+                model_client = self.model_client or get_client()
+                arguments = request_arguments(self.system_prompt, user_prompt)
+                response = get_scheduler().stream(
+                    lambda: model_client.models.generate_content_stream(**arguments),
+                    tokens=request_tokens(self.system_prompt, user_prompt),
+                    priority=self.priority
+                )
+                for chunk in response:
+                    for enhanced in parser.feed(chunk.text or ''):
+                        if streamed >= len(missing):
+                            continue
+                        index = missing[streamed]
+                        streamed += 1
+                        plan.enhanced_slides[index] = enhanced
+                        if plan.cache:
+                            plan.cache.set(plan.slide_keys[index], enhanced)
+                        yield from ready(index + 1)
+            except Exception as e:
+                logging.error(f"Error streaming enhancement from Gemini: {e}")
+                self.error = str(e)
+        
+        self.enhanced = sum(1 for enhanced in plan.enhanced_slides if enhanced)
+        if streamed < len(missing):
+            logging.warning(f"Gemini stream enhanced {self.enhanced} of {len(slides)} slides, keeping the rest")
+        yield from ready(len(slides))
+        
+        self.title = parser.title
+        if plan.cache and self.enhanced:
+            self.title = store_enhancement(plan.cache, self.system_prompt, self.deck, self.title, plan.enhanced_slides)
+
+class SlideStreamParser:
+    """
+    Incremental parser for a streamed EnhancedPresentation JSON document
+    
+    ``feed`` takes the next piece of response text and returns the slide
+    objects completed by it. The top-level ``title`` is captured as soon as
+    its string value closes.
+    """
+    
+    def __init__(self):
+        self.title = None
+        self._buffer = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._expect_key = False
+        self._key = None
+        self._in_slides = False
+        self._slide_start = None
+    
+    def feed(self, text: str) -> List[Dict]:
+        self._buffer += text
+        slides = []
+        buffer = self._buffer
+        
+        for pos in range(self._pos, len(buffer)):
+            char = buffer[pos]
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        value = json.loads(buffer[self._string_start:pos + 1])
+                        if self._expect_key:
+                            self._key = value
+                        elif self._key == 'title':
+                            self.title = value
+                continue
+            
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char in '{[':
+                if char == '[' and self._depth == 1 and self._key == 'slides':
+                    self._in_slides = True
+                elif char == '{' and self._depth == 2 and self._in_slides:
+                    self._slide_start = pos
+                self._depth += 1
+                self._expect_key = char == '{'
+            elif char in '}]':
+                self._depth -= 1
+                if char == '}' and self._depth == 2 and self._slide_start is not None:
+                    slides.append(json.loads(buffer[self._slide_start:pos + 1]))
+                    self._slide_start = None
+                elif char == ']' and self._depth == 1:
+                    self._in_slides = False
+            elif char == ',' and self._depth == 1:
+                self._expect_key = True
+            elif char == ':' and self._depth == 1:
+                self._expect_key = False
+        
+        self._pos = len(buffer)
+        return slides
+
+def merge_enhanced_slide(original: Slide, enhanced: Dict) -> Slide:
+    """Build a Slide from Gemini's JSON for it, keeping the original's images"""
+    return Slide(
+        title=enhanced.get('title', ''),
+        bullets=enhanced.get('bullets') or [],
+        image_url=original.image_url,
+        image_path=original.image_path,
+        image_digest=original.image_digest,
+        image_keywords=enhanced.get('image_keywords') or None,
+        speaker_notes=enhanced.get('speaker_notes') or None,
+    )
+
 def build_system_prompt(mode: str, max_new_bullets: int, tone: str) -> str:
     """Build system prompt based on enhancement mode"""
     
@@ -147,25 +631,35 @@ Your task: Generate speaker notes and polish content.
     
     return f"{base_prompt}\n\n{specific_instructions}"
 
-def build_user_prompt(presentation_data: Dict) -> str:
+def build_user_prompt(deck: Deck) -> str:
     """Build user prompt with presentation data"""
     
     slides_text = ""
-    for i, slide in enumerate(presentation_data['slides'], 1):
-        bullets_text = "\n".join([f"  - {bullet}" for bullet in slide.get('bullets', [])])
+    for i, slide in enumerate(deck.slides, 1):
+        bullets_text = "\n".join([f"  - {bullet}" for bullet in slide.bullets])
         slides_text += f"""
 Slide {i}:
-  Title: {slide.get('title', '')}
+  Title: {slide.title}
   Bullets:
 {bullets_text}
 """
     
     return f"""Please enhance this presentation:
 
-Title: {presentation_data['title']}
-Theme: {presentation_data.get('theme', 'default')}
-Tone: {presentation_data.get('tone', 'professional')}
+Title: {deck.title}
+Theme: {deck.theme}
+Tone: {deck.tone}
 
 Slides:{slides_text}
 
 Respond with JSON following the exact schema with enhanced content."""
+
+def _collect_cache_metrics():
+    """Publish enhancement cache statistics on the metrics endpoint"""
+    if _enhancement_cache is not None:
+        stats = _enhancement_cache.stats()
+        for result in ('hits', 'stale_hits', 'misses'):
+            metrics.CACHE_LOOKUPS.set_total(stats[result], cache='enhancements', result=result)
+        metrics.CACHE_ENTRIES.set(stats['entries'], cache='enhancements')
+
+metrics.REGISTRY.add_collector(_collect_cache_metrics)
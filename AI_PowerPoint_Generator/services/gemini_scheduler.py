@@ -0,0 +1,331 @@
+"""Process-wide scheduler for Gemini calls: rate budget, priority queue, 429 retries and request coalescing"""
+import os
+import time
+import asyncio
+import heapq
+import random
+import logging
+import itertools
+import threading
+import contextvars
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterable, Iterator, Optional, Tuple
+from services import metrics
+
+# Budget for this process; divide the project quota between gunicorn workers (0 = unlimited)
+GEMINI_RPM = float(os.environ.get("GEMINI_RPM", "150"))
+GEMINI_TPM = float(os.environ.get("GEMINI_TPM", "2000000"))
+GEMINI_RATE_LIMIT_RETRIES = int(os.environ.get("GEMINI_RATE_LIMIT_RETRIES", "4"))
+GEMINI_BACKOFF_BASE = float(os.environ.get("GEMINI_BACKOFF_BASE", "1.0"))
+GEMINI_BACKOFF_MAX = float(os.environ.get("GEMINI_BACKOFF_MAX", "30"))
+GEMINI_QUEUE_TIMEOUT = float(os.environ.get("GEMINI_QUEUE_TIMEOUT", "60"))
+
+# How often a coroutine waiting behind other calls checks the queue again
+ASYNC_POLL_INTERVAL = 0.05
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+_PRIORITY_NAMES = {PRIORITY_INTERACTIVE: 'interactive', PRIORITY_BATCH: 'batch'}
+
+# Quota exhausted, and the overloaded responses Gemini sends under load
+RETRYABLE_STATUS = {429, 503}
+
+_priority = contextvars.ContextVar('gemini_priority', default=PRIORITY_INTERACTIVE)
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+class SchedulerTimeout(RuntimeError):
+    """A call waited longer than the queue timeout for its share of the budget"""
+
+def get_scheduler() -> 'GeminiScheduler':
+    """Return the process-wide scheduler, creating it on first use"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = GeminiScheduler()
+    return _scheduler
+
+@contextmanager
+def priority(level: int):
+    """Schedule the Gemini calls made in the wrapped block (in this context) at ``level``"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority() -> int:
+    return _priority.get()
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough token count of prompt text, at about four characters per token"""
+    return sum(len(text) for text in texts) // 4 + 1
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a client error means "slow down" (google-genai errors carry the HTTP status as ``code``)"""
+    status = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+    return status in RETRYABLE_STATUS or 'RESOURCE_EXHAUSTED' in str(error)
+
+class TokenBucket:
+    """
+    Budget refilled continuously at ``per_minute`` units a minute, holding at most a minute's worth
+    
+    A rate of 0 disables the limit. Not thread-safe on its own; the
+    scheduler only touches it under its lock.
+    """
+    
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.level = per_minute
+        self._clock = clock
+        self._updated = clock()
+    
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` is available, 0 when it is now"""
+        if not self.rate:
+            return 0.0
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+        # A request larger than the whole bucket waits for a full bucket rather than forever
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+    
+    def take(self, amount: float):
+        if self.rate:
+            self.level -= min(amount, self.capacity)
+
+class GeminiScheduler:
+    """
+    Gate in front of the Gemini client shared by every request in the process
+    
+    Calls wait in a priority queue (interactive before batch, then first
+    come first served) until the request and token buckets can pay for
+    them, so a burst of decks is spread over the quota instead of being
+    answered with 429s. Calls that still get a 429 (or 503) are retried
+    after an exponential backoff with jitter, going back through the
+    queue. Calls given the same ``key`` while one is in flight wait for
+    that one and share its result. Threads and coroutines (the ``_async``
+    methods) share the queue and budget.
+    """
+    
+    def __init__(
+        self,
+        requests_per_minute: float = GEMINI_RPM,
+        tokens_per_minute: float = GEMINI_TPM,
+        retries: int = GEMINI_RATE_LIMIT_RETRIES,
+        backoff_base: float = GEMINI_BACKOFF_BASE,
+        backoff_max: float = GEMINI_BACKOFF_MAX,
+        queue_timeout: float = GEMINI_QUEUE_TIMEOUT
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.queue_timeout = queue_timeout
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._in_flight = {}
+        self._in_flight_async = {}
+        self._in_flight_lock = threading.Lock()
+    
+    def call(self, func: Callable[[], Any], key: Optional[str] = None, tokens: int = 0,
+             priority: Optional[int] = None) -> Any:
+        """
+        Run ``func()`` once the budget allows, retrying rate-limited attempts
+        
+        Args:
+            func: The Gemini call
+            key: Identity of the request; concurrent calls with the same key make one call
+            tokens: Estimated tokens the call uses
+            priority: Queue priority (defaults to the context's, see ``priority()``)
+        
+        Returns:
+            What ``func`` returned; its exception is raised once retries are used up
+        """
+        if key is None:
+            return self._call(func, tokens, priority)
+        
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            metrics.GEMINI_COALESCED.inc()
+            return future.result()
+        
+        try:
+            result = self._call(func, tokens, priority)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+    
+    async def call_async(self, func: Callable[[], Awaitable], key: Optional[str] = None, tokens: int = 0,
+                         priority: Optional[int] = None) -> Any:
+        """``call`` for coroutines: ``func()`` returns an awaitable, and waiting never blocks the event loop"""
+        if key is None:
+            return await self._call_async(func, tokens, priority)
+        
+        with self._in_flight_lock:
+            task = self._in_flight_async.get(key)
+            if task is None:
+                task = self._in_flight_async[key] = asyncio.ensure_future(self._call_async(func, tokens, priority))
+                task.add_done_callback(lambda done: self._forget_task(key, done))
+            else:
+                metrics.GEMINI_COALESCED.inc()
+        # A caller that is cancelled does not cancel the call others are waiting on
+        return await asyncio.shield(task)
+    
+    def _forget_task(self, key: str, task: asyncio.Future):
+        with self._in_flight_lock:
+            if self._in_flight_async.get(key) is task:
+                del self._in_flight_async[key]
+    
+    def stream(self, start: Callable[[], Iterable], tokens: int = 0, priority: Optional[int] = None) -> Iterator:
+        """
+        Iterate a streamed call started by ``start()`` once the budget allows
+        
+        Rate-limited attempts are retried until the first item arrives;
+        after that an error is raised to the caller, which already holds
+        part of the response.
+        """
+        for attempt in itertools.count(1):
+            self.acquire(tokens, priority)
+            received = False
+            try:
+                for item in start():
+                    received = True
+                    yield item
+                metrics.GEMINI_CALLS.inc(result='ok')
+                return
+            except Exception as e:
+                if received:
+                    metrics.GEMINI_CALLS.inc(result='error')
+                    raise
+                time.sleep(self._retry_delay(e, attempt))
+    
+    def _call(self, func: Callable[[], Any], tokens: int, priority: Optional[int]) -> Any:
+        for attempt in itertools.count(1):
+            self.acquire(tokens, priority)
+            try:
+                result = func()
+            except Exception as e:
+                time.sleep(self._retry_delay(e, attempt))
+                continue
+            metrics.GEMINI_CALLS.inc(result='ok')
+            return result
+    
+    async def _call_async(self, func: Callable[[], Awaitable], tokens: int, priority: Optional[int]) -> Any:
+        for attempt in itertools.count(1):
+            await self.acquire_async(tokens, priority)
+            try:
+                result = await func()
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(e, attempt))
+                continue
+            metrics.GEMINI_CALLS.inc(result='ok')
+            return result
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Seconds to back off before retrying ``error``; re-raises it when it is not retryable or retries are used up"""
+        if not is_retryable(error):
+            metrics.GEMINI_CALLS.inc(result='error')
+            raise error
+        metrics.GEMINI_CALLS.inc(result='rate_limited')
+        if attempt > self.retries:
+            raise error
+        # Equal jitter: at least half the exponential delay, so retries never bunch up at zero
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        logging.warning(f"Gemini rate limited ({error}), retry {attempt} of {self.retries} in {delay:.1f}s")
+        return delay
+    
+    def acquire(self, tokens: int = 0, priority: Optional[int] = None):
+        """
+        Wait until this call is first in the queue and the budget covers it, then spend the budget
+        
+        Raises:
+            SchedulerTimeout: The call waited longer than ``queue_timeout``
+        """
+        ticket, started = self._enqueue(priority)
+        with self._condition:
+            try:
+                while True:
+                    wait = self._admit(ticket, tokens, started)
+                    if not wait:
+                        break
+                    self._condition.wait(wait)
+            finally:
+                self._dequeue(ticket)
+        self._record_wait(ticket, started)
+    
+    async def acquire_async(self, tokens: int = 0, priority: Optional[int] = None):
+        """``acquire`` for coroutines, sharing the same queue and budget"""
+        ticket, started = self._enqueue(priority)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._admit(ticket, tokens, started)
+                if not wait:
+                    break
+                # Threads are woken by the condition; coroutines look again after a short sleep
+                await asyncio.sleep(min(wait, ASYNC_POLL_INTERVAL))
+        finally:
+            with self._condition:
+                self._dequeue(ticket)
+        self._record_wait(ticket, started)
+    
+    def _enqueue(self, priority: Optional[int]) -> Tuple[Tuple[int, int], float]:
+        priority = current_priority() if priority is None else priority
+        ticket = (priority, next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._queue, ticket)
+        metrics.GEMINI_QUEUE_DEPTH.inc()
+        return ticket, time.monotonic()
+    
+    def _admit(self, ticket: Tuple[int, int], tokens: int, started: float) -> float:
+        """
+        Spend the budget if ``ticket`` heads the queue and it is available; call with the lock held
+        
+        Returns:
+            0 once admitted, otherwise the seconds to wait before trying again
+        """
+        remaining = started + self.queue_timeout - time.monotonic()
+        if self._queue[0] == ticket:
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if not wait:
+                self.requests.take(1)
+                self.tokens.take(tokens)
+                return 0
+        else:
+            # Woken when the head of the queue changes
+            wait = remaining
+        if remaining <= 0:
+            raise SchedulerTimeout(f"Gemini call waited over {self.queue_timeout:.0f}s for rate budget")
+        return min(wait, remaining)
+    
+    def _dequeue(self, ticket: Tuple[int, int]):
+        """Take a ticket off the queue, admitted or not; call with the lock held"""
+        if self._queue[0] == ticket:
+            heapq.heappop(self._queue)
+        else:
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+        metrics.GEMINI_QUEUE_DEPTH.dec()
+        self._condition.notify_all()
+    
+    def _record_wait(self, ticket: Tuple[int, int], started: float):
+        priority = ticket[0]
+        metrics.GEMINI_QUEUE_WAIT.observe(time.monotonic() - started, priority=_PRIORITY_NAMES.get(priority, priority))
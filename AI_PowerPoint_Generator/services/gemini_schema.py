@@ -0,0 +1,13 @@
+"""Response schema for Gemini enhancement requests (imported on first request, not at startup)"""
+from typing import List, Optional
+from pydantic import BaseModel
+
+class SlideData(BaseModel):
+    title: str
+    bullets: List[str]
+    speaker_notes: Optional[str] = None
+    image_keywords: Optional[List[str]] = None
+
+class EnhancedPresentation(BaseModel):
+    title: str
+    slides: List[SlideData]
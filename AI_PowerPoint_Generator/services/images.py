@@ -1,8 +1,90 @@
 import os
+import time
+import asyncio
+import sqlite3
+import hashlib
 import logging
 import tempfile
+import threading
 import requests
-from typing import List, Optional
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from PIL import Image, ImageOps
+from typing import Dict, Iterable, List, Optional
+from services.cache import ResultCache, create_cache
+from services import metrics
+
+# Prefetch limits: at most this many concurrent downloads per deck, and the
+# whole prefetch stage gives up after the deadline (seconds)
+PREFETCH_MAX_WORKERS = int(os.environ.get("IMAGE_PREFETCH_WORKERS", "8"))
+PREFETCH_DEADLINE = float(os.environ.get("IMAGE_PREFETCH_DEADLINE", "45"))
+
+PEXELS_SEARCH_URL = os.environ.get("PEXELS_API_URL", "https://api.pexels.com/v1/search")
+PEXELS_MAX_WORKERS = int(os.environ.get("PEXELS_MAX_WORKERS", "4"))
+
+# Pexels query cache: "memory" for a per-worker store or a sqlite file path
+# shared by all workers. PEXELS_CACHE_STALE > 0 serves expired entries for
+# that many extra seconds while they refresh in the background.
+PEXELS_CACHE = os.environ.get("PEXELS_CACHE", "memory")
+PEXELS_CACHE_TTL = float(os.environ.get("PEXELS_CACHE_TTL", "86400"))
+PEXELS_CACHE_STALE = float(os.environ.get("PEXELS_CACHE_STALE", "0"))
+PEXELS_CACHE_SIZE = int(os.environ.get("PEXELS_CACHE_SIZE", "10000"))
+
+# Connection pool of the async pipeline's shared HTTP client (all hosts)
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.environ.get("ASYNC_HTTP_MAX_CONNECTIONS", "100"))
+
+# Persistent image cache; set IMAGE_CACHE_DIR to an empty string to disable
+IMAGE_CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ppt-image-cache"))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_MB", "256")) * 1024 * 1024
+IMAGE_CACHE_MAX_AGE = float(os.environ.get("IMAGE_CACHE_MAX_AGE", "86400"))
+
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+# Images are downscaled to the box they are placed in at this DPI and
+# re-encoded without metadata before embedding. The work runs in a process
+# pool so Pillow's encoding does not compete with request threads.
+NORMALIZE_IMAGES = os.environ.get("IMAGE_NORMALIZE", "1") == "1"
+IMAGE_DPI = int(os.environ.get("IMAGE_DPI", "150"))
+IMAGE_JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY", "85"))
+IMAGE_NORMALIZE_WORKERS = int(os.environ.get("IMAGE_NORMALIZE_WORKERS", "2"))
+
+_session = None
+_session_lock = threading.Lock()
+_image_cache = None
+_query_cache = None
+_normalize_pool = None
+
+def get_http_session() -> requests.Session:
+    """
+    Return the process-wide HTTP session
+    
+    The session keeps connections alive per host, so repeated Pexels lookups
+    and image downloads reuse TLS connections instead of reconnecting.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = max(PREFETCH_MAX_WORKERS, PEXELS_MAX_WORKERS)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+def create_async_http_client():
+    """
+    Create the HTTP client for the async pipeline
+    
+    One httpx.AsyncClient is shared by every deck on an event loop, keeping
+    up to ASYNC_HTTP_MAX_CONNECTIONS keep-alive connections across hosts.
+    It must be used and closed (``await client.aclose()``) on that loop.
+    """
+    import httpx
+    limits = httpx.Limits(max_connections=ASYNC_HTTP_MAX_CONNECTIONS,
+                          max_keepalive_connections=ASYNC_HTTP_MAX_CONNECTIONS)
+    return httpx.AsyncClient(limits=limits, timeout=30)
 
 def get_image_suggestions(keywords: List[str]) -> Optional[str]:
     """
@@ -22,43 +104,153 @@ def get_image_suggestions(keywords: List[str]) -> Optional[str]:
     if not keywords:
         return None
     
-    # Use first few keywords for search
-    search_query = " ".join(keywords[:3])
+    return _lookup_pexels(normalize_query(keywords), api_key)
+
+def get_image_suggestions_many(keyword_lists: List[Optional[List[str]]]) -> List[Optional[str]]:
+    """
+    Get image suggestions for a whole deck at once
     
-    try:
-        headers = {
-            "Authorization": api_key
-        }
-        
-        params = {
-            "query": search_query,
-            "per_page": 1,
-            "orientation": "landscape"
-        }
-        
-        response = requests.get(
-            "https://api.pexels.com/v1/search",
-            headers=headers,
-            params=params,
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            photos = data.get("photos", [])
-            
-            if photos:
-                # Get medium size image URL
-                photo = photos[0]
-                return photo.get("src", {}).get("medium", photo.get("src", {}).get("original"))
+    Identical queries are sent once and the lookups run concurrently over the
+    shared keep-alive session.
+    
+    Args:
+        keyword_lists: One keyword list (or None) per slide
         
-        logging.warning(f"Pexels API returned status {response.status_code}")
+    Returns:
+        Image URL or None for each slide, in slide order
+    """
+    queries = [normalize_query(keywords) if keywords else None for keywords in keyword_lists]
+    unique_queries = list(dict.fromkeys(query for query in queries if query))
+    if not unique_queries:
+        return [None] * len(queries)
+    
+    api_key = os.environ.get("PEXELS_API_KEY")
+    if not api_key:
+        logging.warning("Pexels API key not provided, skipping image suggestions")
+        return [None] * len(queries)
+    
+    workers = min(PEXELS_MAX_WORKERS, len(unique_queries))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pexels") as executor:
+        urls = dict(zip(unique_queries,
+                        executor.map(metrics.in_request_context(lambda query: _lookup_pexels(query, api_key)),
+                                     unique_queries)))
+    
+    return [urls.get(query) if query else None for query in queries]
+
+async def get_image_suggestions_many_async(http, keyword_lists: List[Optional[List[str]]]) -> List[Optional[str]]:
+    """
+    Asyncio version of get_image_suggestions_many
+    
+    Lookups share the query cache with the sync path but are not refreshed
+    in the background when stale; at most PEXELS_MAX_WORKERS run at once.
+    
+    Args:
+        http: Client from create_async_http_client
+        keyword_lists: One keyword list (or None) per slide
+    """
+    queries = [normalize_query(keywords) if keywords else None for keywords in keyword_lists]
+    unique_queries = list(dict.fromkeys(query for query in queries if query))
+    if not unique_queries:
+        return [None] * len(queries)
+    
+    api_key = os.environ.get("PEXELS_API_KEY")
+    if not api_key:
+        logging.warning("Pexels API key not provided, skipping image suggestions")
+        return [None] * len(queries)
+    
+    cache = get_query_cache()
+    semaphore = asyncio.Semaphore(PEXELS_MAX_WORKERS)
+    
+    async def lookup(query):
+        image_url = cache.get(query)
+        if image_url is None:
+            async with semaphore:
+                image_url = await _search_pexels_async(http, query, api_key)
+            cache.set(query, image_url)
+        return image_url
+    
+    urls = dict(zip(unique_queries, await asyncio.gather(*(lookup(query) for query in unique_queries))))
+    return [urls.get(query) if query else None for query in queries]
+
+def normalize_query(keywords: List[str]) -> str:
+    """
+    Build the Pexels search query for a keyword list
+    
+    Uses the first few keywords, lowercased and sorted, so near-identical
+    keyword lists map to the same query and cache entry.
+    """
+    words = sorted(keyword.strip().lower() for keyword in keywords[:3] if keyword and keyword.strip())
+    return " ".join(words)
+
+def get_query_cache() -> ResultCache:
+    """Return the process-wide Pexels query cache"""
+    global _query_cache
+    if _query_cache is None:
+        with _session_lock:
+            if _query_cache is None:
+                _query_cache = create_cache(PEXELS_CACHE, PEXELS_CACHE_TTL, PEXELS_CACHE_STALE,
+                                            PEXELS_CACHE_SIZE, table='pexels_queries')
+    return _query_cache
+
+def _lookup_pexels(search_query: str, api_key: str) -> Optional[str]:
+    """Resolve a normalised query through the query cache"""
+    if not search_query:
         return None
+    return get_query_cache().get_or_load(search_query, lambda: _search_pexels(search_query, api_key))
+
+def _search_pexels(search_query: str, api_key: str) -> Optional[str]:
+    """Run a single Pexels search and return the first photo URL"""
+    try:
+        with metrics.span('pexels_search'):
+            response = get_http_session().get(
+                PEXELS_SEARCH_URL,
+                headers={"Authorization": api_key},
+                params=_pexels_params(search_query),
+                timeout=10
+            )
+        return _first_photo_url(response)
         
     except Exception as e:
         logging.error(f"Error fetching image from Pexels: {e}")
         return None
 
+async def _search_pexels_async(http, search_query: str, api_key: str) -> Optional[str]:
+    """Asyncio version of _search_pexels"""
+    try:
+        with metrics.span('pexels_search'):
+            response = await http.get(
+                PEXELS_SEARCH_URL,
+                headers={"Authorization": api_key},
+                params=_pexels_params(search_query),
+                timeout=10
+            )
+        return _first_photo_url(response)
+    
+    except Exception as e:
+        logging.error(f"Error fetching image from Pexels: {e}")
+        return None
+
+def _pexels_params(search_query: str) -> Dict:
+    return {
+        "query": search_query,
+        "per_page": 1,
+        "orientation": "landscape"
+    }
+
+def _first_photo_url(response) -> Optional[str]:
+    """Medium size URL of the first photo in a Pexels search response"""
+    if response.status_code == 200:
+        data = response.json()
+        photos = data.get("photos", [])
+        
+        if photos:
+            # Get medium size image URL
+            photo = photos[0]
+            return photo.get("src", {}).get("medium", photo.get("src", {}).get("original"))
+    
+    logging.warning(f"Pexels API returned status {response.status_code}")
+    return None
+
 def download_image(image_url: str) -> Optional[str]:
     """
     Download image from URL to temporary file
@@ -70,38 +262,30 @@ def download_image(image_url: str) -> Optional[str]:
         Path to downloaded file or None if failed
     """
     try:
-        response = requests.get(image_url, timeout=30, stream=True)
-        response.raise_for_status()
-        
-        # Check content type
-        content_type = response.headers.get('content-type', '')
-        if not content_type.startswith('image/'):
-            logging.error(f"Invalid content type: {content_type}")
-            return None
-        
-        # Determine file extension
-        if 'jpeg' in content_type or 'jpg' in content_type:
-            extension = '.jpg'
-        elif 'png' in content_type:
-            extension = '.png'
-        elif 'gif' in content_type:
-            extension = '.gif'
-        else:
-            extension = '.jpg'  # Default fallback
-        
-        # Create temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=extension)
-        
-        # Download in chunks
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                temp_file.write(chunk)
-        
-        temp_file.close()
+        with get_http_session().get(image_url, timeout=30, stream=True) as response:
+            response.raise_for_status()
+            
+            # Check content type
+            content_type = response.headers.get('content-type', '')
+            if not content_type.startswith('image/'):
+                logging.error(f"Invalid content type: {content_type}")
+                return None
+            
+            # Create temporary file
+            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=_image_extension(content_type))
+            
+            # Download in chunks
+            with metrics.span('image_download'):
+                for chunk in response.iter_content(chunk_size=8192):
+                    if chunk:
+                        temp_file.write(chunk)
+            
+            temp_file.close()
         
         # Verify file size (max 10MB)
         file_size = os.path.getsize(temp_file.name)
-        if file_size > 10 * 1024 * 1024:
+        metrics.BYTES_DOWNLOADED.inc(file_size)
+        if file_size > MAX_IMAGE_BYTES:
             os.remove(temp_file.name)
             logging.error("Downloaded image too large")
             return None
@@ -112,6 +296,641 @@ def download_image(image_url: str) -> Optional[str]:
         logging.error(f"Error downloading image: {e}")
         return None
 
+async def download_image_async(http, image_url: str) -> Optional[str]:
+    """Asyncio version of download_image; cancelling it removes the partial file"""
+    temp_path = None
+    try:
+        async with http.stream('GET', image_url, timeout=30) as response:
+            response.raise_for_status()
+            
+            content_type = response.headers.get('content-type', '')
+            if not content_type.startswith('image/'):
+                logging.error(f"Invalid content type: {content_type}")
+                return None
+            
+            size = 0
+            with tempfile.NamedTemporaryFile(delete=False, suffix=_image_extension(content_type)) as temp_file:
+                temp_path = temp_file.name
+                with metrics.span('image_download'):
+                    async for chunk in response.aiter_bytes(8192):
+                        size += len(chunk)
+                        if size > MAX_IMAGE_BYTES:
+                            logging.error("Downloaded image too large")
+                            return None
+                        temp_file.write(chunk)
+        
+        metrics.BYTES_DOWNLOADED.inc(size)
+        path, temp_path = temp_path, None
+        return path
+    
+    except Exception as e:
+        logging.error(f"Error downloading image: {e}")
+        return None
+    
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _image_extension(content_type: str) -> str:
+    """Pick a file extension for an image content type"""
+    if 'jpeg' in content_type or 'jpg' in content_type:
+        return '.jpg'
+    elif 'png' in content_type:
+        return '.png'
+    elif 'gif' in content_type:
+        return '.gif'
+    return '.jpg'  # Default fallback
+
+class ImageCache:
+    """
+    Persistent content-addressed image cache shared between worker processes
+    
+    Image bytes are stored once per SHA-256 digest under ``blobs/`` and a
+    sqlite index maps each URL to its digest along with the validators
+    (ETag/Last-Modified) needed to revalidate it. Entries younger than
+    ``max_age`` are served without touching the network; older ones are
+    revalidated with a conditional GET. When the blobs exceed ``max_bytes``
+    the least recently used ones are evicted.
+    
+    Paths returned by ``fetch`` belong to the cache and must not be deleted
+    by callers. Each one pins its blob in the index until it is handed back
+    with ``release`` (see ``release_image``), so a slide still being rendered
+    by any worker keeps its file; only pinned blobs may hold the cache over
+    its byte budget.
+    """
+    
+    # Pins left behind by a process that died before releasing are ignored after this long
+    PIN_TIMEOUT = 600
+    
+    def __init__(self, directory: str, max_bytes: int = IMAGE_CACHE_MAX_BYTES, max_age: float = IMAGE_CACHE_MAX_AGE):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._counter_lock = threading.Lock()
+        
+        os.makedirs(os.path.join(self.directory, 'blobs'), exist_ok=True)
+        os.makedirs(os.path.join(self.directory, 'tmp'), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                extension TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS pins (
+                id INTEGER PRIMARY KEY,
+                digest TEXT NOT NULL,
+                pinned_at REAL NOT NULL
+            )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS pins_digest ON pins (digest)")
+    
+    def _connect(self):
+        conn = sqlite3.connect(os.path.join(self.directory, 'index.db'), timeout=30, isolation_level=None)
+        return _Transaction(conn)
+    
+    def _blob_path(self, digest: str, extension: str) -> str:
+        return os.path.join(self.directory, 'blobs', digest[:2], digest + extension)
+    
+    def _count(self, counter: str):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    
+    def contains(self, path: str) -> bool:
+        """Check whether a path lives inside this cache"""
+        return os.path.abspath(path).startswith(self.directory + os.sep)
+    
+    def fetch(self, image_url: str) -> Optional[str]:
+        """
+        Return a local path for an image, downloading it only when needed
+        
+        Args:
+            image_url: URL of the image
+            
+        Returns:
+            Path to the cached file or None if the image could not be fetched;
+            hand it back with ``release`` once it has been embedded
+        """
+        path, cached = self._lookup(image_url)
+        return path or self._download(image_url, cached)
+    
+    def release(self, path: str):
+        """Drop one pin taken by ``fetch`` on a blob, letting it be evicted again"""
+        digest = os.path.splitext(os.path.basename(path))[0]
+        with self._connect() as conn:
+            conn.execute("DELETE FROM pins WHERE id = (SELECT id FROM pins WHERE digest = ? LIMIT 1)", (digest,))
+    
+    async def fetch_async(self, http, image_url: str) -> Optional[str]:
+        """Asyncio version of fetch, downloading with the async pipeline's client"""
+        path, cached = self._lookup(image_url)
+        return path or await self._download_async(http, image_url, cached)
+    
+    def _lookup(self, image_url: str) -> tuple:
+        """
+        Look a URL up in the index
+        
+        Returns:
+            ``(path, cached)``: the blob path when the entry is fresh,
+            otherwise None and the ``(digest, path, etag, last_modified)``
+            to revalidate a stale entry with (None on a miss)
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT e.digest, b.extension, e.etag, e.last_modified, e.fetched_at "
+                "FROM entries e JOIN blobs b ON b.digest = e.digest WHERE e.url = ?",
+                (image_url,)
+            ).fetchone()
+        
+        if row:
+            digest, extension, etag, last_modified, fetched_at = row
+            path = self._blob_path(digest, extension)
+            if os.path.exists(path):
+                # A blob evicted since the index was read is a miss
+                if time.time() - fetched_at < self.max_age and self._touch(digest):
+                    self._count('hits')
+                    return path, None
+                return None, (digest, path, etag, last_modified)
+        
+        return None, None
+    
+    def _touch(self, digest: str, url: str = None) -> bool:
+        """Mark a blob used and pin it for the caller it is being handed to; False if it is gone"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if not conn.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (now, digest)).rowcount:
+                return False
+            conn.execute("INSERT INTO pins (digest, pinned_at) VALUES (?, ?)", (digest, now))
+            if url:
+                conn.execute("UPDATE entries SET fetched_at = ? WHERE url = ?", (now, url))
+        return True
+    
+    def _download(self, image_url: str, cached: tuple = None) -> Optional[str]:
+        temp_path = None
+        try:
+            with get_http_session().get(image_url, headers=self._validators(cached), timeout=30, stream=True) as response:
+                if cached and response.status_code == 304:
+                    # A blob evicted since the lookup is fetched again in full
+                    return self._revalidated(image_url, cached) or self._download(image_url)
+                
+                response.raise_for_status()
+                self._count('misses')
+                
+                content_type = response.headers.get('content-type', '')
+                if not content_type.startswith('image/'):
+                    logging.error(f"Invalid content type: {content_type}")
+                    return None
+                
+                # Stream into the cache's tmp dir while hashing, then move the
+                # finished file into place so readers never see partial blobs
+                sha256 = hashlib.sha256()
+                size = 0
+                with tempfile.NamedTemporaryFile(dir=os.path.join(self.directory, 'tmp'), delete=False) as temp_file:
+                    temp_path = temp_file.name
+                    with metrics.span('image_download'):
+                        for chunk in response.iter_content(chunk_size=8192):
+                            size += len(chunk)
+                            if size > MAX_IMAGE_BYTES:
+                                logging.error("Downloaded image too large")
+                                return None
+                            sha256.update(chunk)
+                            temp_file.write(chunk)
+                metrics.BYTES_DOWNLOADED.inc(size)
+                
+                headers = response.headers
+            
+            path = self._store(image_url, temp_path, sha256.hexdigest(), size, content_type, headers)
+            temp_path = None
+            return path
+        
+        except Exception as e:
+            logging.error(f"Error downloading image: {e}")
+            return None
+        
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    async def _download_async(self, http, image_url: str, cached: tuple = None) -> Optional[str]:
+        """
+        Asyncio version of _download
+        
+        Cancelling it (a prefetch deadline) removes the partial file.
+        """
+        temp_path = None
+        try:
+            async with http.stream('GET', image_url, headers=self._validators(cached), timeout=30) as response:
+                if cached and response.status_code == 304:
+                    return self._revalidated(image_url, cached) or await self._download_async(http, image_url)
+                
+                response.raise_for_status()
+                self._count('misses')
+                
+                content_type = response.headers.get('content-type', '')
+                if not content_type.startswith('image/'):
+                    logging.error(f"Invalid content type: {content_type}")
+                    return None
+                
+                sha256 = hashlib.sha256()
+                size = 0
+                with tempfile.NamedTemporaryFile(dir=os.path.join(self.directory, 'tmp'), delete=False) as temp_file:
+                    temp_path = temp_file.name
+                    with metrics.span('image_download'):
+                        async for chunk in response.aiter_bytes(8192):
+                            size += len(chunk)
+                            if size > MAX_IMAGE_BYTES:
+                                logging.error("Downloaded image too large")
+                                return None
+                            sha256.update(chunk)
+                            temp_file.write(chunk)
+                metrics.BYTES_DOWNLOADED.inc(size)
+                headers = response.headers
+            
+            path = self._store(image_url, temp_path, sha256.hexdigest(), size, content_type, headers)
+            temp_path = None
+            return path
+        
+        except Exception as e:
+            logging.error(f"Error downloading image: {e}")
+            return None
+        
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def _validators(self, cached: Optional[tuple]) -> Dict[str, str]:
+        """Conditional request headers for revalidating a stale entry"""
+        headers = {}
+        if cached:
+            _, _, etag, last_modified = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        return headers
+    
+    def _revalidated(self, image_url: str, cached: tuple) -> Optional[str]:
+        """Mark a stale entry fresh after a 304 and return its path, or None if its blob was evicted meanwhile"""
+        digest, path, _, _ = cached
+        if not self._touch(digest, url=image_url):
+            return None
+        self._count('revalidations')
+        self._count('hits')
+        return path
+    
+    def _store(self, image_url: str, temp_path: str, digest: str, size: int, content_type: str, headers) -> str:
+        """
+        Move a finished download into place and index it under its URL
+        
+        The file is moved while the index is write-locked, after its blob
+        row and pin are in, so an eviction can never see the file without
+        its pin.
+        """
+        extension = _image_extension(content_type)
+        path = self._blob_path(digest, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO blobs (digest, extension, size, last_access) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(digest) DO UPDATE SET last_access = excluded.last_access",
+                (digest, extension, size, now)
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (url, digest, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (image_url, digest, headers.get('ETag'), headers.get('Last-Modified'), now)
+            )
+            conn.execute("INSERT INTO pins (digest, pinned_at) VALUES (?, ?)", (digest, now))
+            os.replace(temp_path, path)
+        
+        self._evict()
+        return path
+    
+    def _evict(self):
+        """Drop least recently used unpinned blobs until the cache fits its byte budget"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            
+            conn.execute("DELETE FROM pins WHERE pinned_at < ?", (time.time() - self.PIN_TIMEOUT,))
+            candidates = conn.execute(
+                "SELECT digest, extension, size FROM blobs WHERE digest NOT IN (SELECT digest FROM pins) "
+                "ORDER BY last_access"
+            ).fetchall()
+            for digest, extension, size in candidates:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM entries WHERE digest = ?", (digest,))
+                conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+                try:
+                    os.remove(self._blob_path(digest, extension))
+                except OSError:
+                    pass
+                total -= size
+                self._count('evictions')
+    
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters for this process and the cache's current size"""
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            blobs, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidations': self.revalidations,
+            'evictions': self.evictions,
+            'entries': entries,
+            'blobs': blobs,
+            'bytes': size,
+        }
+
+class _Transaction:
+    """Context manager that commits (or rolls back) and closes a sqlite connection"""
+    
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+    
+    def __enter__(self) -> sqlite3.Connection:
+        return self.conn
+    
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.conn.close()
+
+def get_image_cache() -> Optional[ImageCache]:
+    """Return the process-wide image cache, or None if caching is disabled"""
+    global _image_cache
+    if _image_cache is None and IMAGE_CACHE_DIR:
+        with _session_lock:
+            if _image_cache is None:
+                _image_cache = ImageCache(IMAGE_CACHE_DIR)
+    return _image_cache
+
+def fetch_image(image_url: str) -> Optional[str]:
+    """
+    Get a local file for an image URL, going through the cache when enabled
+    
+    Args:
+        image_url: URL of the image
+        
+    Returns:
+        Path to the image or None if failed. Release it with ``release_image``.
+    """
+    cache = get_image_cache()
+    if cache:
+        return cache.fetch(image_url)
+    return download_image(image_url)
+
+async def fetch_image_async(http, image_url: str) -> Optional[str]:
+    """Asyncio version of fetch_image, downloading with the async pipeline's client"""
+    cache = get_image_cache()
+    if cache:
+        return await cache.fetch_async(http, image_url)
+    return await download_image_async(http, image_url)
+
+def release_image(path: str):
+    """Hand a file returned by ``fetch_image`` back: unpin it if the cache owns it, otherwise delete it"""
+    if not path:
+        return
+    cache = get_image_cache()
+    if cache and cache.contains(path):
+        try:
+            cache.release(path)
+        except sqlite3.Error as e:
+            logging.warning(f"Could not release cached image {path}: {e}")
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+@metrics.timed('image_prefetch')
+def prefetch_images(
+    image_urls: Iterable[str],
+    max_workers: Optional[int] = None,
+    deadline: Optional[float] = None
+) -> Dict[str, str]:
+    """
+    Download a set of images concurrently before slide layout starts
+    
+    Args:
+        image_urls: Image URLs referenced by the deck (duplicates are fetched once)
+        max_workers: Maximum concurrent downloads for this deck
+        deadline: Total time budget in seconds for the whole prefetch stage
+        
+    Returns:
+        Mapping of image URL to local file path (see ``fetch_image``). URLs
+        that failed or did not finish before the deadline are left out.
+    """
+    urls = list(dict.fromkeys(url for url in image_urls if url))
+    if not urls:
+        return {}
+    
+    max_workers = max_workers or PREFETCH_MAX_WORKERS
+    deadline = PREFETCH_DEADLINE if deadline is None else deadline
+    
+    started = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(urls)),
+                                  thread_name_prefix="image-prefetch")
+    fetch = metrics.in_request_context(fetch_image)
+    futures = {executor.submit(fetch, url): url for url in urls}
+    done, pending = wait(futures, timeout=deadline)
+    
+    # Late downloads keep running in the background; remove their files
+    # once they land so nothing is left behind in the temp directory
+    for future in pending:
+        future.add_done_callback(_discard_download)
+    executor.shutdown(wait=False, cancel_futures=True)
+    
+    results = {}
+    for future in done:
+        path = future.result()
+        if path:
+            results[futures[future]] = path
+    
+    if pending:
+        logging.warning(f"Image prefetch deadline hit, {len(pending)} of {len(urls)} images skipped")
+    logging.info(f"Prefetched {len(results)}/{len(urls)} images in {time.monotonic() - started:.2f}s")
+    
+    return results
+
+async def prefetch_images_async(
+    http,
+    image_urls: Iterable[str],
+    max_workers: Optional[int] = None,
+    deadline: Optional[float] = None
+) -> Dict[str, str]:
+    """
+    Asyncio version of prefetch_images
+    
+    Downloads still running at the deadline are cancelled rather than left
+    in the background, which removes their partial files.
+    
+    Args:
+        http: Client from create_async_http_client
+        image_urls: Image URLs referenced by the deck (duplicates are fetched once)
+        max_workers: Maximum concurrent downloads for this deck
+        deadline: Total time budget in seconds for the whole prefetch stage
+    
+    Returns:
+        Mapping of image URL to local file path, as for prefetch_images
+    """
+    urls = list(dict.fromkeys(url for url in image_urls if url))
+    if not urls:
+        return {}
+    
+    semaphore = asyncio.Semaphore(max_workers or PREFETCH_MAX_WORKERS)
+    deadline = PREFETCH_DEADLINE if deadline is None else deadline
+    
+    async def fetch(url):
+        async with semaphore:
+            return await fetch_image_async(http, url)
+    
+    with metrics.span('image_prefetch'):
+        started = time.monotonic()
+        tasks = {asyncio.ensure_future(fetch(url)): url for url in urls}
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+            for task in pending:
+                _discard_download(task)
+    
+    results = {}
+    for task in done:
+        path = task.result()
+        if path:
+            results[tasks[task]] = path
+    
+    if pending:
+        logging.warning(f"Image prefetch deadline hit, {len(pending)} of {len(urls)} images skipped")
+    logging.info(f"Prefetched {len(results)}/{len(urls)} images in {time.monotonic() - started:.2f}s")
+    
+    return results
+
+def _discard_download(future):
+    """Remove the file produced by a download that finished after the deadline"""
+    if not future.cancelled():
+        release_image(future.result())
+
+def file_digest(path: str) -> Optional[str]:
+    """Return the SHA-256 hex digest of a file, or None if it can't be read"""
+    try:
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+    except OSError:
+        return None
+
+def normalize_image(image_path: str, max_width: int, max_height: int) -> Optional[str]:
+    """
+    Downscale and re-encode an image for embedding
+    
+    The image is rotated according to its EXIF orientation, shrunk to fit
+    within ``max_width`` x ``max_height`` pixels keeping its aspect ratio,
+    and saved without metadata: JPEG for opaque images, PNG when it has
+    transparency. Images are never upscaled.
+    
+    Args:
+        image_path: Source image file
+        max_width: Maximum width in pixels
+        max_height: Maximum height in pixels
+        
+    Returns:
+        Path to a new temporary file (owned by the caller) or None if failed
+    """
+    try:
+        with Image.open(image_path) as source:
+            image = ImageOps.exif_transpose(source)
+            image.thumbnail((max_width, max_height), Image.LANCZOS)
+            
+            has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+            if has_alpha:
+                image = image.convert('RGBA')
+                extension, save_options = '.png', {'format': 'PNG', 'optimize': True}
+            else:
+                image = image.convert('RGB')
+                extension, save_options = '.jpg', {
+                    'format': 'JPEG', 'quality': IMAGE_JPEG_QUALITY, 'optimize': True, 'progressive': True
+                }
+            
+            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=extension)
+            with temp_file:
+                image.save(temp_file, **save_options)
+            return temp_file.name
+    
+    except Exception as e:
+        logging.error(f"Error normalizing image {image_path}: {e}")
+        return None
+
+@metrics.timed('image_normalize')
+def normalize_images(image_paths: Iterable[str], width_inches: float, height_inches: float) -> Dict[str, str]:
+    """
+    Normalize a deck's images in the process pool
+    
+    Args:
+        image_paths: Local image files (duplicates are processed once)
+        width_inches: Width of the box the images are placed in
+        height_inches: Height of the box the images are placed in
+        
+    Returns:
+        Mapping of source path to normalized temporary file. Images that
+        failed, or all of them when normalization is disabled, are left out.
+    """
+    paths = list(dict.fromkeys(path for path in image_paths if path))
+    if not paths or not NORMALIZE_IMAGES:
+        return {}
+    
+    max_width = int(width_inches * IMAGE_DPI)
+    max_height = int(height_inches * IMAGE_DPI)
+    
+    try:
+        results = _get_normalize_pool().map(
+            normalize_image, paths, [max_width] * len(paths), [max_height] * len(paths)
+        )
+        return {path: result for path, result in zip(paths, results) if result}
+    except Exception as e:
+        logging.error(f"Image normalization pool failed, embedding originals: {e}")
+        _reset_normalize_pool()
+        return {}
+
+def _get_normalize_pool() -> ProcessPoolExecutor:
+    global _normalize_pool
+    if _normalize_pool is None:
+        with _session_lock:
+            if _normalize_pool is None:
+                _normalize_pool = ProcessPoolExecutor(max_workers=IMAGE_NORMALIZE_WORKERS)
+    return _normalize_pool
+
+def _reset_normalize_pool():
+    """Drop a broken pool so the next deck starts a fresh one"""
+    global _normalize_pool
+    with _session_lock:
+        pool, _normalize_pool = _normalize_pool, None
+    if pool:
+        pool.shutdown(wait=False, cancel_futures=True)
+
 def validate_image_url(url: str) -> bool:
     """
     Validate if URL points to a valid image
@@ -143,3 +962,18 @@ def validate_image_url(url: str) -> bool:
         
     except Exception:
         return False
+
+def _collect_cache_metrics():
+    """Publish Pexels query and image cache statistics on the metrics endpoint"""
+    if _query_cache is not None:
+        stats = _query_cache.stats()
+        for result in ('hits', 'stale_hits', 'misses'):
+            metrics.CACHE_LOOKUPS.set_total(stats[result], cache='pexels', result=result)
+        metrics.CACHE_ENTRIES.set(stats['entries'], cache='pexels')
+    if _image_cache is not None:
+        stats = _image_cache.stats()
+        for result in ('hits', 'misses', 'revalidations'):
+            metrics.CACHE_LOOKUPS.set_total(stats[result], cache='images', result=result)
+        metrics.CACHE_ENTRIES.set(stats['blobs'], cache='images')
+
+metrics.REGISTRY.add_collector(_collect_cache_metrics)
@@ -0,0 +1,445 @@
+"""Background deck generation jobs: pluggable queues and a local worker pool"""
+import os
+import json
+import time
+import uuid
+import functools
+import queue
+import asyncio
+import shutil
+import sqlite3
+import logging
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+from models import Deck
+from services import metrics
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_RESULTS_DIR = os.environ.get("JOB_RESULTS_DIR", os.path.join(tempfile.gettempdir(), "ppt-jobs"))
+# A sqlite file next to the results by default, so every gunicorn worker sees every job;
+# "memory" keeps jobs in-process and the web form falls back to a plain /generate post
+JOB_QUEUE = os.environ.get("JOB_QUEUE", os.path.join(JOB_RESULTS_DIR, "jobs.sqlite3"))
+JOB_RESULT_TTL = float(os.environ.get("JOB_RESULT_TTL", "3600"))
+# A running job not updated for this long is taken to have lost its worker and
+# is queued again, until it has been claimed JOB_MAX_ATTEMPTS times
+JOB_LEASE = float(os.environ.get("JOB_LEASE", "600"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "2"))
+# Jobs in flight at once on the async runner (JOB_ASYNC)
+JOB_ASYNC_CONCURRENCY = int(os.environ.get("JOB_ASYNC_CONCURRENCY", "256"))
+
+class JobQueue(ABC):
+    """
+    Queue and status store for generation jobs
+    
+    A job is a dict with ``id``, ``status`` (queued, running, done, failed),
+    ``stage``, ``progress``, ``warnings``, ``error``, ``filename``,
+    ``attempts`` and ``created_at``/``updated_at``. Its Deck and upload
+    paths are kept alongside and handed to the worker that claims it.
+    """
+    
+    @abstractmethod
+    def submit(self, job: Dict, deck: Deck, uploads: List[str]):
+        raise NotImplementedError
+    
+    @abstractmethod
+    def claim(self, timeout: float) -> Optional[Tuple[Dict, Deck, List[str]]]:
+        """Take the oldest queued job, marking it running; None after timeout"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def update(self, job_id: str, **fields):
+        raise NotImplementedError
+    
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+    
+    @abstractmethod
+    def expire(self, older_than: float) -> List[str]:
+        """Forget finished jobs last updated before ``older_than``; return their ids"""
+        raise NotImplementedError
+
+class MemoryJobQueue(JobQueue):
+    """
+    In-process queue; status is only visible to the worker process that took the request
+    
+    Jobs die with the process that runs them, so there are no leases to expire.
+    """
+    
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, job, deck, uploads):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+        self._queue.put((job['id'], deck, uploads))
+    
+    def claim(self, timeout):
+        try:
+            job_id, deck, uploads = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(status='running', attempts=job.get('attempts', 0) + 1, updated_at=time.time())
+        return self.get(job_id), deck, uploads
+    
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields, updated_at=time.time())
+    
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+    
+    def expire(self, older_than):
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job['status'] in ('done', 'failed') and job['updated_at'] < older_than]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return expired
+
+class SqliteJobQueue(JobQueue):
+    """
+    sqlite-backed queue shared by every worker process using the same file
+    
+    Any process can claim a job and any process can report its status, so
+    jobs survive being polled through a different gunicorn worker. Every
+    status write renews a running job's lease; once a job has gone ``lease``
+    seconds without one, the next claim queues it again, or fails it and
+    removes its uploads after ``max_attempts`` claims.
+    """
+    
+    def __init__(self, path: str, lease: float = JOB_LEASE, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                job TEXT NOT NULL,
+                deck TEXT NOT NULL,
+                uploads TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        finally:
+            conn.close()
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+    
+    def submit(self, job, deck, uploads):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, status, job, deck, uploads, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job['id'], job['status'], json.dumps(job), json.dumps(deck.to_dict()), json.dumps(uploads),
+                 job['created_at'], job['updated_at'])
+            )
+        finally:
+            conn.close()
+    
+    def claim(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                self._recover_expired(conn)
+                row = conn.execute(
+                    "SELECT id, job, deck, uploads FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row:
+                    job = json.loads(row[1])
+                    job.update(status='running', attempts=job.get('attempts', 0) + 1, updated_at=time.time())
+                    conn.execute("UPDATE jobs SET status = ?, job = ?, updated_at = ? WHERE id = ?",
+                                 (job['status'], json.dumps(job), job['updated_at'], row[0]))
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+            
+            if row:
+                return job, Deck.from_dict(json.loads(row[2])), json.loads(row[3])
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.1)
+    
+    def _recover_expired(self, conn: sqlite3.Connection):
+        """Queue again, or fail, running jobs whose worker stopped renewing their lease"""
+        now = time.time()
+        rows = conn.execute(
+            "SELECT id, job, uploads FROM jobs WHERE status = 'running' AND updated_at < ?", (now - self.lease,)
+        ).fetchall()
+        for job_id, job, uploads in rows:
+            job = json.loads(job)
+            if job.get('attempts', 0) < self.max_attempts:
+                logging.warning(f"Job {job_id} lost its worker, queueing it again")
+                job.update(status='queued', stage='queued', progress=0.0, updated_at=now)
+            else:
+                logging.error(f"Job {job_id} lost its worker {job.get('attempts', 0)} times, giving up")
+                job.update(status='failed', stage='failed', error='The job was interrupted', updated_at=now)
+                remove_files(json.loads(uploads))
+            conn.execute("UPDATE jobs SET status = ?, job = ?, updated_at = ? WHERE id = ?",
+                         (job['status'], json.dumps(job), now, job_id))
+    
+    def update(self, job_id, **fields):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT job FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row:
+                job = json.loads(row[0])
+                job.update(fields, updated_at=time.time())
+                conn.execute("UPDATE jobs SET status = ?, job = ?, updated_at = ? WHERE id = ?",
+                             (job['status'], json.dumps(job), job['updated_at'], job_id))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+    
+    def get(self, job_id):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT job FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+    
+    def expire(self, older_than):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            expired = [row[0] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (older_than,)
+            )]
+            conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (older_than,))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return expired
+
+def remove_files(paths: List[str]):
+    """Delete files that may already be gone"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def create_job_queue(backend: str) -> JobQueue:
+    """Build a job queue: ``memory`` or a sqlite file path"""
+    if backend == 'memory':
+        return MemoryJobQueue()
+    return SqliteJobQueue(backend)
+
+class JobRunner:
+    """
+    Local worker pool that runs queued jobs through the generation pipeline
+    
+    Worker threads start on the first submit, so importing the app or
+    forking gunicorn workers does not spawn threads. Finished decks are
+    written to ``results_dir`` and removed ``result_ttl`` seconds later.
+    
+    With an ``async_runner`` the pipeline is a coroutine function: a single
+    thread claims jobs and runs up to ``concurrency`` of them at once on the
+    runner's event loop instead of one per worker thread.
+    """
+    
+    def __init__(self, job_queue: JobQueue, pipeline: Callable, workers: int = JOB_WORKERS,
+                 results_dir: str = JOB_RESULTS_DIR, result_ttl: float = JOB_RESULT_TTL,
+                 async_runner=None, concurrency: int = JOB_ASYNC_CONCURRENCY):
+        self.queue = job_queue
+        self.pipeline = pipeline
+        self.workers = workers
+        self.results_dir = results_dir
+        self.result_ttl = result_ttl
+        self.async_runner = async_runner
+        self.concurrency = concurrency
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        os.makedirs(results_dir, exist_ok=True)
+    
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            if self.async_runner:
+                thread = threading.Thread(target=self._work_async, name="job-claimer", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+    
+    def stop(self, timeout: float = 5.0):
+        """Stop the worker threads after their current job"""
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+    
+    def submit(self, deck: Deck, filename: str, uploads: List[str]) -> str:
+        """
+        Queue a validated deck for generation
+        
+        Args:
+            deck: Validated deck for the pipeline
+            filename: Download name for the finished .pptx
+            uploads: Uploaded files the job takes ownership of
+        
+        Returns:
+            Job id
+        """
+        self.start()
+        self._expire()
+        
+        now = time.time()
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'stage': 'queued',
+            'progress': 0.0,
+            'warnings': [],
+            'error': None,
+            'filename': filename,
+            'attempts': 0,
+            'created_at': now,
+            'updated_at': now,
+        }
+        self.queue.submit(job, deck, uploads)
+        return job['id']
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.queue.get(job_id)
+    
+    def result_path(self, job_id: str) -> str:
+        return os.path.join(self.results_dir, f"{job_id}.pptx")
+    
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                claimed = self.queue.claim(timeout=1.0)
+            except Exception as e:
+                logging.error(f"Error claiming job: {e}")
+                self._stopping.wait(1.0)
+                continue
+            if claimed:
+                self._run(*claimed)
+    
+    def _work_async(self):
+        slots = threading.BoundedSemaphore(self.concurrency)
+        while not self._stopping.is_set():
+            if not slots.acquire(timeout=1.0):
+                continue
+            try:
+                claimed = self.queue.claim(timeout=1.0)
+            except Exception as e:
+                slots.release()
+                logging.error(f"Error claiming job: {e}")
+                self._stopping.wait(1.0)
+                continue
+            if not claimed:
+                slots.release()
+                continue
+            future = self.async_runner.submit(self._run_async(*claimed))
+            future.add_done_callback(lambda _: slots.release())
+    
+    def _run(self, job: Dict, deck: Deck, uploads: List[str]):
+        job_id = job['id']
+        
+        def progress(stage, fraction):
+            self.queue.update(job_id, stage=stage, progress=fraction)
+        
+        metrics.JOBS_IN_FLIGHT.inc()
+        try:
+            with metrics.span('job'):
+                buffer, warnings = self.pipeline(deck, progress)
+            self._finish(job_id, buffer, warnings)
+        except Exception as e:
+            self._fail(job_id, e)
+        finally:
+            metrics.JOBS_IN_FLIGHT.dec()
+            remove_files(uploads)
+    
+    async def _run_async(self, job: Dict, deck: Deck, uploads: List[str]):
+        """
+        Run a job on the event loop
+        
+        Status writes can block (the sqlite queue waits on its file lock), so
+        they run on the render executor rather than the loop. Progress goes
+        through one writer task that only writes the latest stage and is
+        drained before the job's final status is written.
+        """
+        job_id = job['id']
+        loop = asyncio.get_running_loop()
+        latest = {}
+        changed = asyncio.Event()
+        finished = False
+        
+        def progress(stage, fraction):
+            latest.update(stage=stage, progress=fraction)
+            changed.set()
+        
+        async def write_progress():
+            while True:
+                await changed.wait()
+                changed.clear()
+                if latest:
+                    await loop.run_in_executor(
+                        self.async_runner.executor, functools.partial(self.queue.update, job_id, **latest)
+                    )
+                if finished and not changed.is_set():
+                    return
+        
+        writer = loop.create_task(write_progress())
+        metrics.JOBS_IN_FLIGHT.inc()
+        try:
+            try:
+                with metrics.span('job'):
+                    buffer, warnings = await self.pipeline(deck, progress)
+            finally:
+                finished = True
+                changed.set()
+                await writer
+            await loop.run_in_executor(self.async_runner.executor, self._finish, job_id, buffer, warnings)
+        except Exception as e:
+            await loop.run_in_executor(self.async_runner.executor, self._fail, job_id, e)
+        finally:
+            metrics.JOBS_IN_FLIGHT.dec()
+            remove_files(uploads)
+    
+    def _finish(self, job_id: str, buffer, warnings: List[str]):
+        # Write next to the final name and rename, so downloads never see a partial file
+        temp_path = self.result_path(job_id) + '.part'
+        with buffer, open(temp_path, 'wb') as f:
+            shutil.copyfileobj(buffer, f)
+        os.replace(temp_path, self.result_path(job_id))
+        self.queue.update(job_id, status='done', stage='done', progress=1.0, warnings=warnings)
+        metrics.JOBS_TOTAL.inc(status='done')
+    
+    def _fail(self, job_id: str, error: Exception):
+        logging.error(f"Job {job_id} failed: {error}")
+        self.queue.update(job_id, status='failed', stage='failed', error=str(error))
+        metrics.JOBS_TOTAL.inc(status='failed')
+    
+    def _expire(self):
+        """Drop finished jobs and their files once they are older than the result TTL"""
+        for job_id in self.queue.expire(time.time() - self.result_ttl):
+            try:
+                os.remove(self.result_path(job_id))
+            except OSError:
+                pass
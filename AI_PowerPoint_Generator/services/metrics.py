@@ -0,0 +1,250 @@
+"""Lightweight in-process metrics: counters, gauges, latency histograms and stage spans"""
+import os
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Add a Server-Timing header / a timing log line to every request
+METRICS_TIMING_HEADER = os.environ.get("METRICS_TIMING_HEADER", "0") == "1"
+METRICS_TIMING_LOG = os.environ.get("METRICS_TIMING_LOG", "0") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Stage timings of the request being handled in this context, if any
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+class Metric:
+    """
+    Base class for a named metric with optional labels
+    
+    Values are kept per tuple of label values, in the order of ``labels``.
+    """
+    
+    kind = 'untyped'
+    
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, '')) for label in self.labels)
+    
+    def _label_text(self, key: Tuple[str, ...], extra: str = '') -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, key)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+    
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{self._label_text(key)} {_format(value)}" for key, value in sorted(self._values.items())]
+    
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+class Counter(Metric):
+    kind = 'counter'
+    
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def set_total(self, value: float, **labels):
+        """Mirror a running total kept elsewhere (for collectors); it must never go down"""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class Gauge(Metric):
+    kind = 'gauge'
+    
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+    
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+    
+    @contextmanager
+    def track(self, **labels):
+        """Count the wrapped block as in progress while it runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram; each value is ``[bucket counts, sum, count]``"""
+    
+    kind = 'histogram'
+    
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+    
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    bucket_labels = self._label_text(key, 'le="%s"' % _format(bound))
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                bucket_labels = self._label_text(key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+                lines.append(f"{self.name}_sum{self._label_text(key)} {_format(total)}")
+                lines.append(f"{self.name}_count{self._label_text(key)} {count}")
+        return lines
+    
+    def value(self, **labels) -> int:
+        """Number of observations for a label set"""
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[2] if entry else 0
+
+class Registry:
+    """
+    Set of metrics rendered together in the Prometheus text format
+    
+    Collectors are called at render time to refresh gauges from state kept
+    elsewhere (cache statistics, for example), so hot paths never pay for it.
+    """
+    
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+    
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+    
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+    
+    def gauge(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+    
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+    
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+    
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                pass
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram('ppt_stage_seconds', 'Time spent in each generation stage', ('stage',))
+REQUEST_SECONDS = REGISTRY.histogram('ppt_http_request_seconds', 'HTTP request latency', ('endpoint', 'status'))
+REQUESTS_IN_FLIGHT = REGISTRY.gauge('ppt_http_requests_in_flight', 'HTTP requests being handled')
+JOBS_IN_FLIGHT = REGISTRY.gauge('ppt_jobs_in_flight', 'Background jobs being generated')
+JOBS_TOTAL = REGISTRY.counter('ppt_jobs_total', 'Background jobs finished', ('status',))
+BYTES_DOWNLOADED = REGISTRY.counter('ppt_image_bytes_downloaded_total', 'Image bytes downloaded')
+BYTES_PRODUCED = REGISTRY.counter('ppt_deck_bytes_produced_total', 'Bytes of .pptx output produced')
+CACHE_LOOKUPS = REGISTRY.counter('ppt_cache_lookups_total', 'Cache lookups since start by result', ('cache', 'result'))
+CACHE_ENTRIES = REGISTRY.gauge('ppt_cache_entries', 'Entries held by each cache', ('cache',))
+GEMINI_QUEUE_DEPTH = REGISTRY.gauge('ppt_gemini_queue_depth', 'Gemini calls waiting for rate budget')
+GEMINI_QUEUE_WAIT = REGISTRY.histogram('ppt_gemini_queue_wait_seconds', 'Time Gemini calls waited for rate budget',
+                                       ('priority',))
+GEMINI_CALLS = REGISTRY.counter('ppt_gemini_calls_total', 'Gemini call attempts by result', ('result',))
+GEMINI_COALESCED = REGISTRY.counter('ppt_gemini_coalesced_total', 'Gemini calls answered by an identical call in flight')
+
+@contextmanager
+def span(stage: str):
+    """Time the wrapped block into ppt_stage_seconds and the current request's timings"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+def timed(stage: str):
+    """Decorator form of ``span``"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def in_request_context(func: Callable) -> Callable:
+    """
+    Wrap a function handed to a thread pool so its spans count toward the current request
+    
+    Pool threads do not inherit context variables, so without this the
+    stages they run never reach the request's timings. Each call runs in its
+    own copy of the submitting context, since one context cannot be entered
+    by two threads at once; the copies share the request's timings list.
+    """
+    context = contextvars.copy_context()
+    
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+def start_request_timing():
+    """Start collecting stage timings for the request handled in this context"""
+    _request_timings.set([])
+
+def request_timings() -> Optional[List[Tuple[str, float]]]:
+    """Stage timings recorded for the current request, in completion order"""
+    return _request_timings.get()
+
+def server_timing_header(timings: List[Tuple[str, float]], total: float) -> str:
+    """Format timings as a Server-Timing header value (durations in milliseconds)"""
+    entries = [f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in timings]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ', '.join(entries)
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,290 @@
+"""Deck generation pipeline shared by the /generate route and background jobs"""
+import os
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from models import Deck, Slide
+from services.ppt_generator import (
+    build_presentation, generate_ppt_stream, new_presentation, add_title_slide, add_content_slide, move_slide,
+    prepare_slide_image, release_image_files, save_to_buffer, update_presentation
+)
+from services.sessions import deck_fingerprint, slide_hash
+from services.themes import get_theme
+from services.gemini import GEMINI_STREAM, EnhancementStream, enhance_presentation
+from services import metrics
+from services.images import PREFETCH_MAX_WORKERS, get_image_suggestions, get_image_suggestions_many, prefetch_images
+
+def run_pipeline(deck: Deck, progress: Optional[Callable[[str, float], None]] = None) -> Tuple[Any, List[str]]:
+    """
+    Enhance, illustrate and render a validated deck
+    
+    Args:
+        deck: Deck to generate, with its enhancement options
+        progress: Optional callback receiving (stage, fraction complete)
+    
+    Returns:
+        Tuple of the .pptx in a spooled buffer and user-facing warnings
+    """
+    if deck.enhance_ai and (GEMINI_STREAM if deck.stream is None else deck.stream):
+        return run_streaming_pipeline(deck, progress)
+    
+    report = progress or (lambda stage, fraction: None)
+    warnings = []
+    
+    # Enhance with AI if requested
+    if deck.enhance_ai:
+        report('enhancing', 0.1)
+        deck = enhance_deck(deck, warnings)
+    
+    # Handle image suggestions if AI enhancement was used
+    if any(needs_image_suggestion(slide) for slide in deck.slides):
+        report('finding images', 0.5)
+        deck = replace(deck, slides=suggest_images(deck.slides))
+    
+    # Generate PowerPoint
+    report('rendering', 0.6)
+    logging.info("Generating PowerPoint presentation")
+    theme = get_theme(deck.theme)
+    with metrics.span('render'):
+        prefetched = prefetch_images(slide.image_url for slide in deck.slides)
+        warnings += image_warnings(deck.slides, prefetched)
+        buffer = generate_ppt_stream(deck.title, deck.slides, theme, prefetched)
+    report('done', 1.0)
+    
+    return buffer, warnings
+
+def run_incremental_pipeline(
+    deck: Deck,
+    previous: Optional[Dict] = None,
+    previous_path: Optional[str] = None,
+    progress: Optional[Callable[[str, float], None]] = None
+) -> Tuple[Any, List[str], Dict]:
+    """
+    Render a deck, re-using the unchanged slides of an earlier render
+    
+    Slides are matched to the earlier render by content hash, so edited,
+    added and moved slides are handled alike. Only slides without a match
+    are enhanced, illustrated and laid out; the rest are kept from the
+    saved .pptx as they are. When the deck-wide options changed, or there
+    is no earlier render, the whole deck is rendered.
+    
+    Args:
+        deck: Validated deck spec, as for run_pipeline
+        previous: Render state of the earlier render, if any
+        previous_path: The .pptx saved by the earlier render
+        progress: Optional callback receiving (stage, fraction complete)
+    
+    Returns:
+        Tuple of the .pptx in a spooled buffer, user-facing warnings and the
+        render state to keep for the next update (``fingerprint``,
+        ``title``, ``enhanced_title``, per-slide ``slides`` hashes and the
+        ``changed`` slide indices)
+    """
+    report = progress or (lambda stage, fraction: None)
+    warnings = []
+    theme = get_theme(deck.theme)
+    hashes = [slide_hash(slide) for slide in deck.slides]
+    fingerprint = deck_fingerprint(deck)
+    
+    kept = [None] * len(hashes)
+    if previous and previous['fingerprint'] == fingerprint and previous_path and os.path.exists(previous_path):
+        # Duplicate slides each claim their own earlier copy
+        available = {}
+        for index, digest in enumerate(previous['slides']):
+            available.setdefault(digest, deque()).append(index)
+        kept = [available[digest].popleft() if available.get(digest) else None for digest in hashes]
+    else:
+        previous = None
+    changed = [i for i, index in enumerate(kept) if index is None]
+    
+    changed_deck = replace(deck, slides=[deck.slides[i] for i in changed])
+    if deck.enhance_ai and changed:
+        report('enhancing', 0.1)
+        enhanced_deck = enhance_deck(changed_deck, warnings)
+        if enhanced_deck is changed_deck:
+            # Unenhanced slides are not remembered, so the next update retries them
+            for i in changed:
+                hashes[i] = None
+        changed_deck = enhanced_deck
+    
+    if any(needs_image_suggestion(slide) for slide in changed_deck.slides):
+        report('finding images', 0.5)
+        changed_deck = replace(changed_deck, slides=suggest_images(changed_deck.slides))
+    
+    report('rendering', 0.6)
+    logging.info(f"Rendering {len(changed)} of {len(hashes)} slides")
+    with metrics.span('render'):
+        if previous:
+            # Enhanced decks keep their title slide, since the title is part of the fingerprint
+            title_changed = previous['title'] != deck.title
+            title = changed_deck.title if title_changed else previous['enhanced_title']
+            slides = iter(changed_deck.slides)
+            prs = update_presentation(
+                previous_path,
+                title if title_changed else None,
+                [next(slides) if index is None else None for index in kept],
+                kept,
+                theme
+            )
+        else:
+            title = changed_deck.title
+            prs = build_presentation(title, changed_deck.slides, theme)
+        buffer = save_to_buffer(prs)
+    report('done', 1.0)
+    
+    state = {
+        'fingerprint': fingerprint,
+        'title': deck.title,
+        'enhanced_title': title,
+        'slides': hashes,
+        'changed': changed,
+    }
+    return buffer, warnings, state
+
+def suggest_images(slides: List[Slide]) -> List[Slide]:
+    """
+    Fill in image_url for slides that only have image keywords, with one batched Pexels lookup
+    
+    Returns:
+        A new list with a copy of each slide that got an image; the given
+        slides are left as they are, since cached decks and sessions share them
+    """
+    needs_image = [i for i, slide in enumerate(slides) if needs_image_suggestion(slide)]
+    if not needs_image:
+        return slides
+    slides = list(slides)
+    try:
+        with metrics.span('image_search'):
+            image_urls = get_image_suggestions_many([slides[i].image_keywords for i in needs_image])
+        for i, image_url in zip(needs_image, image_urls):
+            if image_url:
+                slides[i] = replace(slides[i], image_url=image_url)
+    except Exception as e:
+        logging.warning(f"Failed to get image suggestions: {e}")
+    return slides
+
+def enhance_deck(deck: Deck, warnings: List[str]) -> Deck:
+    """
+    Run Gemini enhancement for a deck, falling back to the original content
+    
+    Args:
+        deck: Deck to enhance, with its enhancement options
+        warnings: List that user-facing failure messages are appended to
+    
+    Returns:
+        The enhanced deck, or ``deck`` itself if enhancement failed
+    """
+    try:
+        logging.info(f"Enhancing presentation with mode: {deck.enhancement_mode}")
+        enhanced_deck = enhance_presentation(deck, deck.enhancement_mode, deck.max_bullets, deck.tone)
+        if enhanced_deck:
+            logging.info("AI enhancement completed successfully")
+            return enhanced_deck
+        warnings.append("AI enhancement failed, using original content")
+    except Exception as e:
+        logging.error(f"AI enhancement error: {e}")
+        warnings.append(f"AI enhancement failed: {str(e)}")
+    return deck
+
+def run_streaming_pipeline(deck: Deck, progress: Optional[Callable[[str, float], None]] = None) -> Tuple[Any, List[str]]:
+    """
+    Enhance and render a deck while Gemini is still streaming its response
+    
+    Each slide is handed to the image pool (suggestion, download,
+    normalization) as soon as its JSON is complete, and rendered in order
+    once its image is ready, so image work and layout overlap with
+    generation. The title slide is added last, when the enhanced title is
+    known, and moved to the front. Progress is reported per slide.
+    
+    Returns:
+        Tuple of the .pptx in a spooled buffer and user-facing warnings
+    """
+    report = progress or (lambda stage, fraction: None)
+    warnings = []
+    theme = get_theme(deck.theme)
+    total = len(deck.slides)
+    
+    report('enhancing', 0.1)
+    stream = EnhancementStream(deck, deck.enhancement_mode, deck.max_bullets, deck.tone)
+    prs = new_presentation(theme)
+    pending = deque()
+    
+    def render_ready(wait: bool):
+        # Slides are added strictly in order, so only the head of the queue is rendered
+        while pending and (wait or pending[0][1].done()):
+            index, future = pending.popleft()
+            slide, image_files, prefetched, normalized = future.result()
+            warnings.extend(image_warnings([slide], prefetched, start=index + 1))
+            try:
+                add_content_slide(prs, slide, theme, image_files)
+            finally:
+                release_image_files(prefetched, normalized)
+            report(f'rendering slide {index + 1}', 0.1 + 0.85 * (index + 1) / total)
+    
+    prepare_image = metrics.in_request_context(prepare_streamed_image)
+    with ThreadPoolExecutor(max_workers=PREFETCH_MAX_WORKERS, thread_name_prefix="slide-image") as pool:
+        try:
+            for index, slide in stream:
+                pending.append((index, pool.submit(prepare_image, slide)))
+                render_ready(wait=False)
+            render_ready(wait=True)
+        finally:
+            for _, future in pending:
+                try:
+                    release_image_files(*future.result()[2:])
+                except Exception:
+                    pass
+    
+    if stream.error or stream.enhanced < total:
+        warnings.append("AI enhancement failed for some slides, using original content")
+    
+    add_title_slide(prs, stream.title or deck.title, theme)
+    move_slide(prs, len(prs.slides) - 1, 0)
+    buffer = save_to_buffer(prs)
+    report('done', 1.0)
+    
+    return buffer, warnings
+
+def prepare_streamed_image(slide: Slide) -> tuple:
+    """
+    Suggest an image for a streamed slide if it needs one, then fetch and normalize it
+    
+    Returns:
+        ``(slide, image_files, prefetched, normalized)``; the slide is a
+        copy with its suggested image_url when one was found
+    """
+    if needs_image_suggestion(slide):
+        try:
+            image_url = get_image_suggestions(slide.image_keywords)
+            if image_url:
+                slide = replace(slide, image_url=image_url)
+        except Exception as e:
+            logging.warning(f"Failed to get image suggestion: {e}")
+    return (slide, *prepare_slide_image(slide))
+
+def image_warnings(slides: List[Slide], prefetched: Dict[str, str], start: int = 1) -> List[str]:
+    """
+    User-facing warnings for slides left without the image they asked for
+    
+    A warning keeps a degraded deck out of the deck cache, so a failed
+    Pexels lookup or download is retried on the next request. Missing
+    suggestions are only reported when a Pexels API key is configured.
+    
+    Args:
+        slides: Slides after image suggestion
+        prefetched: Image URL to local file for the images that were fetched
+        start: Slide number of the first slide
+    """
+    searched = bool(os.environ.get("PEXELS_API_KEY"))
+    warnings = []
+    for number, slide in enumerate(slides, start):
+        if slide.image_url and slide.image_url not in prefetched:
+            warnings.append(f"Slide {number}: Image could not be downloaded")
+        elif searched and needs_image_suggestion(slide):
+            warnings.append(f"Slide {number}: No image could be found")
+    return warnings
+
+def needs_image_suggestion(slide: Slide) -> bool:
+    return bool(not slide.has_image and slide.image_keywords)
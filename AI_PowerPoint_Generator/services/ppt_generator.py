@@ -1,38 +1,335 @@
+import io
 import os
+import json
+import hashlib
 import tempfile
 import logging
+import weakref
+import threading
 from pathlib import Path
+from typing import List, Optional
 from pptx import Presentation
+from pptx.oxml.ns import qn
+from pptx.text.text import Font
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
 import requests
-from services.images import download_image
+from services.images import (
+    download_image, fetch_image, file_digest, prefetch_images, normalize_images, release_image
+)
+from models import Slide
+from services import metrics, text_fit
+from services.pptx_writer import StreamingPackageWriter
 
-def generate_ppt(title: str, slides: list, theme: dict) -> str:
+# Box that slide images are fitted into (left, top, width, height) in inches
+IMAGE_BOX = (1, 1.5, 11.333, 5)
+
+# Image slide title box and bullet area, in inches. Bullets sit at the bottom
+# of the slide and grow upwards with their text; the picture is shrunk to the
+# space left between them and the title, but not below MIN_IMAGE_HEIGHT.
+IMAGE_TITLE_BOX = (0.5, 0.3, 12.333, 1)
+IMAGE_BULLETS_LEFT = 0.5
+IMAGE_BULLETS_WIDTH = 12.333
+IMAGE_SLIDE_BOTTOM = 7.2
+IMAGE_GAP = 0.1
+MIN_IMAGE_HEIGHT = 2.5
+
+# Font sizes in points. Text that does not fit its box at the full size is
+# shrunk in steps down to the minimum (see services.text_fit)
+TITLE_SIZE = 44
+MIN_TITLE_SIZE = 28
+BODY_SIZE = 24
+MIN_BODY_SIZE = 14
+
+# Bullet hanging indent (points) and space before each bullet (lines) of the
+# default master's body style, which bullet slides inherit
+BULLET_INDENT = 27
+BULLET_SPACE_BEFORE = 0.2
+
+# Slide size (16:9)
+SLIDE_WIDTH = Inches(13.333)
+SLIDE_HEIGHT = Inches(7.5)
+
+# Themes are baked into cached master templates; "0" styles every shape instead
+THEME_TEMPLATES = os.environ.get("PPT_THEME_TEMPLATES", "1") == "1"
+
+_theme_templates = {}
+_theme_templates_lock = threading.Lock()
+
+# Placeholder sizes of each slide layout, keyed by layout part (see placeholder_size)
+_placeholder_sizes = weakref.WeakKeyDictionary()
+
+# Streamed decks up to this size are built in memory, larger ones spill to disk
+SPOOL_MAX_BYTES = int(os.environ.get("PPT_SPOOL_MAX_MB", "16")) * 1024 * 1024
+
+# Decks with at least this many content slides are written slide by slide
+# (see write_large_deck) so memory stays flat as they grow; 0 disables
+LARGE_DECK_SLIDES = int(os.environ.get("PPT_LARGE_DECK_SLIDES", "150"))
+
+def generate_ppt(title: str, slides: List[Slide], theme: dict) -> str:
     """Generate PowerPoint presentation"""
+    # Save to temporary file
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pptx')
+    try:
+        if is_large_deck(slides):
+            write_large_deck(title, slides, theme, temp_file)
+        else:
+            prs = build_presentation(title, slides, theme)
+            with metrics.span('pptx_save'):
+                prs.save(temp_file)
+    except Exception:
+        temp_file.close()
+        os.remove(temp_file.name)
+        raise
+    temp_file.close()
+    metrics.BYTES_PRODUCED.inc(os.path.getsize(temp_file.name))
+    
+    return temp_file.name
+
+def generate_ppt_stream(title: str, slides: List[Slide], theme: dict, prefetched: Optional[dict] = None):
+    """
+    Generate PowerPoint presentation into a spooled buffer
+    
+    Decks up to SPOOL_MAX_BYTES stay in memory; larger ones roll over to an
+    anonymous temporary file. Either way closing the buffer frees it, so
+    there is nothing on disk to clean up afterwards.
+    
+    Args:
+        prefetched: Images already fetched by the caller, as for build_presentation
+    
+    Returns:
+        SpooledTemporaryFile positioned at the start of the .pptx bytes
+    """
+    if not is_large_deck(slides):
+        return save_to_buffer(build_presentation(title, slides, theme, prefetched))
+    
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, suffix='.pptx')
+    try:
+        write_large_deck(title, slides, theme, buffer, prefetched)
+        metrics.BYTES_PRODUCED.inc(buffer.tell())
+        buffer.seek(0)
+    except Exception:
+        buffer.close()
+        raise
+    return buffer
+
+def is_large_deck(slides: List[Slide]) -> bool:
+    return bool(LARGE_DECK_SLIDES) and len(slides) >= LARGE_DECK_SLIDES
+
+def save_to_buffer(prs):
+    """Save a presentation into a SpooledTemporaryFile positioned at the start"""
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, suffix='.pptx')
+    try:
+        with metrics.span('pptx_save'):
+            prs.save(buffer)
+        metrics.BYTES_PRODUCED.inc(buffer.tell())
+        buffer.seek(0)
+    except Exception:
+        buffer.close()
+        raise
+    
+    return buffer
+
+def new_presentation(theme: dict = None):
+    """Create an empty 16:9 presentation, cloned from the theme's cached template when given"""
+    if theme is not None and THEME_TEMPLATES:
+        return Presentation(io.BytesIO(get_theme_template(theme)))
+    
     prs = Presentation()
     
     # Set slide size to standard 16:9
-    prs.slide_width = Inches(13.333)
-    prs.slide_height = Inches(7.5)
+    prs.slide_width = SLIDE_WIDTH
+    prs.slide_height = SLIDE_HEIGHT
+    return prs
+
+def get_theme_template(theme: dict) -> bytes:
+    """Return the .pptx bytes of a theme's master template, building it on first use"""
+    name = theme_template_name(theme)
+    template = _theme_templates.get(name)
+    if template is None:
+        template = build_theme_template(theme)
+        with _theme_templates_lock:
+            template = _theme_templates.setdefault(name, template)
+    return template
+
+def theme_template_name(theme: dict) -> str:
+    """Slide master name identifying the template a theme was baked into"""
+    digest = hashlib.sha1(json.dumps(theme, sort_keys=True).encode()).hexdigest()
+    return f"theme-{digest[:12]}"
+
+def build_theme_template(theme: dict) -> bytes:
+    """
+    Bake a theme into an empty 16:9 presentation
     
-    # Add title slide
-    add_title_slide(prs, title, theme)
+    The master and layout placeholders are stretched to the wide slide, and
+    the slide master carries the background colour and the title and body
+    text styles, so slides built from the template inherit the theme instead
+    of being formatted shape by shape.
     
-    # Add content slides
-    for slide_data in slides:
-        if slide_data.get('image_url') or slide_data.get('image_path'):
-            add_image_slide(prs, slide_data, theme)
-        else:
-            add_bullet_slide(prs, slide_data, theme)
+    Returns:
+        The template's .pptx bytes
+    """
+    prs = Presentation()
+    scale_x = SLIDE_WIDTH / prs.slide_width
+    scale_y = SLIDE_HEIGHT / prs.slide_height
+    prs.slide_width = SLIDE_WIDTH
+    prs.slide_height = SLIDE_HEIGHT
     
-    # Save to temporary file
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pptx')
-    prs.save(temp_file.name)
-    temp_file.close()
+    master = prs.slide_master
+    for element in [master._element] + [layout._element for layout in master.slide_layouts]:
+        for xfrm in element.iter(qn('a:xfrm')):
+            for child, x, y in ((xfrm.find(qn('a:off')), 'x', 'y'), (xfrm.find(qn('a:ext')), 'cx', 'cy')):
+                if child is not None:
+                    child.set(x, str(int(int(child.get(x)) * scale_x)))
+                    child.set(y, str(int(int(child.get(y)) * scale_y)))
     
-    return temp_file.name
+    master.name = theme_template_name(theme)
+    if theme.get('background_color'):
+        set_slide_background(master, theme['background_color'])
+    
+    text_styles = master._element.find(qn('p:txStyles'))
+    title_font = Font(text_styles.find(qn('p:titleStyle')).find(qn('a:lvl1pPr')).find(qn('a:defRPr')))
+    apply_font(title_font, theme, theme.get('title_color'), Pt(TITLE_SIZE), bold=True)
+    for level, properties in enumerate(text_styles.find(qn('p:bodyStyle'))):
+        body_font = Font(properties.find(qn('a:defRPr')))
+        apply_font(body_font, theme, theme.get('body_color'), Pt(BODY_SIZE) if level == 0 else None)
+    
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+def styled_by_master(prs, theme: dict) -> bool:
+    """Whether the deck was cloned from the theme's template, so placeholders need no styling"""
+    return prs.slide_master.name == theme_template_name(theme)
+
+def build_presentation(title: str, slides: List[Slide], theme: dict, prefetched: Optional[dict] = None):
+    """
+    Build the Presentation object for a deck without saving it
+    
+    Args:
+        prefetched: Image URL to local file for images the caller has already
+            fetched (the pipelines); they are released here like the
+            ones prefetched by this function
+    """
+    prs = new_presentation(theme)
+    
+    # Fetch every remote image up front so layout never waits on the network
+    if prefetched is None:
+        prefetched = prefetch_images(slide_data.image_url for slide_data in slides)
+    normalized = {}
+    
+    try:
+        image_files, normalized = prepare_image_files(slides, prefetched)
+        
+        with metrics.span('pptx_layout'):
+            # Add title slide
+            add_title_slide(prs, title, theme)
+            
+            # Add content slides
+            for slide_data in slides:
+                add_content_slide(prs, slide_data, theme, image_files)
+    finally:
+        # Pictures are copied into the package when added, so the downloaded
+        # and normalized files can go before the deck is saved
+        release_image_files(prefetched, normalized)
+    
+    return prs
+
+def write_large_deck(title: str, slides: List[Slide], theme: dict, output, prefetched: Optional[dict] = None):
+    """
+    Lay out a deck and write it to ``output`` one slide at a time
+    
+    Produces the same deck as build_presentation and ``save``, but each
+    slide's XML and pictures go into the package as soon as the slide is
+    laid out and are then dropped (see StreamingPackageWriter), so peak
+    memory no longer grows with the number of slides and images. Images
+    are still prefetched and normalized up front, as files on disk.
+    
+    Args:
+        output: Binary file object the .pptx is written to
+        prefetched: Images already fetched by the caller, as for build_presentation
+    """
+    prs = new_presentation(theme)
+    if prefetched is None:
+        prefetched = prefetch_images(slide_data.image_url for slide_data in slides)
+    normalized = {}
+    
+    try:
+        image_files, normalized = prepare_image_files(slides, prefetched)
+        
+        with metrics.span('pptx_layout'), StreamingPackageWriter(prs, output) as writer:
+            add_title_slide(prs, title, theme)
+            for slide_data in slides:
+                add_content_slide(prs, slide_data, theme, image_files)
+                writer.flush()
+    finally:
+        release_image_files(prefetched, normalized)
+
+def prepare_slide_image(slide_data: Slide) -> tuple:
+    """
+    Fetch and normalize a single slide's image, for decks rendered slide by slide
+    
+    Returns:
+        ``(image_files, prefetched, normalized)``; pass the last two to
+        release_image_files once the slide has been added
+    """
+    prefetched = {}
+    if slide_data.image_url:
+        image_path = fetch_image(slide_data.image_url)
+        if image_path:
+            prefetched[slide_data.image_url] = image_path
+    
+    try:
+        image_files, normalized = prepare_image_files([slide_data], prefetched)
+    except Exception:
+        release_image_files(prefetched, {})
+        raise
+    return image_files, prefetched, normalized
+
+def release_image_files(prefetched: dict, normalized: dict):
+    """Release fetched images and remove normalized copies"""
+    for image_path in prefetched.values():
+        release_image(image_path)
+    for image_path in normalized.values():
+        try:
+            os.remove(image_path)
+        except OSError:
+            pass
+
+def prepare_image_files(slides: List[Slide], prefetched: dict) -> tuple:
+    """
+    Map each slide image source to the local file that will be embedded
+    
+    Sources are grouped by content hash, so the same picture behind several
+    URLs or uploads is normalized once and every slide embeds identical
+    bytes, which python-pptx stores as a single shared image part.
+    
+    Returns:
+        ``(image_files, normalized)``: image_url/image_path to local file,
+        and the normalized temporary files the caller must remove
+    """
+    uploads = {
+        slide_data.image_path: slide_data.image_path
+        for slide_data in slides
+        if slide_data.image_path and not slide_data.image_url
+    }
+    sources = {**prefetched, **uploads}
+    # Uploads arrive already hashed by the upload stream
+    digests = {
+        slide_data.image_path: slide_data.image_digest
+        for slide_data in slides
+        if slide_data.image_path in uploads and slide_data.image_digest
+    }
+    
+    canonical = {}
+    for key, path in sources.items():
+        digest = digests.get(key) or file_digest(path) or path
+        canonical[key] = canonical.setdefault(digest, path)
+    
+    normalized = normalize_images(canonical.values(), IMAGE_BOX[2], IMAGE_BOX[3])
+    image_files = {key: normalized.get(path, path) for key, path in canonical.items()}
+    return image_files, normalized
 
 def add_title_slide(prs, title: str, theme: dict):
     """Add title slide to presentation"""
@@ -43,6 +340,9 @@ def add_title_slide(prs, title: str, theme: dict):
     title_shape = slide.shapes.title
     title_shape.text = title
     
+    if styled_by_master(prs, theme):
+        return
+    
     # Apply theme formatting
     apply_title_formatting(title_shape, theme)
     
@@ -50,23 +350,104 @@ def add_title_slide(prs, title: str, theme: dict):
     if theme.get('background_color'):
         set_slide_background(slide, theme['background_color'])
 
-def add_bullet_slide(prs, slide_data: dict, theme: dict):
+def add_content_slide(prs, slide_data: Slide, theme: dict, image_files: dict = None):
+    """Add an image slide or a bullet slide depending on whether the slide has an image"""
+    if slide_data.has_image:
+        add_image_slide(prs, slide_data, theme, image_files)
+    else:
+        add_bullet_slide(prs, slide_data, theme)
+
+def move_slide(prs, old_index: int, new_index: int):
+    """Move a slide to a new position in the deck"""
+    slide_ids = prs.slides._sldIdLst
+    slide_id = slide_ids[old_index]
+    slide_ids.remove(slide_id)
+    slide_ids.insert(new_index, slide_id)
+
+def update_presentation(path: str, title: Optional[str], slides: List[Optional[Slide]], kept: List[Optional[int]],
+                        theme: dict):
+    """
+    Re-render only the changed slides of a deck saved by build_presentation
+    
+    Kept slides stay as they are in the saved package, including their
+    pictures and notes; changed slides are laid out and appended, then the
+    slide list is put in order and slides no longer used are dropped.
+    
+    Args:
+        path: Saved .pptx the deck was last rendered to
+        title: New title slide text, or None to keep the saved title slide
+        slides: Content slides of the new deck in order (None where kept)
+        kept: For each slide, the index of the saved content slide that
+            already shows it, or None to render it
+        theme: Theme the saved deck was built with
+    
+    Returns:
+        The updated Presentation object
+    """
+    prs = Presentation(path)
+    slide_ids = prs.slides._sldIdLst
+    saved_ids = list(slide_ids)
+    changed = [slide_data for slide_data, index in zip(slides, kept) if index is None]
+    
+    prefetched = prefetch_images(slide_data.image_url for slide_data in changed)
+    normalized = {}
+    try:
+        image_files, normalized = prepare_image_files(changed, prefetched)
+        
+        with metrics.span('pptx_layout'):
+            title_id = saved_ids[0]
+            if title is not None:
+                add_title_slide(prs, title, theme)
+                title_id = slide_ids[-1]
+            
+            rendered = []
+            for slide_data in changed:
+                add_content_slide(prs, slide_data, theme, image_files)
+                rendered.append(slide_ids[-1])
+    finally:
+        release_image_files(prefetched, normalized)
+    
+    rendered = iter(rendered)
+    order = [title_id] + [saved_ids[index + 1] if index is not None else next(rendered) for index in kept]
+    used = {slide_id.rId for slide_id in order}
+    for slide_id in saved_ids:
+        if slide_id.rId not in used:
+            slide_ids.remove(slide_id)
+            prs.part.drop_rel(slide_id.rId)
+    # Appending an existing element moves it, which leaves the list in order
+    for slide_id in order:
+        slide_ids.append(slide_id)
+    return prs
+
+def add_bullet_slide(prs, slide_data: Slide, theme: dict):
     """Add bullet point slide to presentation"""
     slide_layout = prs.slide_layouts[1]  # Title and content layout
     slide = prs.slides.add_slide(slide_layout)
     
-    # Set title
+    styled = styled_by_master(prs, theme)
+    
+    # Set title, shrunk if it does not fit the placeholder
     title_shape = slide.shapes.title
-    title_shape.text = slide_data['title']
-    apply_title_formatting(title_shape, theme)
+    title_shape.text = slide_data.title
+    title_fit = fit_placeholder_text(
+        slide_layout, title_shape, [slide_data.title], theme, TITLE_SIZE, MIN_TITLE_SIZE, bold=True
+    )
+    if not styled:
+        apply_title_formatting(title_shape, theme, title_fit.size)
+    elif title_fit.size < TITLE_SIZE:
+        set_text_size(title_shape.text_frame, title_fit.size)
     
     # Add bullet points
     content_shape = slide.placeholders[1]
     text_frame = content_shape.text_frame
     text_frame.clear()
+    text_frame.word_wrap = True
+    body_fit = fit_placeholder_text(
+        slide_layout, content_shape, slide_data.bullets, theme, BODY_SIZE, MIN_BODY_SIZE,
+        indent=BULLET_INDENT, space_before=BULLET_SPACE_BEFORE
+    )
     
-    bullets = slide_data.get('bullets', [])
-    for i, bullet in enumerate(bullets):
+    for i, bullet in enumerate(slide_data.bullets):
         if i == 0:
             p = text_frame.paragraphs[0]
         else:
@@ -74,48 +455,83 @@ def add_bullet_slide(prs, slide_data: dict, theme: dict):
         
         p.text = bullet
         p.level = 0
-        apply_body_formatting(p, theme)
+        if not styled:
+            apply_body_formatting(p, theme, body_fit.size)
+    
+    # The master sets the full sizes; only shrunk text needs its own
+    if styled and body_fit.size < BODY_SIZE:
+        set_text_size(text_frame, body_fit.size)
     
     # Add speaker notes if available
-    if slide_data.get('speaker_notes'):
+    if slide_data.speaker_notes:
         notes_slide = slide.notes_slide
-        notes_slide.notes_text_frame.text = slide_data['speaker_notes']
+        notes_slide.notes_text_frame.text = slide_data.speaker_notes
     
     # Set background color if specified
-    if theme.get('background_color'):
+    if theme.get('background_color') and not styled:
         set_slide_background(slide, theme['background_color'])
 
-def add_image_slide(prs, slide_data: dict, theme: dict):
-    """Add slide with image and optional text"""
+def add_image_slide(prs, slide_data: Slide, theme: dict, image_files: dict = None):
+    """Add slide with image and optional text
+    
+    When ``image_files`` is given, the slide's image_url or image_path is
+    looked up in it (source to local file ready for embedding) instead of
+    being downloaded here; the caller owns those files.
+    """
     slide_layout = prs.slide_layouts[6]  # Blank layout
     slide = prs.slides.add_slide(slide_layout)
+    font_name = theme.get('font_name', 'Arial')
     
-    # Add title if present
-    if slide_data['title']:
-        title_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.3), Inches(12.333), Inches(1))
+    # Add title if present, shrunk to fit its box (which grows, up to twice
+    # its height, when even the smallest size needs more lines)
+    image_top = IMAGE_BOX[1]
+    if slide_data.title:
+        left, top, width, height = IMAGE_TITLE_BOX
+        title_fit = text_fit.fit_text(
+            [slide_data.title], font_name, width * 72, height * 72, TITLE_SIZE, MIN_TITLE_SIZE, bold=True
+        )
+        height = min(max(height, title_fit.height / 72), 2 * height)
+        title_box = slide.shapes.add_textbox(Inches(left), Inches(top), Inches(width), Inches(height))
         title_frame = title_box.text_frame
-        title_frame.text = slide_data['title']
-        apply_title_formatting(title_box, theme)
+        title_frame.word_wrap = True
+        title_frame.text = slide_data.title
+        apply_title_formatting(title_box, theme, title_fit.size)
+        image_top = max(image_top, top + height + IMAGE_GAP)
+    
+    # Size the bullets before placing the picture, which gets the space above them
+    bullets = slide_data.bullets
+    image_bottom = IMAGE_BOX[1] + IMAGE_BOX[3]
+    if bullets:
+        max_height = IMAGE_SLIDE_BOTTOM - image_top - MIN_IMAGE_HEIGHT - IMAGE_GAP
+        bullets_fit = text_fit.fit_text(
+            [f"• {bullet}" for bullet in bullets], font_name, IMAGE_BULLETS_WIDTH * 72, max_height * 72,
+            BODY_SIZE, MIN_BODY_SIZE
+        )
+        bullets_height = min(bullets_fit.height / 72, max_height)
+        bullets_top = IMAGE_SLIDE_BOTTOM - bullets_height
+        image_bottom = min(image_bottom, bullets_top - IMAGE_GAP)
+    image_box = (IMAGE_BOX[0], image_top, IMAGE_BOX[2], image_bottom - image_top)
     
     # Download and add image
     image_path = None
+    downloaded = False
     try:
-        if slide_data.get('image_url'):
-            image_path = download_image(slide_data['image_url'])
-        elif slide_data.get('image_path'):
-            image_path = slide_data['image_path']
+        if slide_data.image_url:
+            if image_files is not None:
+                image_path = image_files.get(slide_data.image_url)
+            else:
+                image_path = download_image(slide_data.image_url)
+                downloaded = True
+        elif slide_data.image_path:
+            image_path = slide_data.image_path
+            if image_files is not None:
+                image_path = image_files.get(image_path, image_path)
         
         if image_path and os.path.exists(image_path):
-            # Calculate image position and size
-            left = Inches(1)
-            top = Inches(1.5)
-            max_width = Inches(11.333)
-            max_height = Inches(5)
-            
-            slide.shapes.add_picture(image_path, left, top, width=max_width, height=max_height)
+            add_fitted_picture(slide, image_path, image_box)
             
             # Clean up downloaded image
-            if slide_data.get('image_url') and image_path != slide_data.get('image_path'):
+            if downloaded and image_path != slide_data.image_path:
                 try:
                     os.remove(image_path)
                 except:
@@ -128,11 +544,13 @@ def add_image_slide(prs, slide_data: dict, theme: dict):
         return
     
     # Add bullet points if any
-    bullets = slide_data.get('bullets', [])
     if bullets:
-        text_box = slide.shapes.add_textbox(Inches(0.5), Inches(6.2), Inches(12.333), Inches(1))
+        text_box = slide.shapes.add_textbox(
+            Inches(IMAGE_BULLETS_LEFT), Inches(bullets_top), Inches(IMAGE_BULLETS_WIDTH), Inches(bullets_height)
+        )
         text_frame = text_box.text_frame
         text_frame.clear()
+        text_frame.word_wrap = True
         
         for i, bullet in enumerate(bullets):
             if i == 0:
@@ -141,37 +559,83 @@ def add_image_slide(prs, slide_data: dict, theme: dict):
                 p = text_frame.add_paragraph()
             
             p.text = f"• {bullet}"
-            apply_body_formatting(p, theme)
+            apply_body_formatting(p, theme, bullets_fit.size)
     
     # Add speaker notes if available
-    if slide_data.get('speaker_notes'):
+    if slide_data.speaker_notes:
         notes_slide = slide.notes_slide
-        notes_slide.notes_text_frame.text = slide_data['speaker_notes']
+        notes_slide.notes_text_frame.text = slide_data.speaker_notes
     
     # Set background color if specified
-    if theme.get('background_color'):
+    if theme.get('background_color') and not styled_by_master(prs, theme):
         set_slide_background(slide, theme['background_color'])
 
-def apply_title_formatting(shape, theme: dict):
+def add_fitted_picture(slide, image_path: str, box: tuple = IMAGE_BOX):
+    """Add picture scaled to fit a box (IMAGE_BOX by default), keeping its aspect ratio and centred"""
+    left, top, box_width, box_height = (Inches(value) for value in box)
+    picture = slide.shapes.add_picture(image_path, left, top)
+    
+    scale = min(box_width / picture.width, box_height / picture.height)
+    picture.width = int(picture.width * scale)
+    picture.height = int(picture.height * scale)
+    picture.left = left + (box_width - picture.width) // 2
+    picture.top = top + (box_height - picture.height) // 2
+    return picture
+
+def placeholder_size(slide_layout, idx: int) -> tuple:
+    """
+    Width and height in points of a layout placeholder
+    
+    A slide placeholder's size is inherited through its layout and master,
+    and python-pptx walks both with XPath on every lookup, which cost more
+    than fitting the text itself. Sizes are read once per layout.
+    """
+    sizes = _placeholder_sizes.get(slide_layout.part)
+    if sizes is None:
+        sizes = {
+            placeholder.placeholder_format.idx: (placeholder.width.pt, placeholder.height.pt)
+            for placeholder in slide_layout.placeholders
+        }
+        _placeholder_sizes[slide_layout.part] = sizes
+    return sizes[idx]
+
+def fit_placeholder_text(slide_layout, shape, paragraphs: List[str], theme: dict, max_size: float,
+                         min_size: float, bold: bool = False, indent: float = 0.0,
+                         space_before: float = 0.0) -> text_fit.TextFit:
+    """Pick the font size at which paragraphs fit a layout placeholder, in the theme's font"""
+    width, height = placeholder_size(slide_layout, shape.placeholder_format.idx)
+    return text_fit.fit_text(
+        paragraphs, theme.get('font_name', 'Arial'), width, height, max_size, min_size,
+        bold=bold, indent=indent, space_before=space_before
+    )
+
+def set_text_size(text_frame, size: float):
+    """Set the font size of every run in a text frame"""
+    for paragraph in text_frame.paragraphs:
+        for run in paragraph.runs:
+            run.font.size = Pt(size)
+
+def apply_title_formatting(shape, theme: dict, size: float = TITLE_SIZE):
     """Apply theme formatting to title text"""
     for paragraph in shape.text_frame.paragraphs:
         paragraph.alignment = PP_ALIGN.CENTER
         for run in paragraph.runs:
-            font = run.font
-            font.name = theme.get('font_name', 'Arial')
-            font.size = Pt(44)
-            font.bold = True
-            if theme.get('title_color'):
-                font.color.rgb = RGBColor.from_string(theme['title_color'].lstrip('#'))
-
-def apply_body_formatting(paragraph, theme: dict):
+            apply_font(run.font, theme, theme.get('title_color'), Pt(size), bold=True)
+
+def apply_body_formatting(paragraph, theme: dict, size: float = BODY_SIZE):
     """Apply theme formatting to body text"""
     for run in paragraph.runs:
-        font = run.font
-        font.name = theme.get('font_name', 'Arial')
-        font.size = Pt(24)
-        if theme.get('body_color'):
-            font.color.rgb = RGBColor.from_string(theme['body_color'].lstrip('#'))
+        apply_font(run.font, theme, theme.get('body_color'), Pt(size))
+
+def apply_font(font, theme: dict, color: str = None, size=None, bold: bool = None):
+    """Set a run's (or a master text style's) theme font, colour, size and weight"""
+    font.name = theme.get('font_name', 'Arial')
+    if size is not None:
+        font.size = size
+    if bold is not None:
+        font.bold = bold
+    if color:
+        font.color.rgb = RGBColor.from_string(color.lstrip('#'))
 
 def set_slide_background(slide, color: str):
     """Set slide background color"""
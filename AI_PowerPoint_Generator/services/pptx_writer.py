@@ -0,0 +1,116 @@
+"""Slide-by-slide .pptx package writer for very large decks"""
+import zipfile
+from typing import IO
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI, PackURI
+# Private python-pptx 1.0 internals used here, hence the pin in requirements.txt:
+# _ContentTypesItem.xml_for builds [Content_Types].xml, part._blob and
+# part._element are dropped after a part is written, and
+# Package.get_or_add_image_part is replaced on the package instance
+from pptx.opc.serialized import _ContentTypesItem
+from pptx.oxml.slide import CT_NotesSlide, CT_Slide
+from pptx.parts.image import Image, ImagePart
+
+class StreamingPackageWriter:
+    """
+    Writes a presentation into a zip package one slide at a time
+    
+    ``Presentation.save`` serialises every part at the end, so every slide's
+    XML tree and every picture's bytes stay alive until then. This writer
+    is opened on a presentation before its slides are added instead: each
+    ``flush`` writes the slides added since the last one, with their notes
+    and any new pictures, straight into the zip and drops their XML trees
+    and image bytes, leaving only the small part objects the package needs
+    to list them. ``close`` writes the shared parts (presentation, masters,
+    layouts, theme) and the content types.
+    
+    Pictures are de-duplicated by SHA-1 here rather than by python-pptx,
+    whose lookup walks the whole package on every picture and compares the
+    bytes that were dropped. A picture used again gets its bytes back until
+    the next flush, since python-pptx reads them to size the shape. Relies
+    on python-pptx 1.0 package internals (see the note on the imports).
+    """
+    
+    def __init__(self, prs, file: IO[bytes]):
+        self.prs = prs
+        self.package = prs.part.package
+        self._zip = zipfile.ZipFile(file, 'w', zipfile.ZIP_DEFLATED)
+        self._written = set()
+        self._flushed_slides = 0
+        self._image_parts = {}
+        self._image_index = max(
+            (part.partname.idx or 0 for part in self.package.iter_parts()
+             if part.partname.startswith('/ppt/media/image')),
+            default=0
+        )
+        # Slides add pictures through the package; route them to the writer's index
+        self.package.get_or_add_image_part = self._get_or_add_image_part
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type:
+            self._zip.close()
+        else:
+            self.close()
+    
+    def flush(self):
+        """Write the slides added since the last flush and release their XML and pictures"""
+        slide_ids = self.prs.slides._sldIdLst
+        for slide_id in list(slide_ids)[self._flushed_slides:]:
+            slide_part = self.prs.part.related_part(slide_id.rId)
+            for rel in list(slide_part.rels.values()):
+                if rel.is_external:
+                    continue
+                part = rel.target_part
+                if isinstance(part, ImagePart):
+                    if part.partname not in self._written:
+                        self._write_part(part)
+                    part._blob = b''
+                elif rel.reltype == RT.NOTES_SLIDE:
+                    self._write_part(part)
+                    part._element = CT_NotesSlide.new()
+                    part.__dict__.pop('notes_slide', None)
+            self._write_part(slide_part)
+            slide_part._element = CT_Slide.new()
+            slide_part.__dict__.pop('slide', None)
+            slide_part.__dict__.pop('notes_slide', None)
+        self._flushed_slides = len(slide_ids)
+    
+    def close(self):
+        """Flush the remaining slides, write the shared parts and finish the zip"""
+        try:
+            self.flush()
+            parts = list(self.package.iter_parts())
+            self._zip.writestr(CONTENT_TYPES_URI.membername, serialize_part_xml(_ContentTypesItem.xml_for(parts)))
+            self._zip.writestr(PACKAGE_URI.rels_uri.membername, self.package._rels.xml)
+            for part in parts:
+                if part.partname not in self._written:
+                    self._write_part(part)
+        finally:
+            self._zip.close()
+    
+    def _write_part(self, part):
+        self._zip.writestr(part.partname.membername, part.blob)
+        if part._rels:
+            self._zip.writestr(part.partname.rels_uri.membername, part.rels.xml)
+        self._written.add(part.partname)
+    
+    def _get_or_add_image_part(self, image_file) -> ImagePart:
+        image = Image.from_file(image_file)
+        image_part = self._image_parts.get(image.sha1)
+        if image_part is None:
+            self._image_index += 1
+            image_part = ImagePart(
+                PackURI(f"/ppt/media/image{self._image_index}.{image.ext}"),
+                image.content_type,
+                self.package,
+                image.blob,
+                image.filename
+            )
+            self._image_parts[image.sha1] = image_part
+        else:
+            image_part._blob = image.blob
+        return image_part
@@ -0,0 +1,153 @@
+"""Deck sessions: stored decks that are regenerated by re-rendering only the slides that changed"""
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, Optional
+from models import Deck, Slide
+
+DECK_SESSION_DIR = os.environ.get("DECK_SESSION_DIR", os.path.join(tempfile.gettempdir(), "ppt-deck-sessions"))
+DECK_SESSION_TTL = float(os.environ.get("DECK_SESSION_TTL", "86400"))
+
+_SESSION_ID = re.compile(r'[0-9a-f]{32}')
+
+def slide_hash(slide: Slide) -> str:
+    """
+    Content hash of a slide as submitted, before enhancement
+    
+    Uploaded images count by their content digest, so re-uploading the
+    same picture leaves the hash unchanged.
+    """
+    payload = [
+        slide.title,
+        slide.bullets,
+        slide.image_url,
+        slide.image_digest or slide.image_path,
+        slide.image_keywords,
+        slide.speaker_notes,
+    ]
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+def deck_fingerprint(deck: Deck) -> str:
+    """
+    Hash of the deck-wide options every slide depends on
+    
+    A change here re-renders the whole deck. The title only counts for
+    enhanced decks, where it is part of every slide's prompt.
+    """
+    payload = [deck.theme, deck.tone, deck.enhance_ai]
+    if deck.enhance_ai:
+        payload += [deck.enhancement_mode, deck.max_bullets, deck.title]
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+class DeckSessionStore:
+    """
+    Directory of deck sessions, one subdirectory per session
+    
+    Each session holds its latest render as ``deck-<version>.pptx`` and a
+    ``session.json`` record with the render state (deck fingerprint and
+    per-slide hashes) needed to regenerate it incrementally. Both are
+    written under temporary names and renamed, so readers in other
+    processes always see a matching pair. Updates to one session are
+    serialised within a process with ``lock()``. Sessions untouched for
+    ``ttl`` seconds are removed.
+    """
+    
+    def __init__(self, directory: str = DECK_SESSION_DIR, ttl: float = DECK_SESSION_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+    
+    def new_id(self) -> str:
+        self._expire()
+        return uuid.uuid4().hex
+    
+    def lock(self, session_id: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(session_id, threading.Lock())
+    
+    def _session_dir(self, session_id: str) -> str:
+        return os.path.join(self.directory, session_id)
+    
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Return a session's record, or None if it does not exist"""
+        if not _SESSION_ID.fullmatch(session_id or ''):
+            return None
+        try:
+            with open(os.path.join(self._session_dir(session_id), 'session.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def deck_path(self, record: Dict) -> str:
+        return os.path.join(self._session_dir(record['id']), record['file'])
+    
+    def save(self, session_id: str, state: Dict, buffer, filename: str) -> Dict:
+        """
+        Store a new render of a session
+        
+        Args:
+            session_id: Id from new_id() or of an existing session
+            state: Render state returned by the incremental pipeline
+            buffer: The rendered .pptx, read from its current position
+            filename: Download name for the deck
+        
+        Returns:
+            The session's new record
+        """
+        session_dir = self._session_dir(session_id)
+        os.makedirs(session_dir, exist_ok=True)
+        previous = self.get(session_id)
+        now = time.time()
+        version = previous['version'] + 1 if previous else 1
+        record = {
+            'id': session_id,
+            'version': version,
+            'file': f"deck-{version}.pptx",
+            'filename': filename,
+            'state': state,
+            'created_at': previous['created_at'] if previous else now,
+            'updated_at': now,
+        }
+        
+        temp_path = os.path.join(session_dir, record['file'] + '.part')
+        with open(temp_path, 'wb') as f:
+            shutil.copyfileobj(buffer, f)
+        os.replace(temp_path, self.deck_path(record))
+        
+        temp_path = os.path.join(session_dir, 'session.json.part')
+        with open(temp_path, 'w') as f:
+            json.dump(record, f)
+        os.replace(temp_path, os.path.join(session_dir, 'session.json'))
+        
+        if previous:
+            try:
+                os.remove(self.deck_path(previous))
+            except OSError:
+                pass
+        return record
+    
+    def _expire(self):
+        """Remove sessions that have not been updated within the TTL"""
+        cutoff = time.time() - self.ttl
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            session_dir = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(os.path.join(session_dir, 'session.json')) < cutoff:
+                    shutil.rmtree(session_dir, ignore_errors=True)
+                    with self._locks_lock:
+                        self._locks.pop(name, None)
+            except OSError as e:
+                logging.debug(f"Skipping deck session {name}: {e}")
@@ -0,0 +1,85 @@
+"""Text fitting: picks font sizes and box heights for slide text from cached font metrics"""
+import math
+from dataclasses import dataclass
+from typing import List
+from services.font_metrics import text_width
+
+# Line height as a multiple of the font size (single spacing)
+LINE_SPACING = 1.2
+
+# Default text frame insets in points (0.1in left/right, 0.05in top/bottom)
+FRAME_MARGIN_X = 7.2
+FRAME_MARGIN_Y = 3.6
+
+@dataclass(slots=True)
+class TextFit:
+    """Font size chosen for a block of text and the space it takes at that size"""
+    size: float
+    lines: int
+    height: float
+    fits: bool
+
+def word_widths(text: str, font_name: str, bold: bool = False) -> List[float]:
+    """Widths in em of a paragraph's words"""
+    return [text_width(word, font_name, bold) for word in text.split()]
+
+def count_lines(words: List[float], space: float, width: float) -> int:
+    """
+    Number of lines a paragraph wraps to
+    
+    Greedy word wrap, as PowerPoint does; a word wider than the line is
+    broken across as many lines as it needs.
+    
+    Args:
+        words: Word widths in em (see word_widths)
+        space: Width of a space in em
+        width: Line width in em
+    """
+    lines = 0
+    line = None
+    for word in words:
+        if line is not None and line + space + word <= width:
+            line += space + word
+            continue
+        pieces = max(1, math.ceil(word / width))
+        lines += pieces
+        line = word - (pieces - 1) * width
+    return max(lines, 1)
+
+def text_height(lines: int, paragraphs: int, size: float, space_before: float = 0.0) -> float:
+    """Height in points of wrapped text, including the frame's top and bottom insets"""
+    line_height = size * LINE_SPACING
+    return lines * line_height + max(paragraphs - 1, 0) * line_height * space_before + 2 * FRAME_MARGIN_Y
+
+def fit_text(paragraphs: List[str], font_name: str, width: float, height: float, max_size: float,
+             min_size: float, bold: bool = False, indent: float = 0.0, space_before: float = 0.0,
+             step: float = 2.0) -> TextFit:
+    """
+    Find the largest font size at which paragraphs fit a text box
+    
+    Words are measured once; each candidate size only re-runs the wrap.
+    When nothing down to ``min_size`` fits, the text is set at ``min_size``
+    and ``fits`` is False.
+    
+    Args:
+        paragraphs: Text of each paragraph
+        width: Box width in points
+        height: Box height in points
+        indent: Left indent of every paragraph in points (bullet hanging indent)
+        space_before: Space before each paragraph after the first, in lines
+        step: Points to shrink by between candidate sizes
+    
+    Returns:
+        The chosen size with its line count and the height the text needs
+    """
+    measured = [word_widths(paragraph, font_name, bold) for paragraph in paragraphs]
+    space = text_width(' ', font_name, bold)
+    available = max(width - 2 * FRAME_MARGIN_X - indent, 1.0)
+    
+    size = max_size
+    while True:
+        lines = sum(count_lines(words, space, available / size) for words in measured)
+        needed = text_height(lines, len(paragraphs), size, space_before)
+        if needed <= height or size <= min_size:
+            return TextFit(size=size, lines=lines, height=needed, fits=needed <= height)
+        size = max(min_size, size - step)
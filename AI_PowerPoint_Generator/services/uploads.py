@@ -0,0 +1,141 @@
+"""Streaming multipart uploads: file parts are spooled straight to disk and hashed on the way"""
+import os
+import hashlib
+import logging
+import tempfile
+from typing import List, Optional
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# Largest single uploaded file; the whole request is bounded by MAX_CONTENT_LENGTH
+UPLOAD_MAX_FILE_BYTES = int(os.environ.get("UPLOAD_MAX_FILE_MB", "5")) * 1024 * 1024
+
+# Leading bytes of the image formats slides accept
+IMAGE_SIGNATURES = {
+    b'\x89PNG\r\n\x1a\n': 'png',
+    b'\xff\xd8\xff': 'jpeg',
+}
+_SIGNATURE_BYTES = max(len(signature) for signature in IMAGE_SIGNATURES)
+UPLOAD_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Image type ('png' or 'jpeg') from a file's leading bytes, or None"""
+    for signature, kind in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return kind
+    return None
+
+class SpooledUpload:
+    """
+    Write target for one uploaded file part
+    
+    Bytes go straight to a uniquely named file in the upload folder while a
+    SHA-256 digest is updated, so memory stays flat however many files a
+    request carries. The part is checked against the image signatures as
+    soon as enough bytes arrive: a mismatch stops spooling (the rest of the
+    part is read and dropped) and marks it ``rejected``. Crossing
+    ``max_bytes`` removes the file and aborts the request with a 413.
+    
+    Once the part is complete ``path``, ``size``, ``sha256`` and ``kind``
+    describe it. Files nobody ``keep()``s are removed when the request ends.
+    """
+    
+    def __init__(self, directory: str, filename: Optional[str] = None, max_bytes: int = UPLOAD_MAX_FILE_BYTES):
+        # Only the extension of the client's filename is used, and only a known one
+        extension = os.path.splitext(filename or '')[1].lower()
+        fd, self.path = tempfile.mkstemp(prefix='upload-', suffix=extension if extension in UPLOAD_EXTENSIONS else '',
+                                         dir=directory)
+        self._file = os.fdopen(fd, 'w+b')
+        self._digest = hashlib.sha256()
+        self._head = b''
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.kind = None
+        self.rejected = None
+        self.kept = False
+    
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.discard()
+            raise RequestEntityTooLarge(f"Uploaded files must be {self.max_bytes // (1024 * 1024)}MB or smaller")
+        if self.rejected:
+            return len(data)
+        
+        if self.kind is None:
+            self._head += data[:_SIGNATURE_BYTES]
+            if len(self._head) >= _SIGNATURE_BYTES:
+                self._check_signature()
+                if self.rejected:
+                    return len(data)
+        
+        self._digest.update(data)
+        return self._file.write(data)
+    
+    def _check_signature(self):
+        self.kind = sniff_image_type(self._head)
+        if self.kind is None:
+            self.rejected = "File content is not a PNG or JPEG image"
+            self.discard()
+    
+    def seek(self, offset: int, whence: int = 0) -> int:
+        # The parser seeks to the start once the part is complete
+        if self.kind is None and not self.rejected:
+            self._check_signature()
+        if self._file.closed:
+            return 0
+        self._file.flush()
+        return self._file.seek(offset, whence)
+    
+    def read(self, size: int = -1) -> bytes:
+        return b'' if self._file.closed else self._file.read(size)
+    
+    def tell(self) -> int:
+        return 0 if self._file.closed else self._file.tell()
+    
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+    
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+    
+    def keep(self) -> str:
+        """Take ownership of the spooled file; it is no longer removed with the request"""
+        self.kept = True
+        self._file.close()
+        return self.path
+    
+    def close(self):
+        self._file.close()
+    
+    def discard(self):
+        """Close and delete the spooled file"""
+        self._file.close()
+        try:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        except OSError as e:
+            logging.error(f"Error removing spooled upload {self.path}: {e}")
+
+class UploadRequest(Request):
+    """Request whose multipart file parts are spooled with SpooledUpload"""
+    
+    @property
+    def spooled_uploads(self) -> List[SpooledUpload]:
+        return self.__dict__.setdefault('_spooled_uploads', [])
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        max_bytes = current_app.config.get('UPLOAD_MAX_FILE_BYTES', UPLOAD_MAX_FILE_BYTES)
+        if content_length is not None and content_length > max_bytes:
+            raise RequestEntityTooLarge()
+        spool = SpooledUpload(current_app.config['UPLOAD_FOLDER'], filename, max_bytes)
+        self.spooled_uploads.append(spool)
+        return spool
+    
+    def discard_uploads(self):
+        """Remove every spooled file that was not kept"""
+        for spool in self.spooled_uploads:
+            if not spool.kept:
+                spool.discard()
@@ -1,8 +1,9 @@
 import re
 import logging
-from typing import List, Dict
+from typing import List
+from models import Slide
 
-def validate_presentation_data(title: str, slides: List[Dict]) -> List[str]:
+def validate_presentation_data(title: str, slides: List[Slide]) -> List[str]:
     """
     Validate presentation input data
     
@@ -31,12 +32,12 @@ def validate_presentation_data(title: str, slides: List[Dict]) -> List[str]:
     
     return errors
 
-def validate_slide_data(slide: Dict, slide_number: int) -> List[str]:
+def validate_slide_data(slide: Slide, slide_number: int) -> List[str]:
     """
     Validate individual slide data
     
     Args:
-        slide: Slide data dictionary
+        slide: Slide to check
         slide_number: Slide number for error messages
         
     Returns:
@@ -45,14 +46,14 @@ def validate_slide_data(slide: Dict, slide_number: int) -> List[str]:
     errors = []
     
     # Validate slide title
-    title = slide.get('title', '').strip()
+    title = slide.title.strip()
     if not title:
         errors.append(f"Slide {slide_number}: Title is required")
     elif len(title) > 200:
         errors.append(f"Slide {slide_number}: Title must be 200 characters or less")
     
     # Validate bullets
-    bullets = slide.get('bullets', [])
+    bullets = slide.bullets
     if len(bullets) > 10:
         errors.append(f"Slide {slide_number}: Maximum 10 bullet points allowed")
     
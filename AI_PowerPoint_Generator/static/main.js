@@ -163,8 +163,82 @@ document.addEventListener('DOMContentLoaded', function() {
             alert('Please provide a title for at least one slide.');
             return;
         }
+        
+        // Generate in the background and poll, falling back to a plain form post
+        if (form.dataset.jobsUrl && window.fetch) {
+            e.preventDefault();
+            submitJob(form);
+        }
     });
     
+    function submitJob(form) {
+        const generateBtn = document.getElementById('generateBtn');
+        const originalHtml = '<i data-feather="download" class="me-2"></i>Generate PowerPoint';
+        
+        function setStatus(text) {
+            generateBtn.innerHTML = `<span class="spinner-border spinner-border-sm me-2"></span>${text}`;
+        }
+        
+        function finish(message) {
+            generateBtn.disabled = false;
+            generateBtn.innerHTML = originalHtml;
+            feather.replace();
+            if (message) {
+                alert(message);
+            }
+        }
+        
+        class ResponseError extends Error {}
+        
+        // Error pages (such as 413 for oversized uploads) are HTML, not JSON
+        function readJson(response) {
+            const type = response.headers.get('Content-Type') || '';
+            if (type.includes('application/json')) {
+                return response.json();
+            }
+            if (response.status === 413) {
+                throw new ResponseError('The uploaded file is too large. Please use a smaller file.');
+            }
+            throw new ResponseError(`The server returned an error (${response.status}).`);
+        }
+        
+        function failWith(fallback) {
+            return error => finish(error instanceof ResponseError ? error.message : fallback);
+        }
+        
+        function poll(statusUrl) {
+            fetch(statusUrl)
+                .then(readJson)
+                .then(job => {
+                    if (job.status === 'done') {
+                        window.location = job.download_url;
+                        finish(job.warnings && job.warnings.length ? job.warnings.join('\n') : null);
+                    } else if (job.status === 'failed') {
+                        finish(`Failed to generate presentation: ${job.error}`);
+                    } else if (job.errors) {
+                        finish(job.errors.join('\n'));
+                    } else {
+                        const stage = job.stage.charAt(0).toUpperCase() + job.stage.slice(1);
+                        setStatus(`${stage}... ${Math.round(job.progress * 100)}%`);
+                        setTimeout(() => poll(statusUrl), 1000);
+                    }
+                })
+                .catch(failWith('Lost connection while generating the presentation.'));
+        }
+        
+        setStatus('Queued...');
+        fetch(form.dataset.jobsUrl, { method: 'POST', body: new FormData(form) })
+            .then(readJson)
+            .then(job => {
+                if (job.errors) {
+                    finish(job.errors.join('\n'));
+                } else {
+                    poll(job.status_url);
+                }
+            })
+            .catch(failWith('Could not start generating the presentation.'));
+    }
+    
     // File upload validation
     document.addEventListener('change', function(e) {
         if (e.target.type === 'file' && e.target.accept.includes('image/')) {
@@ -0,0 +1,62 @@
+import io
+import os
+import tempfile
+import pytest
+from PIL import Image
+from app import create_app
+from services import deck_cache, gemini, images
+from services.cache import MemoryCache
+
+@pytest.fixture(autouse=True)
+def isolated_image_cache(tmp_path, monkeypatch):
+    """Give every test its own empty image cache"""
+    monkeypatch.setattr(images, "_image_cache", images.ImageCache(str(tmp_path / "image-cache")))
+
+@pytest.fixture(autouse=True)
+def isolated_query_cache(monkeypatch):
+    """Give every test its own empty Pexels query cache"""
+    monkeypatch.setattr(images, "_query_cache", MemoryCache(ttl=images.PEXELS_CACHE_TTL))
+
+@pytest.fixture(autouse=True)
+def isolated_enhancement_cache(monkeypatch):
+    """Give every test its own empty enhancement cache"""
+    monkeypatch.setattr(gemini, "_enhancement_cache", MemoryCache(ttl=gemini.GEMINI_CACHE_TTL))
+
+@pytest.fixture(autouse=True)
+def isolated_deck_cache(tmp_path, monkeypatch):
+    """Give every test its own empty deck cache"""
+    monkeypatch.setattr(deck_cache, "_deck_cache", deck_cache.DeckCache(str(tmp_path / "deck-cache")))
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Test client with its own temp and upload directories"""
+    temp_dir = tmp_path / "tmp"
+    temp_dir.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(temp_dir))
+    
+    app = create_app()
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / "uploads")
+    os.makedirs(app.config['UPLOAD_FOLDER'])
+    yield app.test_client()
+    
+    if 'job_runner' in app.extensions:
+        app.extensions['job_runner'].stop()
+
+def png_upload(name: str = "photo.png"):
+    buffer = io.BytesIO()
+    Image.new('RGB', (120, 80), '#2b6cb0').save(buffer, format='PNG')
+    buffer.seek(0)
+    return buffer, name
+
+def make_deck_form(slides: int = 2):
+    form = {'title': 'Quarterly Review', 'theme': 'corporate'}
+    for i in range(slides):
+        form[f'slide_title_{i}'] = f'Slide {i + 1}'
+        form[f'slide_bullets_{i}'] = 'First point\nSecond point'
+        form[f'slide_image_file_{i}'] = png_upload()
+    return form
+
+@pytest.fixture
+def deck_form():
+    """Builder for /generate form data with a PNG upload per slide"""
+    return make_deck_form
@@ -0,0 +1,128 @@
+import io
+import time
+import asyncio
+import threading
+import pytest
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from models import Deck, Slide
+from services import gemini, gemini_scheduler, images
+from services.async_pipeline import AsyncRunner
+from services.gemini_scheduler import GeminiScheduler
+from services.jobs import JobRunner, MemoryJobQueue
+from benchmarks.stubs import FakeGeminiClient, ImageServer, PexelsServer
+
+@pytest.fixture
+def runner():
+    runner = AsyncRunner(render_workers=2)
+    yield runner
+    runner.stop()
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    fake = FakeGeminiClient(latency=0.05)
+    monkeypatch.setattr(gemini, "client", fake)
+    monkeypatch.setattr(gemini_scheduler, "_scheduler", GeminiScheduler(requests_per_minute=0, tokens_per_minute=0))
+    return fake
+
+def make_deck(title: str = 'Roadmap', image_url: str = None) -> Deck:
+    return Deck(
+        title=title,
+        enhance_ai=True,
+        slides=[Slide(title='Plan', bullets=['Point'], image_url=image_url), Slide(title='Goals', bullets=['Point'])]
+    )
+
+def test_async_pipeline_enhances_illustrates_and_renders(runner, fake_gemini, monkeypatch):
+    """Test a deck through Gemini's async client, an async Pexels search and async downloads"""
+    with ImageServer() as image_server, PexelsServer(photo_base=image_server.base_url) as pexels:
+        monkeypatch.setattr(images, "PEXELS_SEARCH_URL", pexels.search_url)
+        monkeypatch.setenv("PEXELS_API_KEY", "test-key")
+        stages = []
+        
+        buffer, warnings = runner.run(runner.run_pipeline(make_deck(), lambda stage, fraction: stages.append(stage)))
+    
+    prs = Presentation(buffer)
+    assert warnings == []
+    assert fake_gemini.calls == 1
+    assert stages == ['enhancing', 'finding images', 'rendering', 'done']
+    assert prs.slides[0].shapes.title.text == 'Enhanced Roadmap'
+    for slide in list(prs.slides)[1:]:
+        assert any(shape.shape_type == MSO_SHAPE_TYPE.PICTURE for shape in slide.shapes)
+    assert pexels.requests == 1
+    assert image_server.requests == 1
+
+def test_decks_share_the_event_loop(runner, fake_gemini):
+    """Test that concurrent decks wait on Gemini together rather than one after another"""
+    fake_gemini.latency = 0.3
+    
+    async def generate_many():
+        return await asyncio.gather(*(runner.run_pipeline(make_deck(f'Deck {i}')) for i in range(20)))
+    
+    started = time.monotonic()
+    results = runner.run(generate_many())
+    elapsed = time.monotonic() - started
+    
+    assert fake_gemini.calls == 20
+    assert all(warnings == [] for _, warnings in results)
+    assert elapsed < 3
+
+def test_prefetch_deadline_cancels_late_downloads(tmp_path):
+    """Test that downloads still running at the deadline are cancelled without leaving files"""
+    async def prefetch(server):
+        async with images.create_async_http_client() as http:
+            return await images.prefetch_images_async(
+                http, [server.url('fast.png'), server.url('slow.png', delay=2)], deadline=0.5
+            )
+    
+    with ImageServer() as server:
+        results = asyncio.run(prefetch(server))
+    
+    assert list(results) == [server.url('fast.png')]
+    assert list((tmp_path / "image-cache" / "tmp").iterdir()) == []
+
+def test_job_runner_async_mode(runner, tmp_path):
+    """Test that jobs run as coroutines on the async runner"""
+    async def pipeline(deck, progress):
+        progress('rendering', 0.5)
+        await asyncio.sleep(0.01)
+        return io.BytesIO(b'PK-deck'), []
+    
+    jobs = JobRunner(MemoryJobQueue(), pipeline, results_dir=str(tmp_path / "results"), async_runner=runner)
+    job_ids = [jobs.submit(Deck(title=f'Deck {i}', slides=[]), 'deck.pptx', []) for i in range(5)]
+    for _ in range(100):
+        if all(jobs.get(job_id)['status'] == 'done' for job_id in job_ids):
+            break
+        time.sleep(0.02)
+    jobs.stop()
+    
+    assert [jobs.get(job_id)['status'] for job_id in job_ids] == ['done'] * 5
+    with open(jobs.result_path(job_ids[0]), 'rb') as f:
+        assert f.read() == b'PK-deck'
+
+def test_job_status_writes_stay_off_the_event_loop(runner, tmp_path):
+    """Test that a slow job store does not block the loop, and the final status is written last"""
+    class SlowQueue(MemoryJobQueue):
+        threads = set()
+        
+        def update(self, job_id, **fields):
+            self.threads.add(threading.current_thread().name)
+            time.sleep(0.02)
+            super().update(job_id, **fields)
+    
+    async def pipeline(deck, progress):
+        for i in range(10):
+            progress('rendering', i / 10)
+            await asyncio.sleep(0)
+        return io.BytesIO(b'PK-deck'), []
+    
+    jobs = JobRunner(SlowQueue(), pipeline, results_dir=str(tmp_path / "results"), async_runner=runner)
+    job_id = jobs.submit(Deck(title='Deck', slides=[]), 'deck.pptx', [])
+    for _ in range(100):
+        if jobs.get(job_id)['status'] == 'done':
+            break
+        time.sleep(0.02)
+    jobs.stop()
+    
+    job = jobs.get(job_id)
+    assert (job['status'], job['stage'], job['progress']) == ('done', 'done', 1.0)
+    assert 'async-pipeline' not in SlowQueue.threads
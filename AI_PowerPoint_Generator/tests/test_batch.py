@@ -0,0 +1,75 @@
+import io
+import json
+import zipfile
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from services import images
+from services.batch import load_deck_specs, run_batch, percentile
+from benchmarks.stubs import ImageServer, PexelsServer
+
+def deck_spec(title: str, **slide) -> str:
+    return json.dumps({'title': title, 'theme': 'dark', 'slides': [{'title': 'Intro', 'bullets': ['Point'], **slide}]})
+
+def test_batch_reports_invalid_lines_per_deck(tmp_path):
+    """Test that bad lines are reported without stopping the rest of the batch"""
+    lines = [deck_spec('First'), 'not json', '', json.dumps({'title': '', 'slides': []}), deck_spec('Second')]
+    
+    report = run_batch(load_deck_specs(lines), str(tmp_path / "out"), workers=2)
+    
+    assert [result['status'] for result in report['results']] == ['ok', 'invalid', 'invalid', 'ok']
+    assert [result['line'] for result in report['results']] == [1, 2, 4, 5]
+    assert "Presentation title is required" in report['results'][2]['errors']
+    assert report['summary']['succeeded'] == 2
+    assert report['summary']['decks_per_sec'] > 0
+    assert sorted(path.name for path in (tmp_path / "out").iterdir()) == [
+        '0001-first.pptx', '0002-second.pptx', 'report.json'
+    ]
+
+def test_batch_reports_wrongly_typed_fields(tmp_path):
+    """Test that fields of the wrong JSON type make only their deck invalid"""
+    lines = [
+        json.dumps({'title': 'Themes', 'theme': ['dark'], 'slides': [{'title': 'Intro'}]}),
+        deck_spec('Keywords', image_keywords='teamwork'),
+        json.dumps({'title': 'Bullets', 'max_bullets': '3', 'enhance_ai': True, 'tone': 5, 'slides': [{'title': 'Intro'}]}),
+        deck_spec('Fine'),
+    ]
+    
+    report = run_batch(load_deck_specs(lines), str(tmp_path / "out"), workers=1, enhance=False)
+    
+    assert [result['status'] for result in report['results']] == ['invalid', 'invalid', 'invalid', 'ok']
+    assert report['results'][0]['errors'] == ["Theme must be a string"]
+    assert report['results'][1]['errors'] == ["Slide 1: Image keywords must be a list of strings"]
+    assert report['results'][2]['errors'] == ["Tone must be a string", "Maximum bullets must be a number"]
+
+def test_batch_downloads_shared_images_once(tmp_path):
+    """Test that an image used by every deck is fetched once and embedded in each"""
+    with ImageServer() as server:
+        lines = [deck_spec(f'Deck {i}', image_url=server.url("logo.png")) for i in range(6)]
+        report = run_batch(load_deck_specs(lines), str(tmp_path / "decks.zip"), workers=2)
+        
+        assert server.requests == 1
+    
+    assert report['summary']['succeeded'] == 6
+    with zipfile.ZipFile(tmp_path / "decks.zip") as archive:
+        assert len([name for name in archive.namelist() if name.endswith('.pptx')]) == 6
+        assert json.loads(archive.read('report.json'))['summary']['decks'] == 6
+        prs = Presentation(io.BytesIO(archive.read('0006-deck-5.pptx')))
+    assert any(shape.shape_type == MSO_SHAPE_TYPE.PICTURE for shape in prs.slides[1].shapes)
+
+def test_batch_shares_pexels_queries(tmp_path, monkeypatch):
+    """Test that decks asking for the same keywords share one Pexels lookup"""
+    monkeypatch.setenv("PEXELS_API_KEY", "test-key")
+    
+    with PexelsServer() as server:
+        monkeypatch.setattr(images, "PEXELS_SEARCH_URL", server.search_url)
+        lines = [deck_spec(f'Deck {i}', image_keywords=['Office', 'team']) for i in range(4)]
+        run_batch(load_deck_specs(lines), str(tmp_path / "out"), workers=1)
+        
+        # One search, then one download of the suggested photo
+        assert server.requests == 2
+
+def test_percentile_nearest_rank():
+    values = [float(i) for i in range(1, 21)]
+    assert percentile(values, 50) == 10.0
+    assert percentile(values, 95) == 19.0
+    assert percentile([], 95) == 0.0
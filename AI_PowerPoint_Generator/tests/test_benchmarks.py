@@ -0,0 +1,74 @@
+import json
+from services import deck_cache, gemini, images
+from benchmarks import loadtest, suite
+
+def result(median: float) -> dict:
+    return {'median': median}
+
+def test_compare_flags_slower_medians():
+    """Test that only cases slower than the threshold are reported"""
+    baseline = {'results': {'fast': result(0.010), 'steady': result(0.100), 'removed': result(1.0)}}
+    current = {'results': {'fast': result(0.020), 'steady': result(0.110), 'new': result(0.5)}}
+    
+    regressions = suite.compare(baseline, current, threshold=0.25)
+    
+    assert [regression['case'] for regression in regressions] == ['fast']
+    assert regressions[0]['ratio'] == 2.0
+
+def test_suite_writes_json(tmp_path, monkeypatch):
+    """Test a quick run of one case end to end"""
+    # The suite installs its stubs globally; put the originals back afterwards
+    for module, name in ((gemini, 'client'), (gemini, 'GEMINI_CACHE'), (images, 'PEXELS_SEARCH_URL'),
+                         (deck_cache, 'DECK_CACHE_DIR'), (deck_cache, '_deck_cache')):
+        monkeypatch.setattr(module, name, getattr(module, name))
+    monkeypatch.setenv("PEXELS_API_KEY", "test-key")
+    output = tmp_path / "results.json"
+    
+    assert suite.main(['--quick', '--only', 'validate', '-o', str(output)]) == 0
+    
+    report = json.loads(output.read_text())
+    assert list(report['results']) == ['validate_presentation_data[20 slides]']
+    assert report['results']['validate_presentation_data[20 slides]']['rounds'] == 2
+    assert report['peak_rss_mb'] > 0
+
+def test_loadtest_parses_server_timing():
+    """Test that repeated stages are summed and converted to seconds"""
+    header = 'parse_form;dur=0.5, gemini_request;dur=400.0, gemini_request;dur=100.0, total;dur=600.0'
+    
+    assert loadtest.parse_server_timing(header) == {'parse_form': 0.0005, 'gemini_request': 0.5, 'total': 0.6}
+    assert loadtest.parse_server_timing('') == {}
+
+def test_loadtest_summary_and_compare(tmp_path, capsys):
+    """Test that error pages count as errors and saved runs print side by side"""
+    assert loadtest.classify(200, loadtest.PPTX_MIMETYPE) == 'ok'
+    assert loadtest.classify(200, 'text/html; charset=utf-8') == 'error page'
+    assert loadtest.classify(502, 'text/html') == 'http 502'
+    results = [
+        {'status': 'ok', 'mix': '5 slides', 'latency': 0.2, 'stages': {'render': 0.1}},
+        {'status': 'ok', 'mix': '5 slides', 'latency': 0.4, 'stages': {'render': 0.3}},
+        {'status': 'error page', 'mix': '20 slides', 'latency': 0.1, 'stages': {}},
+        {'status': 'ok', 'mix': '20 slides', 'latency': 0.6, 'stages': {'render': 0.5}},
+    ]
+    
+    summary = loadtest.summarize(results, elapsed=2.0)
+    
+    assert summary['requests_per_sec'] == 2.0
+    assert summary['ok_per_sec'] == 1.5
+    assert summary['error_rate'] == 0.25
+    assert summary['errors'] == {'error page': 1}
+    assert summary['latency']['p50'] == 0.4
+    assert summary['stages']['render']['max'] == 0.5
+    assert summary['by_mix']['20 slides']['error_rate'] == 0.5
+    
+    report = {
+        'config': {'target': 'gunicorn', 'workers': 2, 'threads': 4, 'concurrency': 8},
+        'summary': summary,
+        'workers': [{'pid': 1, 'peak_rss_mb': 90.0}, {'pid': 2, 'peak_rss_mb': 95.5}],
+    }
+    path = tmp_path / "run.json"
+    path.write_text(json.dumps(report))
+    loadtest.compare([str(path)])
+    
+    row = capsys.readouterr().out.splitlines()[1]
+    assert row.startswith('gunicorn w=2 t=4 c=8')
+    assert '25.0%' in row and '95.5MB' in row
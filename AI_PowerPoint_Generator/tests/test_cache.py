@@ -0,0 +1,62 @@
+import time
+import pytest
+from services.cache import MemoryCache, SqliteCache
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_cache(request, tmp_path):
+    def make(**kwargs):
+        if request.param == 'memory':
+            return MemoryCache(**kwargs)
+        return SqliteCache(str(tmp_path / "cache.db"), **kwargs)
+    return make
+
+def test_get_or_load_caches_until_ttl(make_cache):
+    """Test that loaders run once per key until the entry expires"""
+    cache = make_cache(ttl=0.2)
+    calls = []
+    
+    def loader():
+        calls.append(1)
+        return f"value-{len(calls)}"
+    
+    assert cache.get_or_load("key", loader) == "value-1"
+    assert cache.get_or_load("key", loader) == "value-1"
+    time.sleep(0.25)
+    assert cache.get_or_load("key", loader) == "value-2"
+    assert cache.stats()['misses'] == 2
+
+def test_stale_entries_served_while_refreshing(make_cache):
+    """Test stale-while-revalidate returns the old value and refreshes it"""
+    cache = make_cache(ttl=0.1, stale_ttl=10)
+    cache.set("key", "old")
+    time.sleep(0.15)
+    
+    assert cache.get_or_load("key", lambda: "new") == "old"
+    for _ in range(50):
+        if cache.get("key") == "new":
+            break
+        time.sleep(0.02)
+    
+    assert cache.get("key") == "new"
+    assert cache.stats()['stale_hits'] == 1
+
+def test_none_is_not_cached(make_cache):
+    """Test that failed lookups are retried rather than cached"""
+    cache = make_cache(ttl=60)
+    assert cache.get_or_load("key", lambda: None) is None
+    assert cache.get_or_load("key", lambda: "found") == "found"
+
+def test_max_entries_evicts_least_recently_used(make_cache):
+    """Test that the least recently used entry is dropped first"""
+    cache = make_cache(ttl=60, max_entries=2)
+    cache.set("a", 1)
+    time.sleep(0.01)
+    cache.set("b", 2)
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.set("c", 3)
+    
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
@@ -0,0 +1,109 @@
+import io
+import os
+import time
+import threading
+from models import Deck, Slide
+from services import gemini
+from services.deck_cache import DeckCache, deck_key
+
+def make_deck(**options) -> Deck:
+    return Deck(title='Review', slides=[Slide(title='One', bullets=['First point'])], **options)
+
+def test_deck_key_covers_the_spec(monkeypatch):
+    """Test that only options that change the rendered deck change its key"""
+    key = deck_key(make_deck())
+    assert deck_key(make_deck()) == key
+    assert deck_key(make_deck(theme='dark')) != key
+    assert deck_key(Deck(title='Review', slides=[Slide(title='One', bullets=['Other point'])])) != key
+    # Enhancement options only matter once enhancement is on
+    assert deck_key(make_deck(enhancement_mode='expand')) == key
+    assert deck_key(make_deck(enhance_ai=True)) != deck_key(make_deck(enhance_ai=True, enhancement_mode='expand'))
+    # Uploads count by content, not by their spooled path
+    upload = Slide(title='One', image_path='/tmp/upload-a', image_digest='abc')
+    moved = Slide(title='One', image_path='/tmp/upload-b', image_digest='abc')
+    assert deck_key(Deck(title='Review', slides=[upload])) == deck_key(Deck(title='Review', slides=[moved]))
+    # Another model or temperature gives other enhanced decks
+    enhanced = deck_key(make_deck(enhance_ai=True))
+    monkeypatch.setattr(gemini, "GEMINI_MODEL", "gemini-2.5-flash")
+    assert deck_key(make_deck(enhance_ai=True)) != enhanced
+    assert deck_key(make_deck()) == key
+    monkeypatch.setattr(gemini, "GEMINI_TEMPERATURE", 0.9)
+    assert deck_key(make_deck(enhance_ai=True)) != enhanced
+
+def test_render_once_then_serve_stored_deck(tmp_path):
+    """Test misses, hits, ETags and that renders with warnings are not stored"""
+    cache = DeckCache(str(tmp_path / "decks"))
+    renders = []
+    
+    def render(warnings=()):
+        renders.append(None)
+        return io.BytesIO(b'PK deck %d' % len(renders)), list(warnings)
+    
+    first = cache.get_or_render('a' * 64, render)
+    assert not first.hit and first.etag and first.file.read() == b'PK deck 1'
+    second = cache.get_or_render('a' * 64, render)
+    assert second.hit and second.etag == first.etag and second.file.read() == b'PK deck 1'
+    second.file.close()
+    assert len(renders) == 1
+    
+    # A bypass renders afresh and replaces the stored copy
+    time.sleep(0.01)
+    fresh = cache.get_or_render('a' * 64, render, bypass=True)
+    assert not fresh.hit and fresh.etag != first.etag
+    stored = cache.get_or_render('a' * 64, render)
+    assert stored.file.read() == b'PK deck 2'
+    stored.file.close()
+    
+    degraded = cache.get_or_render('b' * 64, lambda: render(['Enhancement failed']))
+    assert degraded.etag is None and degraded.warnings == ['Enhancement failed']
+    cache.get_or_render('b' * 64, render)
+    assert len(renders) == 4
+    assert cache.stats() == {'hits': 2, 'misses': 3, 'coalesced': 0, 'bypassed': 1, 'evictions': 0, 'entries': 2}
+
+def test_old_and_least_recently_used_decks_go(tmp_path):
+    """Test expiry by age and eviction by size budget"""
+    cache = DeckCache(str(tmp_path / "decks"), max_bytes=250)
+    for key in ('a', 'b'):
+        cache.store(key * 64, io.BytesIO(b'x' * 100))
+        os.utime(tmp_path / "decks" / f"{key * 64}.pptx", (time.time() - 10, time.time()))
+    cache.open('a' * 64)[0].close()
+    
+    cache.store('c' * 64, io.BytesIO(b'x' * 100))
+    assert sorted(os.listdir(tmp_path / "decks")) == [f"{key * 64}.pptx" for key in ('a', 'c')]
+    assert cache.evictions == 1
+    
+    cache.max_age = 0
+    time.sleep(0.01)
+    assert cache.open('a' * 64) is None
+
+def test_duplicate_submissions_wait_for_the_render_in_flight(tmp_path):
+    """Test that identical decks submitted together render once"""
+    cache = DeckCache(str(tmp_path / "decks"))
+    started = threading.Event()
+    release = threading.Event()
+    renders = []
+    
+    def render():
+        renders.append(None)
+        started.set()
+        release.wait(5)
+        return io.BytesIO(b'PK deck'), []
+    
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_render('a' * 64, render)))
+    leader.start()
+    started.wait(5)
+    waiters = [threading.Thread(target=lambda: results.append(cache.get_or_render('a' * 64, render))) for _ in range(3)]
+    for waiter in waiters:
+        waiter.start()
+    while cache.coalesced < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + waiters:
+        thread.join()
+    
+    assert len(renders) == 1
+    assert sorted(result.hit for result in results) == [False, True, True, True]
+    assert {result.file.read() for result in results} == {b'PK deck'}
+    for result in results:
+        result.file.close()
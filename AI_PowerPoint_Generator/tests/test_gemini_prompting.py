@@ -0,0 +1,122 @@
+from dataclasses import replace
+from models import Deck, Slide
+from services.gemini import build_system_prompt, build_user_prompt, enhance_presentation
+from benchmarks.stubs import FakeGeminiClient
+
+def make_deck(slides: int) -> Deck:
+    return Deck(
+        title='Roadmap',
+        slides=[
+            Slide(title=f'Slide {i}', bullets=[f'Point {i}'], image_url=f'https://example.com/{i}.png')
+            for i in range(slides)
+        ]
+    )
+
+def test_system_prompt_modes():
+    """Test mode-specific instructions in the system prompt"""
+    assert "Keep the same number of bullet points" in build_system_prompt('polish', 3, 'professional')
+    assert "Add up to 2 new bullet points" in build_system_prompt('expand', 2, 'friendly')
+    assert "speaker notes" in build_system_prompt('notes', 3, 'concise')
+    assert "with a friendly tone" in build_system_prompt('expand', 2, 'friendly')
+
+def test_user_prompt_lists_slides():
+    """Test that every slide title and bullet appears in the user prompt"""
+    prompt = build_user_prompt(make_deck(2))
+    
+    assert "Title: Roadmap" in prompt
+    assert "Slide 2:\n  Title: Slide 1\n  Bullets:\n  - Point 1" in prompt
+
+def test_single_request_for_small_decks():
+    """Test that decks within the chunk size are sent in one request"""
+    fake = FakeGeminiClient()
+    result = enhance_presentation(make_deck(4), 'polish', chunk_size=5, model_client=fake)
+    
+    assert fake.calls == 1
+    assert result.title == 'Enhanced Roadmap'
+    assert [slide.title for slide in result.slides] == [f'Enhanced Slide {i}' for i in range(4)]
+    assert result.slides[3].image_url == 'https://example.com/3.png'
+
+def test_chunked_enhancement_keeps_slide_order():
+    """Test that chunks are merged back in deck order"""
+    fake = FakeGeminiClient()
+    result = enhance_presentation(make_deck(12), 'polish', chunk_size=5, max_concurrency=3, model_client=fake)
+    
+    assert fake.calls == 3
+    assert [slide.title for slide in result.slides] == [f'Enhanced Slide {i}' for i in range(12)]
+    assert [slide.image_url for slide in result.slides] == [f'https://example.com/{i}.png' for i in range(12)]
+
+def test_failed_chunk_keeps_original_slides():
+    """Test that a chunk failing every retry falls back to its original slides"""
+    fake = FakeGeminiClient(fail_when=lambda prompt: 'Title: Slide 5' in prompt)
+    result = enhance_presentation(make_deck(10), 'polish', chunk_size=5, model_client=fake)
+    
+    titles = [slide.title for slide in result.slides]
+    assert titles == [f'Enhanced Slide {i}' for i in range(5)] + [f'Slide {i}' for i in range(5, 10)]
+    # One attempt for the good chunk, two for the failing one
+    assert fake.calls == 3
+
+def test_every_chunk_failing_returns_none():
+    """Test that enhancement reports failure when no chunk succeeds"""
+    fake = FakeGeminiClient(fail_when=lambda prompt: True)
+    assert enhance_presentation(make_deck(10), 'polish', chunk_size=5, model_client=fake) is None
+
+def test_theme_change_reuses_cached_enhancement():
+    """Test that regenerating with another theme makes no new Gemini call"""
+    fake = FakeGeminiClient()
+    deck = make_deck(3)
+    first = enhance_presentation(deck, 'polish', model_client=fake)
+    second = enhance_presentation(replace(deck, theme='dark'), 'polish', model_client=fake)
+    
+    assert fake.calls == 1
+    assert second.slides == first.slides
+    assert second.theme == 'dark'
+
+def test_editing_one_slide_only_reenhances_that_slide():
+    """Test that per-slide cache entries cover the unchanged slides"""
+    fake = FakeGeminiClient()
+    deck = make_deck(8)
+    enhance_presentation(deck, 'polish', model_client=fake)
+    calls = fake.calls
+    
+    deck.slides[6] = replace(deck.slides[6], title='Edited')
+    result = enhance_presentation(deck, 'polish', model_client=fake)
+    
+    assert fake.calls == calls + 1
+    assert fake.prompts[-1].count('Title: ') == 2  # Deck title plus the edited slide
+    assert result.slides[6].title == 'Enhanced Edited'
+    assert result.slides[7].title == 'Enhanced Slide 7'
+
+def test_renaming_the_deck_reuses_slide_enhancements():
+    """Test that per-slide cache entries do not depend on the deck title"""
+    fake = FakeGeminiClient()
+    deck = make_deck(4)
+    enhance_presentation(deck, 'polish', model_client=fake)
+    calls = fake.calls
+    
+    result = enhance_presentation(replace(deck, title='Roadmap 2025'), 'polish', model_client=fake)
+    
+    assert fake.calls == calls
+    assert result.title == 'Roadmap 2025'
+    assert [slide.title for slide in result.slides] == [f'Enhanced Slide {i}' for i in range(4)]
+    # Another tone is another system prompt, so the slides are enhanced again
+    enhance_presentation(deck, 'polish', tone='friendly', model_client=fake)
+    assert fake.calls == calls + 1
+
+def test_different_modes_are_cached_separately():
+    """Test that the system prompt is part of the cache key"""
+    fake = FakeGeminiClient()
+    enhance_presentation(make_deck(2), 'polish', model_client=fake)
+    enhance_presentation(make_deck(2), 'notes', model_client=fake)
+    
+    assert fake.calls == 2
+
+def test_failed_chunks_are_not_cached():
+    """Test that slides kept after a failure are retried on the next run"""
+    failing = FakeGeminiClient(fail_when=lambda prompt: 'Title: Slide 5' in prompt)
+    enhance_presentation(make_deck(10), 'polish', chunk_size=5, model_client=failing)
+    
+    fake = FakeGeminiClient()
+    result = enhance_presentation(make_deck(10), 'polish', chunk_size=5, model_client=fake)
+    
+    assert fake.calls == 1
+    assert [slide.title for slide in result.slides] == [f'Enhanced Slide {i}' for i in range(10)]
@@ -0,0 +1,119 @@
+import time
+import threading
+import pytest
+from models import Deck, Slide
+from services import gemini, gemini_scheduler, metrics
+from services.gemini import EnhancementStream, enhance_presentation
+from services.gemini_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, GeminiScheduler, SchedulerTimeout
+from benchmarks.stubs import FakeGeminiClient, RateLimitError
+
+def make_deck(slides: int = 2) -> Deck:
+    return Deck(title='Roadmap', slides=[Slide(title=f'Slide {i}', bullets=[f'Point {i}']) for i in range(slides)])
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = GeminiScheduler(requests_per_minute=0, tokens_per_minute=0, backoff_base=0.01)
+    monkeypatch.setattr(gemini_scheduler, "_scheduler", scheduler)
+    monkeypatch.setattr(gemini, "GEMINI_CACHE", "")
+    return scheduler
+
+def wait_for_depth(depth: int):
+    for _ in range(200):
+        if metrics.GEMINI_QUEUE_DEPTH.value() >= depth:
+            return
+        time.sleep(0.005)
+
+def test_rate_limited_calls_are_retried(scheduler):
+    """Test that 429s are retried with backoff instead of failing the enhancement"""
+    fake = FakeGeminiClient(rate_limited=2)
+    limited = metrics.GEMINI_CALLS.value(result='rate_limited')
+    
+    result = enhance_presentation(make_deck(), 'polish', model_client=fake)
+    
+    assert fake.calls == 3
+    assert result.title == 'Enhanced Roadmap'
+    assert metrics.GEMINI_CALLS.value(result='rate_limited') == limited + 2
+
+def test_retries_are_bounded(scheduler):
+    """Test that a call still rate limited after every retry raises the 429"""
+    scheduler.retries = 1
+    calls = []
+    
+    def throttled():
+        calls.append(None)
+        raise RateLimitError("429 RESOURCE_EXHAUSTED")
+    
+    with pytest.raises(RateLimitError):
+        scheduler.call(throttled)
+    assert len(calls) == 2
+
+def test_stream_retries_before_first_chunk(scheduler):
+    """Test that a stream rejected with a 429 is restarted and fully enhanced"""
+    fake = FakeGeminiClient(rate_limited=1)
+    stream = EnhancementStream(make_deck(3), 'polish', model_client=fake)
+    
+    titles = [slide.title for _, slide in stream]
+    
+    assert fake.calls == 2
+    assert titles == ['Enhanced Slide 0', 'Enhanced Slide 1', 'Enhanced Slide 2']
+
+def test_identical_prompts_in_flight_share_one_call(scheduler):
+    """Test that concurrent requests for the same deck make a single Gemini call"""
+    fake = FakeGeminiClient(latency=0.2)
+    coalesced = metrics.GEMINI_COALESCED.value()
+    results = []
+    
+    def enhance():
+        results.append(enhance_presentation(make_deck(), 'polish', model_client=fake))
+    
+    threads = [threading.Thread(target=enhance) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert fake.calls == 1
+    assert metrics.GEMINI_COALESCED.value() == coalesced + 3
+    assert all(result.title == 'Enhanced Roadmap' for result in results)
+
+def test_request_budget_spaces_calls():
+    """Test that calls beyond the bucket wait for it to refill"""
+    scheduler = GeminiScheduler(requests_per_minute=600, tokens_per_minute=0)
+    scheduler.requests.level = 1
+    
+    started = time.monotonic()
+    for _ in range(3):
+        scheduler.acquire()
+    
+    assert time.monotonic() - started >= 0.19
+
+def test_interactive_calls_go_before_queued_batch_calls():
+    """Test that a waiting interactive call is admitted ahead of an earlier batch call"""
+    scheduler = GeminiScheduler(requests_per_minute=600, tokens_per_minute=0)
+    scheduler.requests.level = 0
+    depth = metrics.GEMINI_QUEUE_DEPTH.value()
+    order = []
+    
+    def call(level, name):
+        scheduler.acquire(priority=level)
+        order.append(name)
+    
+    batch = threading.Thread(target=call, args=(PRIORITY_BATCH, 'batch'))
+    batch.start()
+    wait_for_depth(depth + 1)
+    interactive = threading.Thread(target=call, args=(PRIORITY_INTERACTIVE, 'interactive'))
+    interactive.start()
+    batch.join()
+    interactive.join()
+    
+    assert order == ['interactive', 'batch']
+    assert metrics.GEMINI_QUEUE_WAIT.value(priority='batch') > 0
+
+def test_queue_timeout():
+    """Test that a call gives up when the budget cannot cover it in time"""
+    scheduler = GeminiScheduler(requests_per_minute=1, tokens_per_minute=0, queue_timeout=0.05)
+    scheduler.acquire()
+    
+    with pytest.raises(SchedulerTimeout):
+        scheduler.acquire()
+    assert scheduler._queue == []
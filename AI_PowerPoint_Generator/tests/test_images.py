@@ -0,0 +1,252 @@
+import os
+import time
+from models import Slide
+from services import images
+from services.images import prefetch_images
+from services.pipeline import suggest_images
+from services.ppt_generator import generate_ppt
+from services.themes import get_theme
+from benchmarks.stubs import ImageServer, PexelsServer, make_png
+
+def test_prefetch_images_downloads_concurrently():
+    """Test that prefetching overlaps downloads instead of running them serially"""
+    with ImageServer(latency=0.3) as server:
+        urls = [server.url(f"img{i}.png") for i in range(6)]
+        
+        started = time.monotonic()
+        results = prefetch_images(urls, max_workers=6)
+        elapsed = time.monotonic() - started
+        
+        assert set(results) == set(urls)
+        assert server.peak_in_flight > 1
+        assert elapsed < 0.3 * len(urls)
+    
+    for path in results.values():
+        assert os.path.exists(path)
+        images.release_image(path)
+
+def test_prefetch_images_deduplicates_urls():
+    """Test that a URL used on several slides is downloaded once"""
+    with ImageServer() as server:
+        url = server.url("logo.png")
+        results = prefetch_images([url, url, None, url])
+        
+        assert list(results) == [url]
+        assert server.requests == 1
+    
+    images.release_image(results[url])
+
+def test_prefetch_images_respects_deadline():
+    """Test that slow images are skipped once the deadline passes"""
+    with ImageServer() as server:
+        fast = server.url("fast.png")
+        slow = server.url("slow.png", delay=2)
+        
+        started = time.monotonic()
+        results = prefetch_images([fast, slow], deadline=0.5)
+        
+        assert time.monotonic() - started < 1.5
+        assert list(results) == [fast]
+    
+    images.release_image(results[fast])
+
+def test_generate_ppt_with_image_urls():
+    """Test that generation embeds prefetched images and a repeat deck hits the cache"""
+    with ImageServer() as server:
+        slides = [
+            Slide(title=f'Slide {i}', bullets=['Point'], image_url=server.url(f"img{i}.png"))
+            for i in range(3)
+        ]
+        for _ in range(2):
+            ppt_path = generate_ppt("Images", slides, get_theme('default'))
+            assert os.path.getsize(ppt_path) > 0
+            os.remove(ppt_path)
+        
+        assert server.requests == 3
+
+def test_get_image_suggestions_many_reuses_connections(monkeypatch):
+    """Test batched Pexels lookups: slide order, dedupe and pooled connections"""
+    monkeypatch.setenv("PEXELS_API_KEY", "test-key")
+    
+    with PexelsServer(latency=0.05) as server:
+        monkeypatch.setattr(images, "PEXELS_SEARCH_URL", server.search_url)
+        monkeypatch.setattr(images, "PEXELS_MAX_WORKERS", 3)
+        
+        keyword_lists = [[f"topic{i}", "office"] for i in range(9)]
+        keyword_lists += [["topic0", "office"], None, []]
+        
+        results = images.get_image_suggestions_many(keyword_lists)
+        
+        assert results[:9] == [server.photo_url(f"office topic{i}") for i in range(9)]
+        assert results[9] == results[0]
+        assert results[10:] == [None, None]
+        
+        # Duplicates are sent once and the connections are pooled
+        assert server.requests == 9
+        assert server.connections <= 3
+        
+        images.get_image_suggestions_many([[f"other{i}"] for i in range(9)])
+        assert server.requests == 18
+        assert server.connections <= 3
+
+def test_image_suggestions_use_normalised_query_cache(monkeypatch):
+    """Test that near-identical keyword lists share one cached Pexels lookup"""
+    monkeypatch.setenv("PEXELS_API_KEY", "test-key")
+    
+    with PexelsServer() as server:
+        monkeypatch.setattr(images, "PEXELS_SEARCH_URL", server.search_url)
+        
+        first = images.get_image_suggestions(["Teamwork", "office", "Collaboration"])
+        second = images.get_image_suggestions(["collaboration", " teamwork", "Office", "extra"])
+        
+        assert first == second == server.photo_url("collaboration office teamwork")
+        assert server.requests == 1
+    
+    stats = images.get_query_cache().stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+
+def test_suggest_images_copies_slides(monkeypatch):
+    """Test that suggested images go on copies, leaving slides shared with caches untouched"""
+    monkeypatch.setenv("PEXELS_API_KEY", "test-key")
+    slides = [Slide(title='Team', image_keywords=['teamwork']), Slide(title='Plain')]
+    
+    with PexelsServer() as server:
+        monkeypatch.setattr(images, "PEXELS_SEARCH_URL", server.search_url)
+        suggested = suggest_images(slides)
+    
+    assert suggested[0].image_url == server.photo_url('teamwork')
+    assert suggested[1] is slides[1]
+    assert slides[0].image_url is None
+
+def test_image_cache_serves_repeat_fetches_without_network(tmp_path):
+    """Test that a cached image is returned from disk with no request"""
+    cache = images.ImageCache(str(tmp_path))
+    
+    with ImageServer() as server:
+        first = cache.fetch(server.url("logo.png"))
+        second = cache.fetch(server.url("logo.png"))
+        
+        assert server.requests == 1
+    
+    assert first == second
+    assert cache.contains(first)
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+def test_image_cache_revalidates_stale_entries(tmp_path):
+    """Test that stale entries are revalidated with a conditional GET"""
+    cache = images.ImageCache(str(tmp_path), max_age=0)
+    
+    with ImageServer() as server:
+        first = cache.fetch(server.url("logo.png"))
+        second = cache.fetch(server.url("logo.png"))
+        
+        assert server.requests == 2
+        assert server.not_modified == 1
+    
+    assert first == second
+    assert cache.stats()['revalidations'] == 1
+
+def test_image_cache_downloads_again_when_revalidated_blob_was_evicted(tmp_path, monkeypatch):
+    """Test that a 304 for a blob evicted after the lookup falls back to a full download"""
+    cache = images.ImageCache(str(tmp_path), max_age=0)
+    lookup = cache._lookup
+    
+    def lookup_then_evict(image_url):
+        path, cached = lookup(image_url)
+        if cached:
+            # Another worker evicts the blob before the 304 arrives
+            with cache._connect() as conn:
+                conn.execute("DELETE FROM blobs WHERE digest = ?", (cached[0],))
+            os.remove(cached[1])
+        return path, cached
+    
+    with ImageServer() as server:
+        cache.release(cache.fetch(server.url("logo.png")))
+        monkeypatch.setattr(cache, "_lookup", lookup_then_evict)
+        path = cache.fetch(server.url("logo.png"))
+        
+        assert server.requests == 3
+        assert server.not_modified == 1
+    
+    assert os.path.exists(path)
+    assert cache.stats()['revalidations'] == 0
+
+def test_image_cache_evicts_least_recently_used(tmp_path):
+    """Test LRU eviction of released blobs once the byte budget is exceeded"""
+    bodies = [make_png(color=color) for color in ('#ff0000', '#00ff00', '#0000ff')]
+    cache = images.ImageCache(str(tmp_path), max_bytes=sum(len(body) for body in bodies) - 1)
+    
+    with ImageServer() as server:
+        paths = []
+        for name, body in zip("abc", bodies):
+            server.body = body
+            paths.append(cache.fetch(server.url(f"{name}.png")))
+            cache.release(paths[-1])
+            time.sleep(0.01)
+            if name == "b":
+                # Use the first image again so the second becomes least recently used
+                cache.release(cache.fetch(server.url("a.png")))
+                time.sleep(0.01)
+    
+    assert os.path.exists(paths[0])
+    assert not os.path.exists(paths[1])
+    assert os.path.exists(paths[2])
+    assert cache.stats()['evictions'] == 1
+
+def test_image_cache_keeps_blobs_in_use(tmp_path):
+    """Test that only blobs handed out and not yet released outlast the byte budget"""
+    bodies = [make_png(color=color) for color in ('#ff0000', '#00ff00', '#0000ff')]
+    cache = images.ImageCache(str(tmp_path), max_bytes=len(bodies[0]))
+    
+    with ImageServer() as server:
+        paths = []
+        for name, body in zip("abc", bodies):
+            server.body = body
+            paths.append(cache.fetch(server.url(f"{name}.png")))
+        
+        assert all(os.path.exists(path) for path in paths)
+        
+        for path in paths[:2]:
+            cache.release(path)
+        server.body = make_png(color='#ffffff')
+        cache.release(cache.fetch(server.url("d.png")))
+    
+    # The released blobs go; the one still in use stays even though it is the oldest left
+    assert [os.path.exists(path) for path in paths] == [False, False, True]
+    assert cache.stats()['bytes'] <= len(bodies[2]) + len(server.body)
+
+def test_normalize_image_downscales_and_strips_exif(tmp_path):
+    """Test that large photos are shrunk to the target box without metadata"""
+    from PIL import Image
+    
+    source = tmp_path / "photo.jpg"
+    exif = Image.Exif()
+    exif[0x010F] = "Test Camera"
+    Image.new('RGB', (4000, 1000), '#336699').save(source, format='JPEG', exif=exif)
+    
+    path = images.normalize_image(str(source), 1700, 750)
+    try:
+        with Image.open(path) as result:
+            assert result.size == (1700, 425)
+            assert not result.getexif()
+    finally:
+        os.remove(path)
+
+def test_normalize_image_keeps_transparency(tmp_path):
+    """Test that images with alpha are re-encoded as PNG"""
+    from PIL import Image
+    
+    source = tmp_path / "logo.png"
+    Image.new('RGBA', (200, 100), (255, 0, 0, 128)).save(source)
+    
+    path = images.normalize_image(str(source), 1700, 750)
+    try:
+        assert path.endswith('.png')
+        with Image.open(path) as result:
+            assert result.size == (200, 100)
+            assert result.mode == 'RGBA'
+    finally:
+        os.remove(path)
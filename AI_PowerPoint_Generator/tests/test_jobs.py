@@ -0,0 +1,85 @@
+import io
+import time
+import pytest
+from models import Deck
+from services.jobs import JobRunner, MemoryJobQueue, SqliteJobQueue
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def job_queue(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryJobQueue()
+    return SqliteJobQueue(str(tmp_path / "jobs.db"))
+
+def wait_for(runner, job_id):
+    for _ in range(100):
+        job = runner.get(job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.02)
+    return runner.get(job_id)
+
+def test_jobs_are_claimed_in_order(job_queue):
+    """Test that the oldest queued job is claimed first and marked running"""
+    for i in range(2):
+        now = time.time() + i
+        job_queue.submit({'id': f'job{i}', 'status': 'queued', 'created_at': now, 'updated_at': now},
+                         Deck(title=f'Deck {i}', slides=[]), [])
+    
+    job, deck, uploads = job_queue.claim(timeout=1)
+    assert job['id'] == 'job0'
+    assert deck == Deck(title='Deck 0', slides=[])
+    assert job_queue.get('job0')['status'] == 'running'
+    assert job_queue.get('job1')['status'] == 'queued'
+
+def test_jobs_that_lose_their_worker_are_queued_again(tmp_path):
+    """Test that an expired lease re-queues a running job, then fails it after its last attempt"""
+    upload = tmp_path / "upload.png"
+    upload.write_bytes(b'image')
+    job_queue = SqliteJobQueue(str(tmp_path / "jobs.db"), lease=0.05, max_attempts=2)
+    now = time.time()
+    job_queue.submit({'id': 'job0', 'status': 'queued', 'created_at': now, 'updated_at': now},
+                     Deck(title='Deck', slides=[]), [str(upload)])
+    
+    assert job_queue.claim(timeout=0)[0]['attempts'] == 1
+    assert job_queue.claim(timeout=0) is None
+    time.sleep(0.1)
+    # The first worker died without writing a status; the job is handed out again
+    job, deck, uploads = job_queue.claim(timeout=0)
+    assert job['attempts'] == 2 and uploads == [str(upload)]
+    
+    time.sleep(0.1)
+    assert job_queue.claim(timeout=0) is None
+    job = job_queue.get('job0')
+    assert job['status'] == 'failed' and job['error'] == 'The job was interrupted'
+    assert not upload.exists()
+
+def test_runner_reports_progress_and_result(job_queue, tmp_path):
+    """Test that the runner records stages and writes the finished file"""
+    def pipeline(deck, progress):
+        progress('rendering', 0.5)
+        return io.BytesIO(b'PK-deck'), ['warning']
+    
+    runner = JobRunner(job_queue, pipeline, workers=1, results_dir=str(tmp_path / "results"))
+    job = wait_for(runner, runner.submit(Deck(title='Deck', slides=[]), 'deck.pptx', []))
+    runner.stop()
+    
+    assert job['status'] == 'done'
+    assert job['warnings'] == ['warning']
+    with open(runner.result_path(job['id']), 'rb') as f:
+        assert f.read() == b'PK-deck'
+
+def test_runner_records_failures(job_queue, tmp_path):
+    """Test that pipeline errors mark the job failed and remove its uploads"""
+    upload = tmp_path / "upload.png"
+    upload.write_bytes(b'image')
+    
+    def pipeline(deck, progress):
+        raise RuntimeError("boom")
+    
+    runner = JobRunner(job_queue, pipeline, workers=1, results_dir=str(tmp_path / "results"))
+    job = wait_for(runner, runner.submit(Deck(title='Deck', slides=[]), 'deck.pptx', [str(upload)]))
+    runner.stop()
+    
+    assert job['status'] == 'failed'
+    assert job['error'] == 'boom'
+    assert not upload.exists()
@@ -0,0 +1,65 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from services import metrics
+from services.metrics import Registry
+
+def test_histogram_renders_cumulative_buckets():
+    """Test Prometheus histogram output for one label set"""
+    registry = Registry()
+    histogram = registry.histogram('stage_seconds', 'Stage time', ('stage',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, stage='render')
+    
+    text = registry.render()
+    
+    assert '# TYPE stage_seconds histogram' in text
+    assert 'stage_seconds_bucket{stage="render",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="render",le="1.0"} 3' in text
+    assert 'stage_seconds_bucket{stage="render",le="+Inf"} 4' in text
+    assert 'stage_seconds_count{stage="render"} 4' in text
+    assert histogram.value(stage='render') == 4
+
+def test_counter_labels_and_collectors():
+    """Test labelled counters and gauges refreshed by a collector at render time"""
+    registry = Registry()
+    counter = registry.counter('jobs_total', 'Jobs', ('status',))
+    counter.inc(status='done')
+    counter.inc(2, status='done')
+    gauge = registry.gauge('cache_entries', 'Entries')
+    lookups = registry.counter('cache_lookups_total', 'Lookups', ('result',))
+    registry.add_collector(lambda: (gauge.set(7), lookups.set_total(12, result='hits')))
+    
+    text = registry.render()
+    
+    assert 'jobs_total{status="done"} 3' in text
+    assert 'cache_entries 7' in text
+    assert '# TYPE cache_lookups_total counter' in text
+    assert 'cache_lookups_total{result="hits"} 12' in text
+
+def test_span_records_request_timings():
+    """Test that spans feed both the stage histogram and the current request's timings"""
+    before = metrics.STAGE_SECONDS.value(stage='unit_test')
+    metrics.start_request_timing()
+    
+    with metrics.span('unit_test'):
+        pass
+    
+    assert metrics.STAGE_SECONDS.value(stage='unit_test') == before + 1
+    assert [stage for stage, _ in metrics.request_timings()] == ['unit_test']
+    assert metrics.server_timing_header([('render', 0.25)], 0.5) == 'render;dur=250.0, total;dur=500.0'
+
+def test_spans_in_pool_threads_reach_the_request():
+    """Test that work handed to a thread pool records its spans in the submitting request"""
+    def request():
+        metrics.start_request_timing()
+        
+        def stage(i):
+            with metrics.span(f'pooled_{i}'):
+                pass
+        
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(stage, [0]))
+            list(executor.map(metrics.in_request_context(stage), [1, 2, 3]))
+        return sorted(stage for stage, _ in metrics.request_timings())
+    
+    assert contextvars.copy_context().run(request) == ['pooled_1', 'pooled_2', 'pooled_3']
@@ -0,0 +1,18 @@
+from models import Deck, Slide
+
+def test_slide_dict_round_trip():
+    """Test that unset optional fields are left out and restored as None"""
+    slide = Slide(title='Intro', bullets=['Point'], image_url='https://example.com/a.png')
+    
+    assert slide.to_dict() == {'title': 'Intro', 'bullets': ['Point'], 'image_url': 'https://example.com/a.png'}
+    assert Slide.from_dict(slide.to_dict()) == slide
+    assert Slide.from_dict({'title': 'Blank', 'image_url': ''}).image_url is None
+    assert slide.has_image and not Slide(title='Plain').has_image
+
+def test_deck_dict_round_trip():
+    """Test that a deck survives the JSON form used by the job queue"""
+    deck = Deck(title='Roadmap', slides=[Slide(title='Intro', speaker_notes='Hello')], theme='dark',
+                enhance_ai=True, stream=False)
+    
+    assert Deck.from_dict(deck.to_dict()) == deck
+    assert not hasattr(deck, '__dict__')
@@ -1,6 +1,7 @@
 import pytest
 import os
 import tempfile
+from models import Slide
 from services.ppt_generator import generate_ppt
 from services.themes import get_theme
 
@@ -8,14 +9,14 @@ def test_generate_basic_ppt():
     """Test basic PowerPoint generation"""
     title = "Test Presentation"
     slides = [
-        {
-            'title': 'Introduction',
-            'bullets': ['First point', 'Second point', 'Third point']
-        },
-        {
-            'title': 'Conclusion',
-            'bullets': ['Summary', 'Next steps']
-        }
+        Slide(
+            title='Introduction',
+            bullets=['First point', 'Second point', 'Third point']
+        ),
+        Slide(
+            title='Conclusion',
+            bullets=['Summary', 'Next steps']
+        )
     ]
     theme = get_theme('default')
     
@@ -35,11 +36,11 @@ def test_generate_ppt_with_speaker_notes():
     """Test PowerPoint generation with speaker notes"""
     title = "Test Presentation with Notes"
     slides = [
-        {
-            'title': 'Introduction',
-            'bullets': ['First point'],
-            'speaker_notes': 'This is a speaker note for the introduction slide.'
-        }
+        Slide(
+            title='Introduction',
+            bullets=['First point'],
+            speaker_notes='This is a speaker note for the introduction slide.'
+        )
     ]
     theme = get_theme('dark')
     
@@ -73,7 +74,7 @@ def test_all_themes():
     from services.themes import get_available_themes
     
     title = "Theme Test"
-    slides = [{'title': 'Test Slide', 'bullets': ['Test bullet']}]
+    slides = [Slide(title='Test Slide', bullets=['Test bullet'])]
     
     themes = get_available_themes()
     
@@ -86,3 +87,163 @@ def test_all_themes():
         
         # Clean up
         os.remove(ppt_path)
+
+def test_image_keeps_aspect_ratio(tmp_path):
+    """Test that uploaded images are fitted into the image box without stretching"""
+    from PIL import Image
+    from pptx import Presentation
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
+    
+    image_path = tmp_path / "tall.png"
+    Image.new('RGB', (300, 600), '#ff0000').save(image_path)
+    slides = [Slide(title='Tall', image_path=str(image_path))]
+    
+    ppt_path = generate_ppt("Image Test", slides, get_theme('default'))
+    
+    picture = [shape for shape in Presentation(ppt_path).slides[1].shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE][0]
+    assert abs(picture.width / picture.height - 0.5) < 0.01
+    
+    # Clean up
+    os.remove(ppt_path)
+
+def test_repeated_images_share_one_part(tmp_path):
+    """Test that the same picture used on many slides is fetched and embedded once"""
+    import zipfile
+    from benchmarks.stubs import ImageServer
+    
+    with ImageServer() as server:
+        upload = tmp_path / "logo.png"
+        upload.write_bytes(server.body)
+        slides = [Slide(title=f'Logo {i}', image_url=server.url("logo.png")) for i in range(4)]
+        slides.append(Slide(title='Mirror', image_url=server.url("mirror/logo.png")))
+        slides.append(Slide(title='Upload', image_path=str(upload)))
+        
+        ppt_path = generate_ppt("Logos", slides, get_theme('default'))
+        
+        assert server.requests == 2
+    
+    with zipfile.ZipFile(ppt_path) as package:
+        media = [name for name in package.namelist() if name.startswith('ppt/media/')]
+    assert len(media) == 1
+    
+    # Clean up
+    os.remove(ppt_path)
+
+def test_theme_is_baked_into_slide_master():
+    """Test that themed decks inherit styling from the cached master template"""
+    from pptx import Presentation
+    from pptx.dml.color import RGBColor
+    from pptx.oxml.ns import qn
+    from services import ppt_generator
+    
+    theme = get_theme('dark')
+    assert ppt_generator.get_theme_template(theme) is ppt_generator.get_theme_template(theme)
+    
+    slides = [Slide(title='Agenda', bullets=['First point'])]
+    ppt_path = generate_ppt("Dark Deck", slides, theme)
+    prs = Presentation(ppt_path)
+    
+    assert prs.slide_master.background.fill.fore_color.rgb == RGBColor.from_string('2C3E50')
+    title_style = prs.slide_master._element.find(qn('p:txStyles')).find(qn('p:titleStyle'))
+    assert title_style.find(qn('a:lvl1pPr')).find(qn('a:defRPr')).get('b') == '1'
+    
+    # Placeholders carry no per-run formatting and stretch across the 16:9 slide
+    run = prs.slides[1].shapes.title.text_frame.paragraphs[0].runs[0]
+    assert run.font.size is None and run.font.name is None
+    assert prs.slides[1].placeholders[1].width > prs.slide_width * 0.8
+    
+    # Clean up
+    os.remove(ppt_path)
+
+def test_per_shape_styling_without_templates(monkeypatch):
+    """Test that disabling templates falls back to formatting every slide"""
+    from pptx import Presentation
+    from pptx.util import Pt
+    from services import ppt_generator
+    
+    monkeypatch.setattr(ppt_generator, "THEME_TEMPLATES", False)
+    ppt_path = generate_ppt("Plain", [Slide(title='Agenda', bullets=['First point'])], get_theme('dark'))
+    prs = Presentation(ppt_path)
+    
+    run = prs.slides[1].shapes.title.text_frame.paragraphs[0].runs[0]
+    assert run.font.size == Pt(44)
+    assert str(prs.slides[1].background.fill.fore_color.rgb) == '2C3E50'
+    
+    # Clean up
+    os.remove(ppt_path)
+
+def test_large_decks_are_written_slide_by_slide(tmp_path, monkeypatch):
+    """Test that the slide-by-slide writer produces the same package as a full save"""
+    import zipfile
+    from pptx import Presentation
+    from PIL import Image
+    from services import images, ppt_generator
+    
+    monkeypatch.setattr(images, "NORMALIZE_IMAGES", False)
+    paths = []
+    for color in ('#ff0000', '#00ff00'):
+        path = tmp_path / f"{color[1:]}.png"
+        Image.new('RGB', (200, 100), color).save(path)
+        paths.append(str(path))
+    slides = [
+        Slide(title=f'Slide {i}', bullets=['Point'], image_path=paths[i % 2] if i % 3 else None,
+              speaker_notes=f'Notes {i}')
+        for i in range(9)
+    ]
+    theme = get_theme('dark')
+    
+    monkeypatch.setattr(ppt_generator, "LARGE_DECK_SLIDES", 0)
+    full_path = generate_ppt("Large", slides, theme)
+    monkeypatch.setattr(ppt_generator, "LARGE_DECK_SLIDES", 5)
+    streamed_path = generate_ppt("Large", slides, theme)
+    
+    with zipfile.ZipFile(full_path) as full, zipfile.ZipFile(streamed_path) as streamed:
+        assert sorted(streamed.namelist()) == sorted(full.namelist())
+        assert len([name for name in streamed.namelist() if name.startswith('ppt/media/')]) == 2
+        for name in full.namelist():
+            assert streamed.read(name) == full.read(name), name
+    
+    prs = Presentation(streamed_path)
+    assert len(prs.slides) == 10
+    assert prs.slides[9].notes_slide.notes_text_frame.text == 'Notes 8'
+    
+    # Clean up
+    os.remove(full_path)
+    os.remove(streamed_path)
+
+def test_text_is_fitted_per_slide(tmp_path):
+    """Test that long text is shrunk and image slide bullets no longer overlap the picture"""
+    from PIL import Image
+    from pptx import Presentation
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
+    from pptx.util import Pt
+    from services import ppt_generator
+    
+    image_path = tmp_path / "wide.png"
+    Image.new('RGB', (800, 400), '#0000ff').save(image_path)
+    long_bullets = [f'Point {i} explains one part of the plan in a full sentence of detail' for i in range(12)]
+    slides = [
+        Slide(title='Short', bullets=['One point']),
+        Slide(title='Long', bullets=long_bullets),
+        Slide(title='Picture', bullets=long_bullets[:4], image_path=str(image_path)),
+    ]
+    
+    ppt_path = generate_ppt("Fitted", slides, get_theme('default'))
+    prs = Presentation(ppt_path)
+    
+    # Text that fits keeps the master's sizes; overflowing bullets get a smaller one
+    short_body = prs.slides[1].placeholders[1].text_frame.paragraphs[0].runs[0]
+    assert short_body.font.size is None
+    long_body = prs.slides[2].placeholders[1].text_frame.paragraphs[0].runs[0]
+    assert Pt(ppt_generator.MIN_BODY_SIZE) <= long_body.font.size < Pt(ppt_generator.BODY_SIZE)
+    
+    # The picture shrinks to the space above the bullets instead of sitting under them
+    shapes = prs.slides[3].shapes
+    picture = [shape for shape in shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE][0]
+    bullets = [shape for shape in shapes if shape.has_text_frame and shape.text_frame.text.startswith('•')][0]
+    assert picture.top + picture.height <= bullets.top
+    assert bullets.top + bullets.height <= prs.slide_height
+    assert bullets.text_frame.word_wrap
+    
+    # Clean up
+    os.remove(ppt_path)
@@ -0,0 +1,234 @@
+import io
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zipfile
+import pytest
+from services import deck_cache
+
+def test_generate_streams_pptx(client, deck_form):
+    """Test that /generate returns the deck as an attachment"""
+    response = client.post('/generate', data=deck_form(), content_type='multipart/form-data')
+    
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == 'attachment; filename=quarterly-review.pptx'
+    assert response.data[:2] == b'PK'
+    response.close()
+
+def test_generate_soak_leaves_no_files(client, deck_form):
+    """Test that repeated generations leave no uploads or temp files behind"""
+    upload_folder = client.application.config['UPLOAD_FOLDER']
+    
+    for _ in range(10):
+        # Bypass the deck cache so every post renders
+        response = client.post('/generate', data=deck_form(3), content_type='multipart/form-data',
+                               headers={'Cache-Control': 'no-cache'})
+        assert response.status_code == 200
+        response.close()
+    assert deck_cache.get_deck_cache().stats()['hits'] == 0
+    
+    # Validation failures must clean up too
+    form = deck_form(1)
+    form['title'] = ''
+    client.post('/generate', data=form, content_type='multipart/form-data').close()
+    
+    assert os.listdir(upload_folder) == []
+    assert os.listdir(tempfile.gettempdir()) == []
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_job_lifecycle(client, tmp_path, backend, deck_form):
+    """Test queuing a deck, polling its status and downloading the result"""
+    app = client.application
+    app.config['JOB_QUEUE'] = 'memory' if backend == 'memory' else str(tmp_path / "jobs.db")
+    app.config['JOB_RESULTS_DIR'] = str(tmp_path / "results")
+    
+    response = client.post('/jobs', data=deck_form(), content_type='multipart/form-data')
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['status'] in ('queued', 'running', 'done')
+    
+    for _ in range(100):
+        job = client.get(job['status_url']).get_json()
+        if job['status'] in ('done', 'failed'):
+            break
+        time.sleep(0.05)
+    
+    assert job['status'] == 'done'
+    assert job['progress'] == 1.0
+    
+    download = client.get(job['download_url'])
+    assert download.status_code == 200
+    assert download.headers['Content-Disposition'] == 'attachment; filename=quarterly-review.pptx'
+    assert download.data[:2] == b'PK'
+    download.close()
+    
+    assert os.listdir(app.config['UPLOAD_FOLDER']) == []
+
+def test_job_validation_errors(client, deck_form):
+    """Test that invalid decks are rejected before they are queued"""
+    form = deck_form(1)
+    form['title'] = ''
+    response = client.post('/jobs', data=form, content_type='multipart/form-data')
+    
+    assert response.status_code == 400
+    assert "Presentation title is required" in response.get_json()['errors']
+    assert client.get('/jobs/missing').status_code == 404
+
+def test_form_uses_jobs_only_with_a_shared_queue(client, tmp_path):
+    """Test that an in-process job queue makes the form post to /generate directly"""
+    app = client.application
+    app.config['JOB_QUEUE'] = str(tmp_path / "jobs.db")
+    assert b'data-jobs-url="/jobs"' in client.get('/').data
+    
+    app.config['JOB_QUEUE'] = 'memory'
+    assert b'data-jobs-url' not in client.get('/').data
+
+def test_batch_endpoint_returns_zip(client):
+    """Test the JSON batch endpoint with one valid and one invalid deck"""
+    decks = [
+        {'title': 'Weekly Report', 'slides': [{'title': 'Numbers', 'bullets': ['Up']}]},
+        {'title': 'Broken', 'slides': []},
+    ]
+    response = client.post('/batch', json={'decks': decks, 'enhance': False})
+    
+    assert response.status_code == 200
+    assert response.mimetype == 'application/zip'
+    assert json.loads(response.headers['X-Batch-Summary'])['succeeded'] == 1
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        report = json.loads(archive.read('report.json'))
+        assert '0001-weekly-report.pptx' in archive.namelist()
+    assert report['results'][1]['status'] == 'invalid'
+    
+    response = client.post('/batch', data='{"title": ""}\n', content_type='application/x-ndjson')
+    assert response.status_code == 400
+    
+    client.application.config['BATCH_HTTP_MAX_DECKS'] = 1
+    response = client.post('/batch', json={'decks': decks, 'enhance': False})
+    assert response.status_code == 400 and 'batch.py' in response.get_json()['errors'][0]
+
+def test_metrics_endpoint_and_server_timing(client, monkeypatch, deck_form):
+    """Test stage timings in the Server-Timing header and on /metrics"""
+    from services import metrics
+    monkeypatch.setattr(metrics, "METRICS_TIMING_HEADER", True)
+    
+    response = client.post('/generate', data=deck_form(1), content_type='multipart/form-data')
+    response.close()
+    
+    assert response.status_code == 200
+    stages = [entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')]
+    assert {'parse_form', 'validate', 'render', 'total'} <= set(stages)
+    
+    text = client.get('/metrics').get_data(as_text=True)
+    assert 'ppt_stage_seconds_count{stage="pptx_save"}' in text
+    assert 'ppt_http_request_seconds_count{endpoint="main.generate",status="200"}' in text
+    assert 'ppt_deck_bytes_produced_total' in text
+    assert 'ppt_http_requests_in_flight 1' in text
+
+def test_uploads_are_spooled_hashed_and_deduplicated(client, monkeypatch, deck_form):
+    """Test that identical uploads share one spooled file named independently of the client"""
+    import routes
+    decks = []
+    
+    def fake_pipeline(deck, progress=None):
+        decks.append(deck)
+        assert all(os.path.exists(slide.image_path) for slide in deck.slides)
+        return io.BytesIO(b'PK'), []
+    
+    monkeypatch.setattr(routes, "run_pipeline", fake_pipeline)
+    response = client.post('/generate', data=deck_form(3), content_type='multipart/form-data')
+    response.close()
+    
+    assert response.status_code == 200
+    first, second, third = decks[0].slides
+    assert first.image_path == second.image_path == third.image_path
+    assert os.path.basename(first.image_path).startswith('upload-')
+    assert first.image_digest == hashlib.sha256(deck_form(1)['slide_image_file_0'][0].getvalue()).hexdigest()
+    assert os.listdir(client.application.config['UPLOAD_FOLDER']) == []
+
+def test_uploads_that_are_not_images_are_reported(client, deck_form):
+    """Test that an upload that is not a PNG or JPEG fails validation naming its slide"""
+    form = deck_form(3)
+    form['slide_image_file_1'] = (io.BytesIO(b'%PDF-1.4'), 'notes.pdf')
+    form['slide_image_file_2'] = (io.BytesIO(b'GIF89a not really a png'), 'photo.png')
+    
+    response = client.post('/jobs', data=form, content_type='multipart/form-data')
+    
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [
+        "Slide 2: notes.pdf is not a PNG or JPEG image",
+        "Slide 3: File content is not a PNG or JPEG image (photo.png)",
+    ]
+    assert os.listdir(client.application.config['UPLOAD_FOLDER']) == []
+
+def test_oversized_upload_aborts_with_413(client, deck_form):
+    """Test that a file part over the per-file limit aborts the request and leaves nothing behind"""
+    client.application.config['UPLOAD_MAX_FILE_BYTES'] = 1024
+    
+    for endpoint in ('/generate', '/jobs'):
+        form = deck_form(1)
+        form['slide_image_file_0'] = (io.BytesIO(b'\x89PNG\r\n\x1a\n' + b'\0' * 4096), 'big.png')
+        response = client.post(endpoint, data=form, content_type='multipart/form-data')
+        assert response.status_code == 413
+    assert os.listdir(client.application.config['UPLOAD_FOLDER']) == []
+
+def test_identical_submissions_are_served_from_the_deck_cache(client, monkeypatch, deck_form):
+    """Test cached decks, conditional GETs of the stored deck and the cache bypass"""
+    import routes
+    renders = []
+    
+    def counting_pipeline(deck, progress=None):
+        renders.append(deck)
+        return run_pipeline(deck, progress)
+    
+    run_pipeline = routes.run_pipeline
+    monkeypatch.setattr(routes, "run_pipeline", counting_pipeline)
+    
+    first = client.post('/generate', data=deck_form(), content_type='multipart/form-data')
+    second = client.post('/generate', data=deck_form(), content_type='multipart/form-data')
+    assert first.status_code == second.status_code == 200
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert first.data == second.data
+    assert second.headers['Content-Disposition'] == 'attachment; filename=quarterly-review.pptx'
+    assert len(renders) == 1
+    
+    resubmitted = client.post('/generate', data=deck_form(), content_type='multipart/form-data',
+                              headers={'If-None-Match': first.headers['ETag']})
+    assert resubmitted.status_code == 200 and resubmitted.data == first.data
+    
+    location = first.headers['Content-Location']
+    assert location.endswith('/quarterly-review.pptx')
+    stored = client.get(location)
+    assert stored.status_code == 200 and stored.data == first.data
+    assert stored.headers['ETag'] == first.headers['ETag']
+    unchanged = client.get(location, headers={'If-None-Match': first.headers['ETag']})
+    assert unchanged.status_code == 304 and unchanged.data == b''
+    assert client.get('/generate/not-a-deck-key/quarterly-review.pptx').status_code == 404
+    assert client.get(f"/generate/{'0' * 64}/quarterly-review.pptx").status_code == 404
+    
+    fresh = client.post('/generate', data=deck_form(), content_type='multipart/form-data',
+                        headers={'Cache-Control': 'no-cache', 'If-None-Match': first.headers['ETag']})
+    assert fresh.status_code == 200 and fresh.headers['ETag'] != first.headers['ETag']
+    assert len(renders) == 2
+    for response in (first, second, resubmitted, stored, unchanged, fresh):
+        response.close()
+    
+    assert os.listdir(client.application.config['UPLOAD_FOLDER']) == []
+
+def test_decks_with_failed_images_are_not_cached(client, deck_form):
+    """Test that a deck whose image download failed is rendered again next time"""
+    from benchmarks.stubs import ImageServer
+    
+    with ImageServer(error_rate=1.0) as server:
+        form = deck_form(1)
+        del form['slide_image_file_0']
+        form['slide_image_url_0'] = server.url('photo.png')
+        
+        for _ in range(2):
+            response = client.post('/generate', data=dict(form), content_type='multipart/form-data')
+            assert response.status_code == 200 and 'ETag' not in response.headers
+            response.close()
+    
+    assert server.errors == 2
+    assert deck_cache.get_deck_cache().stats()['entries'] == 0
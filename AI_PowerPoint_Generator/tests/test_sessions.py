@@ -0,0 +1,109 @@
+import json
+from pptx import Presentation
+from models import Deck, Slide
+from services import gemini, ppt_generator
+from services.pipeline import run_incremental_pipeline
+from services.sessions import DeckSessionStore
+from benchmarks.stubs import FakeGeminiClient
+
+def make_deck(slides: int, enhance: bool = False) -> Deck:
+    return Deck(
+        title='Roadmap',
+        theme='corporate',
+        enhance_ai=enhance,
+        slides=[Slide(title=f'Slide {i}', bullets=[f'Point {i}']) for i in range(slides)],
+    )
+
+def render(store: DeckSessionStore, session_id: str, deck: Deck) -> dict:
+    previous = store.get(session_id)
+    buffer, warnings, state = run_incremental_pipeline(
+        deck, previous and previous['state'], previous and store.deck_path(previous)
+    )
+    with buffer:
+        return store.save(session_id, state, buffer, 'roadmap.pptx')
+
+def slide_titles(path: str) -> list:
+    return [slide.shapes.title.text for slide in Presentation(path).slides]
+
+def test_update_renders_only_changed_slides(tmp_path, monkeypatch):
+    """Test that edits, insertions, moves and deletions only lay out new slide content"""
+    store = DeckSessionStore(str(tmp_path / "sessions"))
+    session_id = store.new_id()
+    deck = make_deck(6)
+    record = render(store, session_id, deck)
+    assert record['state']['changed'] == list(range(6))
+    
+    added = []
+    original_add = ppt_generator.add_content_slide
+    monkeypatch.setattr(ppt_generator, "add_content_slide",
+                        lambda prs, slide, *args: added.append(slide.title) or original_add(prs, slide, *args))
+    
+    slides = deck.slides
+    slides[2] = Slide(title='Edited', bullets=['New point'])
+    deck.slides = [slides[1], slides[0], slides[2], Slide(title='Added'), slides[3], slides[5]]
+    record = render(store, session_id, deck)
+    
+    assert added == ['Edited', 'Added']
+    assert record['version'] == 2
+    assert record['state']['changed'] == [2, 3]
+    assert slide_titles(store.deck_path(record)) == [
+        'Roadmap', 'Slide 1', 'Slide 0', 'Edited', 'Added', 'Slide 3', 'Slide 5'
+    ]
+    assert sorted(p.name for p in (tmp_path / "sessions" / session_id).iterdir()) == ['deck-2.pptx', 'session.json']
+
+def test_option_change_rerenders_whole_deck(tmp_path):
+    """Test that a new theme invalidates every slide"""
+    store = DeckSessionStore(str(tmp_path / "sessions"))
+    session_id = store.new_id()
+    deck = make_deck(3)
+    render(store, session_id, deck)
+    
+    deck.theme = 'modern'
+    assert render(store, session_id, deck)['state']['changed'] == [0, 1, 2]
+
+def test_update_only_enhances_changed_slides(tmp_path, monkeypatch):
+    """Test that Gemini only sees the edited slide and the enhanced title is kept"""
+    fake = FakeGeminiClient()
+    monkeypatch.setattr(gemini, "client", fake)
+    monkeypatch.setattr(gemini, "_enhancement_cache", None)
+    monkeypatch.setattr(gemini, "GEMINI_CACHE", "")
+    store = DeckSessionStore(str(tmp_path / "sessions"))
+    session_id = store.new_id()
+    deck = make_deck(4, enhance=True)
+    render(store, session_id, deck)
+    calls = fake.calls
+    
+    deck.slides[1] = Slide(title='Edited', bullets=['Changed'])
+    record = render(store, session_id, deck)
+    
+    assert fake.calls == calls + 1
+    assert fake.prompts[-1].count('  Title:') == 1
+    titles = slide_titles(store.deck_path(record))
+    assert titles[0] == record['state']['enhanced_title']
+    assert titles[1] == 'Enhanced Slide 0'
+    assert titles[2].endswith('Edited')
+
+def test_deck_session_endpoints(client, deck_form):
+    """Test creating a session, regenerating it after one edit and fetching it"""
+    response = client.post('/decks', data=deck_form(3), content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert response.data[:2] == b'PK'
+    session = json.loads(response.headers['X-Deck-Session'])
+    response.close()
+    assert session['changed_slides'] == [1, 2, 3]
+    
+    form = deck_form(3)
+    form['slide_bullets_1'] = 'Rewritten point'
+    response = client.post(session['session_url'], data=form, content_type='multipart/form-data')
+    assert response.status_code == 200
+    session = json.loads(response.headers['X-Deck-Session'])
+    response.close()
+    # Re-uploaded images hash the same, so only the edited slide is rendered again
+    assert session['version'] == 2
+    assert session['changed_slides'] == [2]
+    
+    assert client.get(session['session_url']).get_json()['version'] == 2
+    download = client.get(session['download_url'])
+    assert download.status_code == 200 and download.data[:2] == b'PK'
+    download.close()
+    assert client.get('/decks/missing').status_code == 404
@@ -0,0 +1,43 @@
+import os
+import sys
+import json
+import subprocess
+
+# Generous enough for slow CI machines; locally create_app() takes ~0.2s
+STARTUP_BUDGET = float(os.environ.get("STARTUP_BUDGET_SECONDS", "1.0"))
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_fresh(code: str) -> dict:
+    env = {key: value for key, value in os.environ.items() if key != 'GEMINI_API_KEY'}
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, cwd=APP_DIR,
+                            check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_create_app_within_budget_without_heavy_imports():
+    """Test that a fresh worker boots fast, without a Gemini key or the generation stack"""
+    report = run_fresh(
+        "import sys, time, json\n"
+        "started = time.perf_counter()\n"
+        "from app import create_app\n"
+        "create_app()\n"
+        "elapsed = time.perf_counter() - started\n"
+        "heavy = [name for name in ('google.genai', 'pydantic', 'pptx', 'PIL.Image', 'requests') if name in sys.modules]\n"
+        "print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))\n"
+    )
+    
+    assert report['heavy'] == []
+    assert report['elapsed'] < STARTUP_BUDGET
+
+def test_warm_up_imports_generation_stack():
+    """Test that the gunicorn preload hook leaves the heavy modules imported"""
+    report = run_fresh(
+        "import sys, json\n"
+        "from app import warm_up\n"
+        "warm_up()\n"
+        "from services import gemini\n"
+        "print(json.dumps({'pptx': 'pptx' in sys.modules, 'genai': 'google.genai' in sys.modules,\n"
+        "                  'client': gemini.client is not None}))\n"
+    )
+    
+    assert report == {'pptx': True, 'genai': True, 'client': False}
@@ -0,0 +1,114 @@
+import re
+import json
+from dataclasses import replace
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from models import Deck, Slide
+from services import gemini
+from services.gemini import EnhancementStream, SlideStreamParser
+from services.pipeline import run_pipeline
+from benchmarks.stubs import FakeGeminiClient, ImageServer
+
+RESPONSE = {
+    'title': 'Quoted "deck" {with} [brackets]',
+    'slides': [
+        {'title': 'First {', 'bullets': ['a "quote"', 'back\\slash'], 'image_keywords': ['x']},
+        {'title': ']} Second', 'bullets': [], 'speaker_notes': 'notes, {nested}: [1]'},
+    ]
+}
+
+def make_deck(slides: int, image_url: str = None) -> Deck:
+    return Deck(
+        title='Roadmap',
+        enhance_ai=True,
+        stream=True,
+        slides=[
+            Slide(title=f'Slide {i}', bullets=[f'Point {i}'], image_url=image_url if i == 0 else None)
+            for i in range(slides)
+        ]
+    )
+
+def test_parser_emits_slides_from_single_characters():
+    """Test that slides split at every character are reassembled exactly"""
+    parser = SlideStreamParser()
+    slides = []
+    for char in json.dumps(RESPONSE):
+        slides.extend(parser.feed(char))
+    
+    assert slides == RESPONSE['slides']
+    assert parser.title == RESPONSE['title']
+
+def test_parser_emits_each_slide_when_it_closes():
+    """Test that a slide is returned as soon as its object is complete"""
+    text = json.dumps(RESPONSE)
+    second_slide = text.index('{"title": "]} Second"')
+    parser = SlideStreamParser()
+    
+    assert parser.feed(text[:second_slide]) == [RESPONSE['slides'][0]]
+    assert parser.feed(text[second_slide:]) == [RESPONSE['slides'][1]]
+
+def test_truncated_stream_keeps_remaining_slides():
+    """Test that slides missing from a failed stream are yielded unenhanced"""
+    fake = FakeGeminiClient(fail_when=lambda prompt: True)
+    deck = make_deck(3)
+    stream = EnhancementStream(deck, 'polish', model_client=fake)
+    
+    slides = list(stream)
+    
+    assert [index for index, _ in slides] == [0, 1, 2]
+    assert [slide.title for _, slide in slides] == ['Slide 0', 'Slide 1', 'Slide 2']
+    assert stream.enhanced == 0
+
+def test_streamed_enhancement_is_cached():
+    """Test that a completed stream is reused by the next request"""
+    fake = FakeGeminiClient()
+    deck = make_deck(3)
+    list(EnhancementStream(deck, 'polish', model_client=fake))
+    
+    stream = EnhancementStream(deck, 'polish', model_client=fake)
+    titles = [slide.title for _, slide in stream]
+    
+    assert fake.calls == 1
+    assert stream.title == 'Enhanced Roadmap'
+    assert titles == ['Enhanced Slide 0', 'Enhanced Slide 1', 'Enhanced Slide 2']
+
+def test_stream_only_sends_slides_missing_from_the_cache():
+    """Test that an edited deck streams just the changed slide and reuses the rest"""
+    fake = FakeGeminiClient()
+    deck = make_deck(3)
+    list(EnhancementStream(deck, 'polish', model_client=fake))
+    
+    slides = list(deck.slides)
+    slides[1] = replace(slides[1], title='Slide 1 Edited')
+    stream = EnhancementStream(replace(deck, slides=slides), 'polish', model_client=fake)
+    result = list(stream)
+    
+    assert fake.calls == 2
+    assert re.findall(r'^  Title: (.*)$', fake.prompts[-1], re.MULTILINE) == ['Slide 1 Edited']
+    assert [index for index, _ in result] == [0, 1, 2]
+    assert [slide.title for _, slide in result] == ['Enhanced Slide 0', 'Enhanced Slide 1 Edited', 'Enhanced Slide 2']
+    assert stream.enhanced == 3
+
+def test_streaming_pipeline_renders_slides_in_order(monkeypatch):
+    """Test per-slide progress and slide order with the title slide first"""
+    monkeypatch.setattr(gemini, "client", FakeGeminiClient(per_slide=0.01))
+    events = []
+    
+    with ImageServer() as server:
+        buffer, warnings = run_pipeline(make_deck(4, server.url("chart.png")), lambda *event: events.append(event))
+    
+    with buffer:
+        prs = Presentation(buffer)
+    
+    assert len(prs.slides) == 5
+    assert prs.slides[0].shapes.title.text == 'Enhanced Roadmap'
+    assert [slide.shapes.title.text for slide in list(prs.slides)[2:]] == [
+        'Enhanced Slide 1', 'Enhanced Slide 2', 'Enhanced Slide 3'
+    ]
+    assert any(shape.shape_type == MSO_SHAPE_TYPE.PICTURE for shape in prs.slides[1].shapes)
+    assert warnings == []
+    
+    stages = [stage for stage, _ in events]
+    assert stages == ['enhancing'] + [f'rendering slide {i}' for i in range(1, 5)] + ['done']
+    fractions = [fraction for _, fraction in events]
+    assert fractions == sorted(fractions)
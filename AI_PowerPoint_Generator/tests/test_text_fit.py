@@ -0,0 +1,45 @@
+import pytest
+from services import font_metrics
+from services.text_fit import count_lines, fit_text, word_widths
+
+def test_width_tables_cover_printable_ascii():
+    """Test that every theme font has a full table and aliases resolve"""
+    for widths in font_metrics._WIDTHS.values():
+        assert len(widths) == 95
+    assert font_metrics.glyph_widths('Segoe UI') == font_metrics.glyph_widths('Arial')
+    assert font_metrics.glyph_widths('Unknown Font', True) == font_metrics.glyph_widths('Arial', True)
+
+def test_text_width_follows_the_font():
+    """Test widths against known advances and between fonts and weights"""
+    assert font_metrics.text_width('W', 'Arial') == pytest.approx(0.944)
+    assert font_metrics.text_width('iiii', 'Arial') == pytest.approx(4 * 0.222)
+    assert font_metrics.text_width('Quarterly results', 'Times New Roman') < font_metrics.text_width('Quarterly results', 'Arial')
+    assert font_metrics.text_width('Summary', 'Arial', bold=True) > font_metrics.text_width('Summary', 'Arial')
+    
+    # Text outside the tables is estimated rather than rejected
+    assert font_metrics.text_width('日本', 'Calibri') == pytest.approx(2.0)
+    assert 0 < font_metrics.text_width('café', 'Calibri') < 4 * 0.6
+
+def test_count_lines_wraps_words():
+    """Test greedy wrapping, including words longer than a line"""
+    assert count_lines([1.0, 1.0, 1.0], 0.25, 10) == 1
+    assert count_lines([1.0, 1.0, 1.0], 0.25, 2.3) == 2
+    assert count_lines([5.0], 0.25, 2.0) == 3
+    assert count_lines([], 0.25, 2.0) == 1
+
+def test_fit_text_shrinks_until_it_fits():
+    """Test that short text keeps the full size and long text is shrunk"""
+    short = fit_text(['One point'], 'Arial', 600, 100, 24, 14)
+    assert short.size == 24 and short.lines == 1 and short.fits
+    
+    bullets = ['A fairly long bullet point that explains one idea in some detail'] * 6
+    fitted = fit_text(bullets, 'Arial', 600, 300, 24, 14)
+    assert 14 <= fitted.size < 24 and fitted.fits and fitted.height <= 300
+    
+    # Words are re-wrapped at each size, so the chosen size's lines are consistent
+    space = font_metrics.text_width(' ', 'Arial')
+    words = word_widths(bullets[0], 'Arial')
+    assert fitted.lines == 6 * count_lines(words, space, (600 - 14.4) / fitted.size)
+    
+    overflow = fit_text(bullets * 10, 'Arial', 600, 300, 24, 14)
+    assert overflow.size == 14 and not overflow.fits